@@ -0,0 +1,131 @@
+import io
+from array import array
+
+
+class TreeArena:
+    """Parse tree stored as parallel arrays instead of one object per node.
+
+    Node i has rule name rules[rule[i]] and the token at index token[i] of
+    tokens (-1 for none). Its children are first_child[i] and then the
+    chain of next_sibling links, with -1 ending both. A rule of -1 marks
+    the bare True that rules such as Type add to the tree. tokens is the
+    parser's token list, or a dict of just the tokens the nodes use when
+    the parser reads a stream it does not keep.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.rules = []
+        self.rule_ids = {}
+        self.rule = array('i')
+        self.token = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.last_child = array('i')  # Lets add() append children in order
+
+    def __len__(self):
+        return len(self.rule)
+
+    def add(self, rule, token=-1, parent=-1):
+        """Append a node with the token at index token as the last child of parent; return its index"""
+        index = len(self.rule)
+        if rule is None:
+            rule_id = -1
+        else:
+            rule_id = self.rule_ids.get(rule)
+            if rule_id is None:
+                rule_id = self.rule_ids[rule] = len(self.rules)
+                self.rules.append(rule)
+
+        self.rule.append(rule_id)
+        self.token.append(token)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.last_child.append(-1)
+        if parent >= 0:
+            last = self.last_child[parent]
+            if last < 0:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[last] = index
+            self.last_child[parent] = index
+        return index
+
+    def text(self, index):
+        """Token text of node index, or None if it has no token"""
+        token = self.token[index]
+        return self.tokens[token].text if token >= 0 else None
+
+    def node(self, index):
+        """View of node index: an ArenaNode, or True for a bare True"""
+        if self.rule[index] < 0:
+            return True
+        return ArenaNode(self, index)
+
+    def child_indices(self, index):
+        """Yield the indices of the children of node index"""
+        child = self.first_child[index]
+        next_sibling = self.next_sibling
+        while child >= 0:
+            yield child
+            child = next_sibling[child]
+
+
+class ArenaNode:
+    """Read-only view of one arena node with the ParseTreeNode interface"""
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def rule(self):
+        return self.arena.rules[self.arena.rule[self.index]]
+
+    @property
+    def token(self):
+        return self.arena.text(self.index)
+
+    @property
+    def children(self):
+        arena = self.arena
+        return [arena.node(child) for child in arena.child_indices(self.index)]
+
+    def __eq__(self, other):
+        return (isinstance(other, ArenaNode) and self.arena is other.arena
+                and self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+    def __repr__(self, level=0):
+        out = io.StringIO()
+        self.write(out, level)
+        return out.getvalue()
+
+    def walk(self, level=0):
+        """Yield (node, depth) for the tree in preorder, as ParseTreeNode.walk does"""
+        arena = self.arena
+        stack = [(self.index, level)]
+        while stack:
+            index, depth = stack.pop()
+            yield arena.node(index), depth
+            children = list(arena.child_indices(index))
+            stack.extend((child, depth + 1) for child in reversed(children))
+
+    def write(self, file, level=0):
+        """Write the indented tree to a file-like object, as ParseTreeNode.write does"""
+        arena = self.arena
+        rules = arena.rules
+        for node, depth in self.walk(level):
+            indent = '  ' * depth
+            if node is True:
+                file.write(f"{indent}True\n")
+                continue
+            rule = rules[arena.rule[node.index]]
+            text = arena.text(node.index)
+            if text:
+                file.write(f"{indent}{rule} (Token: {text})\n")
+            else:
+                file.write(f"{indent}{rule}\n")
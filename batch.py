@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import contextlib
+import glob
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_FULL, TRACE_OFF, RuleTrace
+
+
+class FileResult:
+    """Scan and parse summary for one source file of a batch"""
+    __slots__ = ('filename', 'token_count', 'scan_errors', 'parse_errors', 'trace',
+                 'output', 'error')
+
+    def __init__(self, filename, token_count=0, scan_errors=0, parse_errors=0,
+                 trace=None, output="", error=None):
+        self.filename = filename
+        self.token_count = token_count
+        self.scan_errors = scan_errors
+        self.parse_errors = parse_errors
+        self.trace = trace if trace is not None else RuleTrace(TRACE_OFF)
+        self.output = output  # What the scanner printed about includes
+        self.error = error    # Set if the file could not be read
+
+    def __repr__(self):
+        return (f"FileResult({self.filename!r}, tokens={self.token_count}, "
+                f"scan_errors={self.scan_errors}, parse_errors={self.parse_errors})")
+
+
+def expand_sources(paths, suffix=".txt"):
+    """Turn files, directories and glob patterns into a sorted list of source files.
+
+    Directories are searched recursively for files ending in suffix. A path
+    that matches nothing is kept so that it is reported as missing.
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                found.update(os.path.join(root, name) for name in files if name.endswith(suffix))
+        elif glob.has_magic(path):
+            found.update(name for name in glob.glob(path, recursive=True) if os.path.isfile(name))
+        else:
+            found.add(path)
+    return sorted(found)
+
+
+def compile_file(filename, engine="fast", trace=TRACE_FULL):
+    """Scan and parse one file at the given tracing level, returning its FileResult"""
+    scanner = Scanner(engine)
+    output = io.StringIO()
+    try:
+        with open(filename, 'r') as file:
+            source_code = file.read()
+        with contextlib.redirect_stdout(output):
+            scanner.scan(source_code)
+    except (OSError, UnicodeDecodeError) as e:
+        # A file, or an include of it, that cannot be read is reported in its
+        # result rather than raised out of the batch
+        return FileResult(filename, error=str(e))
+
+    parser = Parser(scanner.tokens, trace=trace)
+    parser.parse()
+    return FileResult(filename, len(scanner.tokens), scanner.error_count, parser.error_count,
+                      parser.trace, output.getvalue())
+
+
+def compile_files(paths, workers=None, chunksize=None, engine="fast", trace=TRACE_FULL):
+    """Scan and parse many files across a process pool.
+
+    paths may name files, directories or glob patterns. Results come back
+    in sorted file name order however the work was split. workers defaults
+    to the CPU count and 1 compiles in this process; chunksize defaults to
+    about four chunks per worker. trace is the parsers' tracing level.
+    """
+    filenames = expand_sources(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(filenames) <= 1:
+        return [compile_file(filename, engine, trace) for filename in filenames]
+
+    if chunksize is None:
+        chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(compile_file, filenames, [engine] * len(filenames),
+                                 [trace] * len(filenames), chunksize=chunksize))
+
+
+def print_summary(results, show_rules=False):
+    """Print one line per file and the batch totals"""
+    for result in results:
+        if result.error is not None:
+            print(f"{result.filename}: Error: {result.error}")
+            continue
+        print(f"{result.filename}: {result.token_count} tokens, "
+              f"{result.scan_errors} scanning errors, {result.parse_errors} parsing errors")
+        if show_rules:
+            for line, rule in result.trace.entries():
+                print(f"  Line #: {line} {rule}")
+
+    tokens = sum(result.token_count for result in results)
+    errors = sum(result.scan_errors + result.parse_errors for result in results)
+    print(f"Total: {len(results)} files, {tokens} tokens, {errors} errors")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = None
+    chunksize = None
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg[len("--workers="):])
+        elif arg.startswith("--chunksize="):
+            chunksize = int(arg[len("--chunksize="):])
+    engine = "reference" if "--reference" in args else "fast"
+    show_rules = "--rules" in args
+    paths = [arg for arg in args if not arg.startswith("--")]
+
+    if paths:
+        # Without --rules only the error counts are printed, so nothing is traced
+        results = compile_files(paths, workers, chunksize, engine, TRACE_FULL if show_rules else TRACE_OFF)
+        print_summary(results, show_rules)
+    else:
+        print("Please provide source files, directories or glob patterns.")
+        print("Usage: python batch.py <path>... [--workers=N] [--chunksize=N] [--reference] [--rules]")
@@ -0,0 +1 @@
+"""Benchmarks for the scanner and parser; run each module with python -m from the repository root"""
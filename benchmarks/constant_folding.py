@@ -0,0 +1,60 @@
+"""Benchmark of constant folding on long constant arithmetic chains.
+
+Parses a method whose result is a chain of SIZE constant terms with a
+variable mixed in, then compiles and runs it with and without folding,
+reporting the folding time, nodes eliminated, instructions emitted and
+run time.
+
+Usage: python -m benchmarks.constant_folding [size]
+"""
+
+import sys
+import time
+
+from bytecode import compile_program
+from optimizer import fold_constants
+from parser import Parser
+from scanner import Scanner
+from vm import VM
+
+SIZE = 20000
+RUNS = 20
+
+
+def chain_program(size):
+    terms = " + ".join(f"{i} * x * 1" if i % 100 == 0 else f"{i} * 2 - {i}" for i in range(size))
+    return f"@ Type Chains {{\n    Ity f(Ity x) {{ Respondwith {terms}; }}\n}} $\n"
+
+
+def parse(source_code):
+    scanner = Scanner()
+    scanner.scan(source_code)
+    parser = Parser(scanner.tokens)
+    parser.parse()
+    return parser.ast_root
+
+
+def main(size=SIZE):
+    source_code = chain_program(size)
+    print(f"{'mode':<10}{'fold':>10}{'eliminated':>12}{'instructions':>14}{'run':>10}")
+    results = []
+    for fold in (False, True):
+        program = parse(source_code)
+        start = time.perf_counter()
+        eliminated = fold_constants(program) if fold else 0
+        fold_time = time.perf_counter() - start
+        module = compile_program(program)
+        vm = VM(module)
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            result = vm.call("f", 3)
+        run_time = (time.perf_counter() - start) / RUNS
+        results.append(result)
+        print(f"{'folded' if fold else 'plain':<10}{fold_time:>9.3f}s{eliminated:>12}"
+              f"{len(module.functions[0].lines):>14}{run_time * 1000:>8.2f}ms")
+    if results[0] != results[1]:
+        raise SystemExit(f"Folding changed the result: {results[0]} != {results[1]}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
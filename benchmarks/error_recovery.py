@@ -0,0 +1,101 @@
+"""Benchmark of parsing broken input against parsing the same input intact.
+
+Each case is a generated program of SIZE methods, about 1 MB at the
+default size, with one kind of damage: none, the '@' missing, one
+method's '{' missing, or a stray token in every method. Recovery skips
+to the next synchronizing token, so a broken file should parse about as
+fast as the clean one and report one error per problem. Each case reports
+its best parse time of --repeat runs with the garbage collector off, and
+that time against the clean case's.
+
+Usage: python -m benchmarks.error_recovery [size] [--repeat=N]
+"""
+
+import gc
+import sys
+import time
+
+from parser import Parser
+from scanner import Scanner
+
+SIZE = 12000
+REPEAT = 5
+
+
+def method(i, broken=False):
+    stray = " )" if broken else ""
+    return (f"    Ity f{i}(Ity a, Ity b) {{\n"
+            f"        Ity c;\n"
+            f"        c = a * {i} + b;{stray}\n"
+            f"        Respondwith c;\n"
+            f"    }}\n")
+
+
+def program(size, start="@", broken_every=0):
+    methods = "".join(method(i, broken_every and i % broken_every == 0) for i in range(size))
+    return f"{start} Type Recovery {{\n{methods}}} $\n"
+
+
+# Case name -> (program builder, errors it must report)
+CASES = {
+    "clean": (lambda size: program(size), lambda size: 0),
+    "missing_start": (lambda size: program(size, start=""), lambda size: 1),
+    "missing_brace": (lambda size: program(size).replace("(Ity a, Ity b) {", "(Ity a, Ity b)", 1),
+                      lambda size: 1),
+    "stray_tokens": (lambda size: program(size, broken_every=1), lambda size: size),
+}
+
+
+def parse_once(tokens):
+    """Parse tokens once with the garbage collector off; return (parser, seconds)"""
+    # As timeit does, so collections left over from earlier runs are not timed
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        parser = Parser(tokens)
+        parser.parse()
+        return parser, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def run_cases(size, repeat=REPEAT):
+    """Scan every case, then parse them in turn repeat times.
+
+    Returns {name: (token count, error count, best parse seconds)}. Taking
+    the cases in rounds spreads any drift in the machine's speed over all
+    of them, so their times can be compared.
+    """
+    tokens = {}
+    for name, (build, _) in CASES.items():
+        scanner = Scanner()
+        scanner.scan(build(size))
+        tokens[name] = scanner.tokens
+    best = {}
+    for _ in range(repeat):
+        for name, (_, expected) in CASES.items():
+            parser, elapsed = parse_once(tokens[name])
+            if parser.error_count != expected(size):
+                raise AssertionError(f"{name}: {parser.error_count} errors (expected {expected(size)})")
+            best[name] = min(best.get(name, elapsed), elapsed)
+    return {name: (len(tokens[name]), CASES[name][1](size), best[name]) for name in CASES}
+
+
+def main(size=SIZE, repeat=REPEAT):
+    results = run_cases(size, repeat)
+    clean = results["clean"][2]
+    print(f"{'case':<16}{'tokens':>10}{'errors':>10}{'parse':>10}{'vs clean':>10}")
+    for name, (tokens, errors, elapsed) in results.items():
+        print(f"{name:<16}{tokens:>10}{errors:>10}{elapsed:>9.3f}s{elapsed / clean:>9.2f}x")
+
+
+if __name__ == "__main__":
+    repeat = REPEAT
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--repeat="):
+            repeat = int(arg[len("--repeat="):])
+        else:
+            args.append(arg)
+    main(int(args[0]) if args else SIZE, repeat)
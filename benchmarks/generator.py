@@ -0,0 +1,169 @@
+"""Synthetic programs for the benchmarks, of a configurable size and shape.
+
+A program is one class of SIZE members. A Shape sets what each member
+looks like: how many statements its method has, how deeply they nest,
+how many operands its expressions take, how much comment and string text
+surrounds it, how many files it includes, and what fraction of members is
+damaged on purpose. Programs come from a seeded random generator, so a
+shape, size and seed always give the same text.
+
+Programs are valid apart from the damaged members, with two exceptions
+the grammar forces: it has no rule for the token a Require directive
+leaves in a class, nor for string literals, so each include and each
+string adds one parse error, though both are scanned in full.
+
+Usage: python -m benchmarks.generator [shape] [size] > program.txt
+"""
+
+import os
+import random
+import sys
+
+
+class Shape:
+    __slots__ = ('statements', 'depth', 'operands', 'comment_lines', 'string_length', 'includes',
+                 'broken')
+
+    def __init__(self, statements=4, depth=1, operands=4, comment_lines=0, string_length=0,
+                 includes=0, broken=0.0):
+        self.statements = statements        # Statements in each method body
+        self.depth = depth                  # Blocks nested inside each method
+        self.operands = operands            # Operands of each expression
+        self.comment_lines = comment_lines  # Lines of the block comment before each member
+        self.string_length = string_length  # Length of the string each method prints
+        self.includes = includes            # Files each member includes
+        self.broken = broken                # Fraction of members with an error
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Shape({values})"
+
+
+SHAPES = {
+    "members": Shape(statements=2),
+    "nesting": Shape(statements=1, depth=20, operands=2),
+    "expressions": Shape(statements=1, operands=60),
+    "includes": Shape(statements=1, depth=0, includes=3),
+    "text": Shape(statements=1, depth=0, comment_lines=20, string_length=2000),
+    "broken": Shape(broken=0.2),
+}
+
+TYPES = ("Ity", "Sity", "Ifity", "Sifity")
+OPERATORS = ("+", "-", "*", "/")
+
+# Declarations in each included file
+INCLUDE_LINES = 10
+
+
+class Generator:
+    """Writes the members of one program, drawing every choice from a seeded random source"""
+
+    def __init__(self, shape, seed=0, include_dir=""):
+        self.shape = shape
+        self.random = random.Random(seed)
+        self.include_dir = include_dir
+        self.includes = {}  # Path -> text of the files the program includes
+
+    def expression(self):
+        choice = self.random.choice
+        terms = [choice(("a", "b", str(self.random.randint(0, 999)))) for _ in range(self.shape.operands)]
+        return " ".join(f"{term} {choice(OPERATORS)}" for term in terms[:-1]) + f" {terms[-1]}"
+
+    def statements(self, indent):
+        lines = []
+        for _ in range(self.shape.statements):
+            if self.random.random() < 0.5:
+                lines.append(f"{indent}a = {self.expression()};")
+            else:
+                lines.append(f"{indent}g({self.expression()}, b);")
+        return lines
+
+    def body(self, indent):
+        """Lines of a method body, with its statements nested depth blocks deep"""
+        lines = [f"{indent}Ity a;"]
+        closes = []
+        for level in range(self.shape.depth):
+            lines.extend(self.statements(indent))
+            keyword = "TrueFor" if level % 2 else "However"
+            lines.append(f"{indent}{keyword} (a < {level} && b > a) {{")
+            closes.append(f"{indent}}}")
+            indent += "    "
+        lines.extend(self.statements(indent))
+        if self.shape.string_length:
+            text = "".join(self.random.choice("abcdefgh ") for _ in range(self.shape.string_length))
+            lines.append(f'{indent}Srap("{text}");')
+        lines.extend(reversed(closes))
+        return lines
+
+    def include(self, member, index):
+        """The directive of a member's index-th include, writing down the file it names"""
+        path = os.path.join(self.include_dir, f"include_{member}_{index}.txt")
+        self.includes[path] = "".join(f"Ity shared_{member}_{index}_{k};\n" for k in range(INCLUDE_LINES))
+        # Both spellings of an include; using must start a line of its own
+        if index % 2:
+            return f"using {path}"
+        return f"    Require({path});"
+
+    def member(self, index):
+        shape = self.shape
+        lines = []
+        if shape.comment_lines:
+            text = "".join(f"\n       comment line {line} of member {index}" for line in range(shape.comment_lines))
+            lines.append(f"    /<{text} >/")
+        lines.extend(self.include(index, k) for k in range(shape.includes))
+        lines.append(f"    {self.random.choice(TYPES)} f{index}(Ity a, Ity b) {{")
+        lines.extend(self.body("        "))
+        lines.append("    }")
+        if self.random.random() < shape.broken:
+            self.damage(lines)
+        return lines
+
+    def damage(self, lines):
+        """Introduce one error into a member's lines"""
+        index = self.random.randrange(len(lines))
+        line = lines[index]
+        kind = self.random.randrange(4)
+        if kind == 0 and ";" in line:
+            lines[index] = line.replace(";", "", 1)   # Missing ;
+        elif kind == 1 and "{" in line:
+            lines[index] = line.replace("{", "", 1)   # Missing {
+        elif kind == 2:
+            lines[index] = line + " )"                # Stray token
+        else:
+            lines[index] = line.replace("a", "a a", 1)  # Doubled name
+
+    def program(self, size):
+        lines = ["@ Type Generated {"]
+        for index in range(size):
+            lines.extend(self.member(index))
+        lines.append("} $")
+        return "\n".join(lines) + "\n"
+
+
+def generate(shape, size, seed=0, include_dir=""):
+    """Return (source text, {path: text} of the files it includes) for a program of size members.
+
+    shape is a Shape or the name of one in SHAPES. Include paths are joined
+    to include_dir; the files are not written.
+    """
+    if isinstance(shape, str):
+        shape = SHAPES[shape]
+    generator = Generator(shape, seed, include_dir)
+    return generator.program(size), generator.includes
+
+
+def write_program(directory, shape, size, seed=0):
+    """Write a program and the files it includes to directory; return the program's path"""
+    source_code, includes = generate(shape, size, seed, os.path.abspath(directory))
+    for path, text in includes.items():
+        with open(path, 'w') as file:
+            file.write(text)
+    path = os.path.join(directory, "program.txt")
+    with open(path, 'w') as file:
+        file.write(source_code)
+    return path
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "members"
+    sys.stdout.write(generate(name, int(sys.argv[2]) if len(sys.argv) > 2 else 100)[0])
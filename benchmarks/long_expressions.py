@@ -0,0 +1,87 @@
+"""Benchmark of parsing long expressions, as generated code tends to have.
+
+Each case builds a method around expressions of SIZE operands in all:
+chains mixing arithmetic precedence levels, comparisons joined by a long
+run of && and ||, and expressions nested in parentheses. It reports the
+parse time and checks the operators all made it into the syntax tree.
+
+Usage: python -m benchmarks.long_expressions [size]
+"""
+
+import random
+import sys
+import time
+
+from parser import Parser
+from scanner import Scanner
+from syntax import BinaryOp
+
+SIZE = 100000
+
+# Operands per statement, and parentheses per nested statement
+CHAIN = 50
+NESTING = 100
+
+
+def chain(operators, length, rng):
+    return " ".join(f"{rng.choice(('a', 'b', '7'))} {rng.choice(operators)}" for _ in range(length)) + " c"
+
+
+def arithmetic_program(size, rng):
+    statements = "".join(f"        x = {chain('+-*/', CHAIN - 1, rng)};\n" for _ in range(size // CHAIN))
+    return statements, size // CHAIN * (CHAIN - 1)
+
+
+def logical_program(size, rng):
+    comparisons = CHAIN // 2
+    statements = "".join(
+        "        TrueFor (" + " ".join(f"a < {i} {rng.choice(('&&', '||'))}" for i in range(comparisons - 1))
+        + " b > c) { Endthis; }\n"
+        for _ in range(size // CHAIN))
+    return statements, size // CHAIN * (2 * comparisons - 1)
+
+
+def nested_program(size, rng):
+    depth = NESTING
+    expression = "a"
+    for _ in range(depth):
+        expression = f"({expression} {rng.choice('+-*/')} b)"
+    statements = f"        x = {expression};\n" * (size // (depth + 1))
+    return statements, size // (depth + 1) * depth
+
+
+CASES = {
+    "arithmetic": arithmetic_program,
+    "logical": logical_program,
+    "nested": nested_program,
+}
+
+
+def run_case(name, size):
+    """Scan and parse one case; return (token count, parse seconds)"""
+    statements, operators = CASES[name](size, random.Random(size))
+    source_code = ("@ Type Expressions {\n    Ity x;\n    Valueless f(Ity a, Ity b, Ity c) {\n"
+                   f"{statements}    }}\n}} $\n")
+    scanner = Scanner()
+    scanner.scan(source_code)
+    start = time.perf_counter()
+    parser = Parser(scanner.tokens)
+    parser.parse()
+    elapsed = time.perf_counter() - start
+
+    found = sum(1 for node in parser.ast_root.walk() if isinstance(node, BinaryOp))
+    if parser.error_count or found != operators:
+        raise AssertionError(f"{name}: {parser.error_count} errors, "
+                             f"{found} operators (expected {operators})")
+    return len(scanner.tokens), elapsed
+
+
+def main(size=SIZE):
+    print(f"{'case':<12}{'tokens':>10}{'parse':>10}")
+    for name in CASES:
+        tokens, elapsed = run_case(name, size)
+        print(f"{name:<12}{tokens:>10}{elapsed:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
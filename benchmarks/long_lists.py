@@ -0,0 +1,82 @@
+"""Regression benchmark for list rules over very long lists.
+
+Each case builds a program around one list of SIZE elements (identifiers,
+parameters, variable declarations or call arguments), then scans, parses
+and prints its tree. The list rules and tree printing used to recurse per
+element or level, so these inputs hit the recursion limit.
+
+Usage: python -m benchmarks.long_lists [size]
+"""
+
+import sys
+import time
+
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_COUNTS
+
+SIZE = 100000
+
+
+def id_list_program(size):
+    names = ", ".join(f"v{i}" for i in range(size))
+    return f"@ Type Lists {{\n    Ity {names};\n}} $\n"
+
+
+def parameters_program(size):
+    params = ", ".join(f"Ity p{i}" for i in range(size))
+    return f"@ Type Lists {{\n    Valueless f({params});\n}} $\n"
+
+
+def variable_decls_program(size):
+    decls = "".join(f"        Ity v{i};\n" for i in range(size))
+    return f"@ Type Lists {{\n    Valueless f() {{\n{decls}    }}\n}} $\n"
+
+
+def arguments_program(size):
+    args = ", ".join(str(i) for i in range(size))
+    return f"@ Type Lists {{\n    Valueless f() {{\n        g({args});\n    }}\n}} $\n"
+
+
+# Case name -> (program builder, the repeated rule, how often it must match)
+CASES = {
+    "id_list": (id_list_program, "IDList -> IDList , ID", lambda size: size - 1),
+    "parameters": (parameters_program, "Parameters -> Parameters , Parameter", lambda size: size - 1),
+    "variable_decls": (variable_decls_program, "VariableDecls -> VariableDecl VariableDecls",
+                       lambda size: size),
+    "arguments": (arguments_program, "ArgumentSequence -> ArgumentSequence , Expression",
+                  lambda size: size - 1),
+}
+
+
+def run_case(name, size):
+    """Scan, parse and print one case; return (scan, parse, print) seconds"""
+    build, rule, expected = CASES[name]
+    source_code = build(size)
+
+    start = time.perf_counter()
+    scanner = Scanner()
+    scanner.scan(source_code)
+    scanned = time.perf_counter()
+    parser = Parser(scanner.tokens, trace=TRACE_COUNTS)
+    parser.parse()
+    parsed = time.perf_counter()
+    tree = repr(parser.parse_tree_root)
+    printed = time.perf_counter()
+
+    count = parser.trace.rule_counts().get(rule, 0)
+    if parser.error_count or count != expected(size) or not tree:
+        raise AssertionError(f"{name}: {parser.error_count} errors, "
+                             f"{count} x '{rule}' (expected {expected(size)})")
+    return scanned - start, parsed - scanned, printed - parsed
+
+
+def main(size=SIZE):
+    print(f"{'case':<16}{'scan':>10}{'parse':>10}{'print':>10}")
+    for name in CASES:
+        scan_time, parse_time, print_time = run_case(name, size)
+        print(f"{name:<16}{scan_time:>9.3f}s{parse_time:>9.3f}s{print_time:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
@@ -0,0 +1,62 @@
+"""Benchmark of scanning a large file as text against scanning it mapped.
+
+Writes a generated source of SIZE members with comments and string
+literals to a temporary file, then scans it with Scanner.scan_file both
+ways, reporting the time and the peak Python memory, which for the text
+scan includes the source string.
+
+Usage: python -m benchmarks.mapped_scan [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from scanner import Scanner
+
+SIZE = 50000
+
+
+def commented_program(size):
+    members = "".join(
+        f"    /< member {i}: a block comment long enough to matter\n       across two lines >/\n"
+        f"    Valueless f{i}(Ity count) {{ Srap(\"value {i}\"); count = count + {i}; }}\n"
+        for i in range(size))
+    return f"@ Type Mapped {{\n{members}}} $\n"
+
+
+def measure(path, mapped):
+    """Scan path and return (seconds, peak bytes, token count)"""
+    # Timed on its own, since tracing allocations slows scanning severalfold
+    scanner = Scanner(mapped=mapped, include_cache=None)
+    start = time.perf_counter()
+    scanner.scan_file(path)
+    elapsed = time.perf_counter() - start
+    count = len(scanner.tokens)
+    del scanner
+
+    tracemalloc.start()
+    scanner = Scanner(mapped=mapped, include_cache=None)
+    scanner.scan_file(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, count
+
+
+def main(size=SIZE):
+    with tempfile.NamedTemporaryFile('w', suffix=".txt", delete=False) as file:
+        file.write(commented_program(size))
+        path = file.name
+    try:
+        print(f"{'scan':<8}{'tokens':>10}{'time':>10}{'peak':>14}")
+        for name, mapped in (("text", False), ("mapped", True)):
+            elapsed, peak, tokens = measure(path, mapped)
+            print(f"{name:<8}{tokens:>10}{elapsed:>9.3f}s{peak / 1024 / 1024:>11.1f} MiB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
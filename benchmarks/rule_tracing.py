@@ -0,0 +1,68 @@
+"""Benchmark of parsing at each tracing level.
+
+Parses a generated program of SIZE methods with the trace off, counting
+rules and keeping the full trace, reporting the parse time, the peak
+Python memory of the parse, and for the full trace the time to print it
+in line order.
+
+Usage: python -m benchmarks.rule_tracing [size]
+"""
+
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_LEVELS
+
+SIZE = 10000
+
+
+def traced_program(size):
+    methods = "".join(
+        f"    Ity f{i}(Ity a, Ity b) {{\n"
+        f"        Ity c;\n"
+        f"        c = a * {i} + b;\n"
+        f"        TrueFor (c > a && b < {i}) {{ c = c - 1; }}\n"
+        f"        Respondwith c;\n"
+        f"    }}\n"
+        for i in range(size))
+    return f"@ Type Traced {{\n{methods}}} $\n"
+
+
+def measure(tokens, level):
+    """Parse tokens at level; return (parse seconds, peak bytes, print seconds)"""
+    # Timed on its own, since tracing allocations slows parsing severalfold
+    start = time.perf_counter()
+    parser = Parser(tokens, trace=level)
+    parser.parse()
+    elapsed = time.perf_counter() - start
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        parser.print_results()
+        printed = time.perf_counter() - start
+    del parser
+
+    tracemalloc.start()
+    parser = Parser(tokens, trace=level)
+    parser.parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, printed
+
+
+def main(size=SIZE):
+    scanner = Scanner()
+    scanner.scan(traced_program(size))
+    print(f"{len(scanner.tokens)} tokens")
+    print(f"{'trace':<8}{'parse':>10}{'peak':>14}{'print':>10}")
+    for level in TRACE_LEVELS:
+        elapsed, peak, printed = measure(scanner.tokens, level)
+        print(f"{level:<8}{elapsed:>9.3f}s{peak / 1024 / 1024:>11.1f} MiB{printed:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
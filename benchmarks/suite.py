@@ -0,0 +1,152 @@
+"""Benchmark suite over generated programs of every shape, with stored baselines.
+
+For each shape in benchmarks.generator.SHAPES, writes a program of SIZE
+members (and the files it includes) to a temporary directory, then times
+three phases: Scanner.scan_file, Parser.parse of the tokens, and
+process_file end to end with its output discarded. Each phase reports its
+best time of --repeat runs with the garbage collector off, its tokens per
+second, and its peak Python memory, taken on one more run under
+tracemalloc since tracing allocations slows the phase down. Included files
+are lexed once and then come from the scanner's shared include cache, as
+in a long-running process.
+
+--save=FILE writes the results as JSON. --compare=FILE checks them against
+results saved earlier and flags every phase whose tokens per second fell by
+more than --threshold percent (default 20); the exit status is then 1.
+
+Usage: python -m benchmarks.suite [size] [--shape=NAME,...] [--repeat=N] [--save=FILE] [--compare=FILE]
+       [--threshold=PERCENT]
+"""
+
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generator import SHAPES, write_program
+from parser import Parser
+from scanner import Scanner, process_file
+
+SIZE = 500
+REPEAT = 5
+THRESHOLD = 20.0
+
+PHASES = ("scan", "parse", "end_to_end")
+
+
+def run_phase(phase, path, tokens):
+    """Run one phase over the program at path; return the Parser, if it parsed"""
+    if phase == "scan":
+        Scanner().scan_file(path)
+        return None
+    if phase == "parse":
+        parser = Parser(tokens)
+        parser.parse()
+        return parser
+    process_file(path)
+    return None
+
+
+def measure(phase, path, tokens, repeat):
+    """Best seconds of repeat runs of phase, and its peak bytes on a run of its own"""
+    best = None
+    for _ in range(repeat):
+        # As timeit does, so collections left over from earlier runs are not timed
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run_phase(phase, path, tokens)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    run_phase(phase, path, tokens)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_shape(name, size, repeat):
+    """Measure every phase over a program of one shape; return (errors, {phase: result})"""
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        path = write_program(directory, SHAPES[name], size)
+        # The scanner reports includes on stdout, and process_file prints everything
+        with contextlib.redirect_stdout(devnull):
+            scanner = Scanner()
+            scanner.scan_file(path)
+            tokens = scanner.tokens
+            errors = scanner.error_count + run_phase("parse", path, tokens).error_count
+            results = {}
+            for phase in PHASES:
+                seconds, peak = measure(phase, path, tokens, repeat)
+                results[phase] = {"tokens": len(tokens), "seconds": seconds,
+                                  "tokens_per_second": len(tokens) / seconds, "peak": peak}
+    return errors, results
+
+
+def compare(results, baseline, threshold):
+    """Yield (shape, phase, change in percent, regressed) for the phases in both results"""
+    for name, phases in results.items():
+        for phase, result in phases.items():
+            before = baseline.get(name, {}).get(phase)
+            if before is None:
+                continue
+            change = (result["tokens_per_second"] / before["tokens_per_second"] - 1) * 100
+            yield name, phase, change, change < -threshold
+
+
+def main(size=SIZE, shapes=tuple(SHAPES), repeat=REPEAT, save=None, compare_with=None, threshold=THRESHOLD):
+    """Run the suite; return 1 if it regressed against compare_with, else 0"""
+    print(f"{'shape':<13}{'phase':<12}{'tokens':>9}{'errors':>8}{'time':>10}{'tokens/s':>12}{'peak':>12}")
+    results = {}
+    for name in shapes:
+        errors, results[name] = run_shape(name, size, repeat)
+        for phase, result in results[name].items():
+            print(f"{name:<13}{phase:<12}{result['tokens']:>9}{errors:>8}{result['seconds']:>9.3f}s"
+                  f"{result['tokens_per_second']:>12.0f}{result['peak'] / 1024 / 1024:>8.1f} MiB")
+
+    if save is not None:
+        with open(save, 'w') as file:
+            json.dump({"size": size, "results": results}, file, indent=2)
+        print(f"\nSaved results to {save}")
+
+    if compare_with is None:
+        return 0
+    with open(compare_with, 'r') as file:
+        baseline = json.load(file)
+    if baseline["size"] != size:
+        print(f"\nWarning: baseline was run at size {baseline['size']}, not {size}")
+    print(f"\nAgainst {compare_with} (tokens/s, regression below {-threshold:g}%):")
+    regressions = 0
+    for name, phase, change, regressed in compare(results, baseline["results"], threshold):
+        regressions += regressed
+        print(f"{name:<13}{phase:<12}{change:>+8.1f}%{'  REGRESSION' if regressed else ''}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    options = {}
+    positional = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value
+        else:
+            positional.append(arg)
+    unknown = set(options) - {"shape", "repeat", "save", "compare", "threshold"}
+    names = options["shape"].split(",") if "shape" in options else list(SHAPES)
+    missing = [name for name in names if name not in SHAPES]
+    if unknown or missing:
+        print(f"Unknown {'option' if unknown else 'shape'}: {', '.join(sorted(unknown) or missing)}; "
+              f"shapes are {', '.join(SHAPES)}")
+        sys.exit(2)
+    sys.exit(main(int(positional[0]) if positional else SIZE, names, int(options.get("repeat", REPEAT)),
+                  options.get("save"), options.get("compare"), float(options.get("threshold", THRESHOLD))))
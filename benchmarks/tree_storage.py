@@ -0,0 +1,62 @@
+"""Benchmark of parse tree storage: ParseTreeNode objects against a TreeArena.
+
+Parses a class with SIZE members each way and reports the parse time with
+its tree, the memory the finished parse holds and the peak memory of the
+whole parse. The object tree is built from the syntax tree, which the
+parse keeps; the arena is filled in while parsing and no syntax tree is
+kept, so only one member's syntax nodes are alive at a time.
+
+Usage: python -m benchmarks.tree_storage [size]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_OFF
+
+SIZE = 100000
+
+
+def members_program(size):
+    members = "".join(f"    Ity v{i};\n    Valueless f{i}() {{ }}\n" for i in range(size // 2))
+    return f"@ Type Storage {{\n{members}}} $\n"
+
+
+def parse(tokens, arena):
+    """Parse tokens and return the parser, with its parse tree built"""
+    parser = Parser(tokens, arena=arena, trace=TRACE_OFF)
+    parser.parse()
+    parser.parse_tree_root  # The object tree is built on first access
+    return parser
+
+
+def measure(tokens, arena):
+    """(seconds, bytes the parse holds, peak bytes, node count) of parsing with one storage"""
+    gc.collect()
+    start = time.perf_counter()
+    parse(tokens, arena)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    parser = parse(tokens, arena)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, held, peak, sum(1 for node in parser.parse_tree_root.walk())
+
+
+def main(size=SIZE):
+    scanner = Scanner()
+    scanner.scan(members_program(size))
+    print(f"{'storage':<12}{'nodes':>10}{'parse':>10}{'held':>14}{'peak':>14}")
+    for name, arena in (("objects", False), ("arena", True)):
+        elapsed, held, peak, nodes = measure(scanner.tokens, arena)
+        print(f"{name:<12}{nodes:>10}{elapsed:>9.3f}s{held / 1024:>10.0f} KiB{peak / 1024:>10.0f} KiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
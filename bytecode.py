@@ -0,0 +1,351 @@
+import operator
+from array import array
+
+from syntax import (Assignment, BinaryOp, EndthisStmt, FuncCall, HoweverStmt, MethodDecl, Name,
+                    Number, RespondwithStmt, ScanStmt, SrapStmt, TrueForStmt, VariableDecl, WhenStmt)
+
+# Opcodes, numbered roughly by how often loops execute them; the VM tests
+# them in this order. Every instruction is an (opcode, argument) pair.
+LOAD_LOCAL = 0      # Push locals[arg]
+LOAD_CONST = 1      # Push consts[arg]
+BINARY = 2          # Pop right and left, push BINARY_OPS[arg](left, right)
+STORE_LOCAL = 3     # Pop into locals[arg]
+JUMP_IF_FALSE = 4   # Pop; jump to instruction arg if false
+JUMP = 5            # Jump to instruction arg
+LOAD_GLOBAL = 6     # Push globals[arg]
+STORE_GLOBAL = 7    # Pop into globals[arg]
+JUMP_IF_FALSE_OR_POP = 8  # Jump to arg keeping the top if false, else pop it
+JUMP_IF_TRUE_OR_POP = 9   # Jump to arg keeping the top if true, else pop it
+CALL = 10           # Call functions[arg] with its arguments on the stack
+POP = 11            # Drop the top of the stack
+RETURN = 12         # Return the top of the stack
+RETURN_NONE = 13    # Return None
+
+OPCODE_NAMES = ("LOAD_LOCAL", "LOAD_CONST", "BINARY", "STORE_LOCAL", "JUMP_IF_FALSE", "JUMP",
+                "LOAD_GLOBAL", "STORE_GLOBAL", "JUMP_IF_FALSE_OR_POP", "JUMP_IF_TRUE_OR_POP",
+                "CALL", "POP", "RETURN", "RETURN_NONE")
+
+# Operators compiled to BINARY; the argument is the index in this tuple
+BINARY_OPERATORS = ('+', '-', '*', '/', '==', '!=', '<', '<=', '>', '>=')
+
+
+def divide(left, right):
+    """/ truncates toward zero when both operands are integers, as in C"""
+    if type(left) is int and type(right) is int:
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    return left / right
+
+
+# Dispatch table for BINARY, in BINARY_OPERATORS order. Apart from
+# divide these are C functions, so an operator costs one call and no
+# Python-level branching.
+BINARY_OPS = (operator.add, operator.sub, operator.mul, divide,
+              operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge)
+
+# Initial value of a declared variable by its type
+TYPE_DEFAULTS = {
+    "Ity": 0, "Sity": 0, "Ifity": 0.0, "Sifity": 0.0,
+    "Logical": False, "Cwq": '', "CwqSequence": '', "Valueless": None,
+}
+
+
+class CompileError(Exception):
+    """Raised for a parsed program that cannot be turned into bytecode"""
+
+
+class Function:
+    """Bytecode of one method"""
+    __slots__ = ('name', 'index', 'param_count', 'local_defaults', 'local_names',
+                 'code', 'lines', 'consts', 'defined')
+
+    def __init__(self, name, index, param_count):
+        self.name = name
+        self.index = index
+        self.param_count = param_count
+        self.local_names = []
+        self.local_defaults = []  # Initial values of the locals after the parameters
+        self.code = array('i')    # Flat (opcode, argument) pairs
+        self.lines = array('i')   # Source line of each instruction
+        self.consts = []
+        self.defined = False      # False for a declaration ending in ;
+
+    def __repr__(self):
+        return f"Function({self.name!r}, params={self.param_count}, instructions={len(self.lines)})"
+
+    def disassemble(self):
+        """Return the instructions as readable text, one per line"""
+        lines = []
+        for k in range(len(self.lines)):
+            op, arg = self.code[2 * k], self.code[2 * k + 1]
+            text = f"{k:>5} {OPCODE_NAMES[op]:<22}{arg:>5}"
+            if op == LOAD_CONST:
+                text += f"  ({self.consts[arg]!r})"
+            elif op in (LOAD_LOCAL, STORE_LOCAL):
+                text += f"  ({self.local_names[arg]})"
+            elif op == BINARY:
+                text += f"  ({BINARY_OPERATORS[arg]})"
+            lines.append(text)
+        return '\n'.join(lines)
+
+
+class Module:
+    """Bytecode of a class: its methods and its fields as globals"""
+
+    def __init__(self, name):
+        self.name = name
+        self.functions = []
+        self.function_index = {}
+        self.global_names = []
+        self.global_index = {}
+        self.global_defaults = []
+        self.folded = 0  # Syntax nodes constant folding removed before compiling
+
+    def function(self, name):
+        """Return the Function called name"""
+        try:
+            return self.functions[self.function_index[name]]
+        except KeyError:
+            raise CompileError(f"Unknown function: {name}") from None
+
+
+def parse_number(text):
+    """Value of a Constant token"""
+    return float(text) if '.' in text else int(text)
+
+
+class Compiler:
+    """Lowers the methods of a syntax.Program to bytecode"""
+
+    def __init__(self):
+        self.module = None
+        self.function = None
+        self.locals = None
+        self.const_index = None
+        self.loops = None  # Per enclosing loop, the jumps its Endthis statements need patched
+
+    def compile_program(self, program):
+        """Compile a syntax.Program into a Module"""
+        class_decl = program.declaration
+        if class_decl is None or class_decl.members is None:
+            raise CompileError("Program has no class body to compile")
+        self.module = Module(class_decl.name)
+
+        # Fields first, then every method so calls can refer to later ones
+        for member in class_decl.members:
+            if isinstance(member, VariableDecl):
+                for name in member.names:
+                    if name in self.module.global_index:
+                        raise CompileError(f"Line {member.line}: duplicate field {name}")
+                    self.module.global_index[name] = len(self.module.global_names)
+                    self.module.global_names.append(name)
+                    self.module.global_defaults.append(TYPE_DEFAULTS.get(member.type_name))
+        methods = [member for member in class_decl.members if isinstance(member, MethodDecl)]
+        defined = set()  # Names of the methods with a body so far
+        for method in methods:
+            if method.body is not None:
+                if method.name in defined:
+                    raise CompileError(f"Line {method.line}: duplicate method {method.name}")
+                defined.add(method.name)
+            if method.name not in self.module.function_index:
+                self.module.function_index[method.name] = len(self.module.functions)
+                self.module.functions.append(Function(method.name, len(self.module.functions),
+                                                      len(method.params)))
+        for method in methods:
+            if method.body is not None:
+                self.compile_method(method)
+        return self.module
+
+    def compile_method(self, method):
+        function = self.module.functions[self.module.function_index[method.name]]
+        if function.param_count != len(method.params):
+            raise CompileError(f"Line {method.line}: {method.name} declared with "
+                               f"{function.param_count} parameters, defined with {len(method.params)}")
+        self.function = function
+        self.locals = {}
+        self.const_index = {}
+        self.loops = []
+        function.defined = True
+
+        for param in method.params:
+            self.declare_local(param.name, param.line)
+        for variable in method.variables:
+            for name in variable.names:
+                self.declare_local(name, variable.line)
+                function.local_defaults.append(TYPE_DEFAULTS.get(variable.type_name))
+
+        for statement in method.body:
+            self.compile_statement(statement)
+        self.emit(RETURN_NONE, 0, method.end_line)
+
+    def declare_local(self, name, line):
+        if name in self.locals:
+            raise CompileError(f"Line {line}: duplicate variable {name}")
+        self.locals[name] = len(self.function.local_names)
+        self.function.local_names.append(name)
+
+    def emit(self, op, arg, line):
+        """Append an instruction and return its index"""
+        self.function.code.append(op)
+        self.function.code.append(arg)
+        self.function.lines.append(line)
+        return len(self.function.lines) - 1
+
+    def patch(self, instruction, target):
+        """Point the jump at instruction to target"""
+        self.function.code[2 * instruction + 1] = target
+
+    def here(self):
+        return len(self.function.lines)
+
+    def compile_statement(self, statement):
+        line = statement.line
+        if isinstance(statement, Assignment):
+            self.compile_expression(statement.value)
+            self.compile_store(statement.target, line)
+        elif isinstance(statement, TrueForStmt):
+            self.compile_expression(statement.condition)
+            skip_then = self.emit(JUMP_IF_FALSE, 0, line)
+            self.compile_block(statement.body)
+            if statement.else_body is not None:
+                skip_else = self.emit(JUMP, 0, line)
+                self.patch(skip_then, self.here())
+                self.compile_block(statement.else_body)
+                self.patch(skip_else, self.here())
+            else:
+                self.patch(skip_then, self.here())
+        elif isinstance(statement, HoweverStmt):
+            start = self.here()
+            self.compile_expression(statement.condition)
+            exit_jump = self.emit(JUMP_IF_FALSE, 0, line)
+            self.compile_loop_body(statement.body)
+            self.emit(JUMP, start, line)
+            self.end_loop(exit_jump)
+        elif isinstance(statement, WhenStmt):
+            # The grammar makes all three parts expressions, so the first
+            # and last only matter for errors they raise
+            self.compile_expression(statement.init)
+            self.emit(POP, 0, line)
+            start = self.here()
+            self.compile_expression(statement.condition)
+            exit_jump = self.emit(JUMP_IF_FALSE, 0, line)
+            self.compile_loop_body(statement.body)
+            self.compile_expression(statement.step)
+            self.emit(POP, 0, line)
+            self.emit(JUMP, start, line)
+            self.end_loop(exit_jump)
+        elif isinstance(statement, RespondwithStmt):
+            self.compile_expression(statement.value)
+            self.emit(RETURN, 0, line)
+        elif isinstance(statement, EndthisStmt):
+            if not self.loops:
+                raise CompileError(f"Line {line}: Endthis outside a loop")
+            self.loops[-1].append(self.emit(JUMP, 0, line))
+        elif isinstance(statement, FuncCall):
+            self.compile_call(statement)
+            self.emit(POP, 0, line)
+        elif isinstance(statement, ScanStmt):
+            # Scan has no cases in the grammar; only the variable is checked
+            self.compile_load(statement.name, line)
+            self.emit(POP, 0, line)
+        elif isinstance(statement, SrapStmt):
+            self.compile_expression(statement.value)
+            self.emit(POP, 0, line)
+        else:
+            raise CompileError(f"Line {line}: cannot compile {type(statement).__name__}")
+
+    def compile_block(self, block):
+        for statement in block.statements:
+            self.compile_statement(statement)
+
+    def compile_loop_body(self, block):
+        self.loops.append([])
+        self.compile_block(block)
+
+    def end_loop(self, exit_jump):
+        """Point the loop's exit and its Endthis jumps past the loop"""
+        end = self.here()
+        self.patch(exit_jump, end)
+        for jump in self.loops.pop():
+            self.patch(jump, end)
+
+    def compile_call(self, call):
+        function = self.module.functions[self.lookup_function(call.name, call.line)]
+        if len(call.args) != function.param_count:
+            raise CompileError(f"Line {call.line}: {call.name} takes {function.param_count} "
+                               f"arguments, got {len(call.args)}")
+        for arg in call.args:
+            self.compile_expression(arg)
+        self.emit(CALL, function.index, call.line)
+
+    def lookup_function(self, name, line):
+        index = self.module.function_index.get(name)
+        if index is None:
+            raise CompileError(f"Line {line}: unknown method {name}")
+        return index
+
+    def compile_load(self, name, line):
+        index = self.locals.get(name)
+        if index is not None:
+            self.emit(LOAD_LOCAL, index, line)
+            return
+        index = self.module.global_index.get(name)
+        if index is None:
+            raise CompileError(f"Line {line}: undeclared variable {name}")
+        self.emit(LOAD_GLOBAL, index, line)
+
+    def compile_store(self, name, line):
+        index = self.locals.get(name)
+        if index is not None:
+            self.emit(STORE_LOCAL, index, line)
+            return
+        index = self.module.global_index.get(name)
+        if index is None:
+            raise CompileError(f"Line {line}: undeclared variable {name}")
+        self.emit(STORE_GLOBAL, index, line)
+
+    def compile_const(self, value, line):
+        # Keyed by type too, so 1, 1.0 and True stay apart
+        key = (type(value), value)
+        index = self.const_index.get(key)
+        if index is None:
+            index = self.const_index[key] = len(self.function.consts)
+            self.function.consts.append(value)
+        self.emit(LOAD_CONST, index, line)
+
+    def compile_expression(self, expression):
+        # Left operands are compiled with an explicit stack so long operator
+        # chains, && and || included, cannot exhaust Python's recursion limit
+        pending = []  # BinaryOp nodes whose right operand is still to compile
+        node = expression
+        while isinstance(node, BinaryOp):
+            pending.append(node)
+            node = node.left
+        self.compile_operand(node)
+        while pending:
+            node = pending.pop()
+            if node.op in ('&&', '||'):
+                # The right side is evaluated only when the left does not decide
+                op = JUMP_IF_FALSE_OR_POP if node.op == '&&' else JUMP_IF_TRUE_OR_POP
+                jump = self.emit(op, 0, node.line)
+                self.compile_expression(node.right)
+                self.patch(jump, self.here())
+                continue
+            self.compile_expression(node.right)
+            if node.op not in BINARY_OPERATORS:
+                raise CompileError(f"Line {node.line}: unsupported operator {node.op}")
+            self.emit(BINARY, BINARY_OPERATORS.index(node.op), node.line)
+
+    def compile_operand(self, node):
+        line = node.line
+        if isinstance(node, Number):
+            self.compile_const(parse_number(node.text), line)
+        elif isinstance(node, Name):
+            self.compile_load(node.name, line)
+        else:
+            raise CompileError(f"Line {line}: cannot compile {type(node).__name__}")
+
+
+def compile_program(program):
+    """Compile a syntax.Program (Parser.ast_root) into a Module"""
+    return Compiler().compile_program(program)
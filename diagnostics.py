@@ -0,0 +1,137 @@
+import json
+from array import array
+
+# Diagnostic codes and their message templates; {text} is the offending text
+CODES = {
+    "S001": "Invalid token {text}",
+    "S002": "Unterminated string",
+    "S003": "Unterminated character literal",
+    "S004": "Unterminated multi-line comment",
+    "S005": "Incomplete Require statement",
+    "P001": "Unexpected {text}",
+    "P002": "Unexpected end of input",
+}
+CODE_LIST = tuple(CODES)
+CODE_IDS = {code: index for index, code in enumerate(CODE_LIST)}
+
+# Scanner error messages by code
+SCAN_CODES = {
+    "Invalid token": "S001",
+    "Unterminated string": "S002",
+    "Unterminated character literal": "S003",
+    "Unterminated multi-line comment": "S004",
+    "Incomplete Require statement": "S005",
+}
+
+
+class ErrorLimitReached(Exception):
+    """Raised when a DiagnosticCollector reaches its error cap, to stop compiling"""
+
+
+class Diagnostic:
+    """One diagnostic, as read back from a DiagnosticCollector"""
+    __slots__ = ('code', 'line', 'end_line', 'text', 'expected')
+
+    def __init__(self, code, line, end_line, text=None, expected=()):
+        self.code = code
+        self.line = line          # The span runs from line to end_line
+        self.end_line = end_line
+        self.text = text          # Offending source text, if any
+        self.expected = expected  # What the parser would have accepted instead
+
+    def __repr__(self):
+        return f"Diagnostic({self.code!r}, {self.line}, {self.end_line}, {self.text!r}, {self.expected!r})"
+
+    @property
+    def message(self):
+        text = self.text if self.text is not None else ''
+        if len(text) > 40:
+            text = text[:37] + '...'
+        message = CODES[self.code].format(text=repr(text))
+        if self.expected:
+            message += f", expected {' or '.join(self.expected)}"
+        return message
+
+    def as_dict(self):
+        return {'code': self.code, 'line': self.line, 'end_line': self.end_line,
+                'text': self.text, 'expected': list(self.expected), 'message': self.message}
+
+
+class DiagnosticCollector:
+    """Errors from scanning and parsing, stored column by column in arrays.
+
+    Each diagnostic costs a code id, two lines and two table ids; the
+    offending texts and expected sets are interned, and messages are only
+    built when the diagnostics are read. With max_errors, recording that
+    many errors raises ErrorLimitReached so the build stops there;
+    fail_fast is a cap of one.
+    """
+
+    def __init__(self, max_errors=None, fail_fast=False):
+        self.max_errors = 1 if fail_fast else max_errors
+        self.aborted = False  # Set by whoever catches ErrorLimitReached
+        self.codes = array('B')
+        self.lines = array('i')
+        self.end_lines = array('i')
+        self.text_ids = array('i')      # -1 for no text
+        self.expected_ids = array('i')
+        self.texts = []
+        self.text_index = {}
+        self.expected_sets = [()]
+        self.expected_index = {(): 0}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, code, line, end_line=None, text=None, expected=()):
+        """Record a diagnostic; raise ErrorLimitReached once the cap is reached"""
+        self.codes.append(CODE_IDS[code])
+        self.lines.append(line)
+        self.end_lines.append(line if end_line is None else end_line)
+        if text is None:
+            self.text_ids.append(-1)
+        else:
+            text_id = self.text_index.get(text)
+            if text_id is None:
+                text_id = self.text_index[text] = len(self.texts)
+                self.texts.append(text)
+            self.text_ids.append(text_id)
+        expected_id = self.expected_index.get(expected)
+        if expected_id is None:
+            expected_id = self.expected_index[expected] = len(self.expected_sets)
+            self.expected_sets.append(expected)
+        self.expected_ids.append(expected_id)
+        if self.max_errors is not None and len(self.codes) >= self.max_errors:
+            raise ErrorLimitReached(f"Stopped after {len(self.codes)} errors")
+
+    def add_scan_error(self, text, error_msg, end_line):
+        """Record a scanner error token whose text ends on end_line"""
+        self.add(SCAN_CODES.get(error_msg, "S001"), end_line - text.count('\n'), end_line, text)
+
+    def __getitem__(self, index):
+        text_id = self.text_ids[index]
+        return Diagnostic(CODE_LIST[self.codes[index]], self.lines[index], self.end_lines[index],
+                          self.texts[text_id] if text_id >= 0 else None,
+                          self.expected_sets[self.expected_ids[index]])
+
+    def __iter__(self):
+        for index in range(len(self.codes)):
+            yield self[index]
+
+    def counts(self):
+        """Number of diagnostics per code"""
+        totals = {}
+        for code_id in self.codes:
+            code = CODE_LIST[code_id]
+            totals[code] = totals.get(code, 0) + 1
+        return totals
+
+    def write_json(self, file):
+        """Write the diagnostics as one JSON object, streaming them one at a time"""
+        file.write('{"diagnostics": [')
+        for index, diagnostic in enumerate(self):
+            if index:
+                file.write(', ')
+            file.write(json.dumps(diagnostic.as_dict()))
+        file.write(f'], "error_count": {len(self)}, "counts": {json.dumps(self.counts())}, '
+                   f'"aborted": {json.dumps(self.aborted)}}}\n')
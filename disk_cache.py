@@ -0,0 +1,242 @@
+import gc
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+from parser import ParseTreeNode
+from tokens import Token
+from tracing import RULE_IDS, RuleTrace
+
+# Modules whose code decides the cached results, which is every module that
+# importing scanner loads; any change to them starts a new cache generation
+COMPILER_FILES = ("scanner.py", "parser.py", "grammar.py", "syntax.py", "arena.py", "tokens.py",
+                  "include_cache.py", "disk_cache.py", "diagnostics.py", "tracing.py")
+
+MAGIC = b"TKC1"
+# Counts: strings, string bytes, tokens, scanning errors, matched rules,
+# parsing errors, tree nodes, include dependencies, scan output string
+HEADER = struct.Struct("=4s9i")
+HEADER_SIZE = 48  # HEADER.size rounded up so the arrays after it stay aligned
+
+_compiler_version = None
+
+
+def compiler_version():
+    """Hash of the compiler sources, computed once per process"""
+    global _compiler_version
+    if _compiler_version is None:
+        digest = hashlib.sha1(MAGIC)
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in COMPILER_FILES:
+            with open(os.path.join(directory, name), 'rb') as file:
+                digest.update(file.read())
+        _compiler_version = digest.hexdigest()
+    return _compiler_version
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of path, or (-1, -1) if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return -1, -1
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CachedResult:
+    """Scanner and parser results for one source file"""
+    __slots__ = ('tokens', 'scan_errors', 'output', 'trace', 'parse_errors',
+                 'parse_tree_root', 'includes')
+
+    def __init__(self, tokens, scan_errors, output, trace, parse_errors,
+                 parse_tree_root, includes):
+        self.tokens = tokens
+        self.scan_errors = scan_errors
+        self.output = output                  # What the scanner printed while scanning
+        self.trace = trace                    # Full RuleTrace of the parse
+        self.parse_errors = parse_errors
+        self.parse_tree_root = parse_tree_root
+        self.includes = includes              # Resolved paths of the included files
+
+
+class DiskCache:
+    """Directory of scanned and parsed source files, reused across runs.
+
+    Entries are named by a hash of the source text, the scanning engine, the
+    working directory (include names are resolved against it) and the
+    compiler version. Each entry also records the mtime and size of every
+    file the source included, and is ignored once any of them changes.
+
+    An entry is one binary file: a header, the include stamps as int64
+    triples, then int32 arrays of string offsets, tokens (line, text, type,
+    error message), matched rules (line, rule) and tree nodes in preorder
+    (rule, token, child count, which is -1 for a bare True), and finally a
+    table of UTF-8 strings that all the arrays refer to by index (-1 for
+    none). Loading maps the file and reads the arrays in place.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, source_code, engine):
+        """Entry file for source_code scanned with engine"""
+        digest = hashlib.sha1(compiler_version().encode())
+        digest.update(f"\0{engine}\0{os.getcwd()}\0".encode('utf-8', 'surrogatepass'))
+        digest.update(source_code.encode('utf-8', 'surrogatepass'))
+        return os.path.join(self.directory, digest.hexdigest() + ".tkc")
+
+    def load(self, source_code, engine):
+        """Return the CachedResult for source_code, or None if there is no valid entry"""
+        try:
+            with open(self.path_for(source_code, engine), 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        # Decoding allocates objects by the million but frees none, so the
+        # collector's passes over them are wasted
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self.decode(data)
+        except (ValueError, TypeError, IndexError, KeyError, struct.error, UnicodeDecodeError):
+            # Truncated or otherwise damaged entry
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+            data.close()
+
+    def decode(self, data):
+        """Build a CachedResult from the mapped bytes of an entry"""
+        (magic, n_strings, n_bytes, n_tokens, scan_errors, n_rules, parse_errors,
+         n_nodes, n_includes, output_id) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            return None
+
+        view = memoryview(data)
+        try:
+            offset = HEADER_SIZE
+            stamps = view[offset:offset + 24 * n_includes].cast('q')
+            offset += 24 * n_includes
+            ints = view[offset:offset + 4 * (n_strings + 1 + 4 * n_tokens + 2 * n_rules + 3 * n_nodes)].cast('i')
+            offset += ints.nbytes
+            text = data[offset:offset + n_bytes]
+            try:
+                offsets = ints[:n_strings + 1].tolist()
+                strings = [text[offsets[k]:offsets[k + 1]].decode('utf-8', 'surrogatepass')
+                           for k in range(n_strings)]
+                strings.append(None)  # Index -1
+
+                # Any change to an included file invalidates the entry
+                includes = []
+                for k in range(0, 3 * n_includes, 3):
+                    path = strings[stamps[k]]
+                    if file_stamp(path) != (stamps[k + 1], stamps[k + 2]):
+                        return None
+                    includes.append(path)
+
+                # Slicing the array into Python lists first is much faster
+                # than indexing the mapped memory token by token
+                start = n_strings + 1
+                stop = start + 4 * n_tokens
+                lookup = strings.__getitem__
+                tokens = list(map(Token, ints[start:stop:4].tolist(),
+                                  map(lookup, ints[start + 1:stop:4].tolist()),
+                                  map(lookup, ints[start + 2:stop:4].tolist()),
+                                  map(lookup, ints[start + 3:stop:4].tolist())))
+                start, stop = stop, stop + 2 * n_rules
+                trace = RuleTrace()
+                add = trace.add_id
+                for line, rule in zip(ints[start:stop:2].tolist(), ints[start + 1:stop:2].tolist()):
+                    add(RULE_IDS[strings[rule]], line)
+                parse_tree_root = self.decode_tree(ints[stop:stop + 3 * n_nodes].tolist(), strings)
+            finally:
+                ints.release()
+                stamps.release()
+        finally:
+            view.release()
+
+        return CachedResult(tokens, scan_errors, strings[output_id], trace,
+                            parse_errors, parse_tree_root, includes)
+
+    def decode_tree(self, records, strings):
+        """Rebuild the parse tree from its preorder node records"""
+        root = None
+        stack = []  # [node, children still to attach]
+        for k in range(0, len(records), 3):
+            rule, token, count = records[k:k + 3]
+            if count < 0:
+                node = True
+            else:
+                node = ParseTreeNode(strings[rule], token=strings[token])
+            if stack:
+                parent = stack[-1]
+                parent[0].children.append(node)
+                parent[1] -= 1
+                if not parent[1]:
+                    stack.pop()
+            else:
+                root = node
+            if count > 0:
+                stack.append([node, count])
+        return root
+
+    def store(self, source_code, engine, result):
+        """Write result as the entry for source_code"""
+        strings = []
+        string_ids = {}
+
+        def string_id(value):
+            if value is None:
+                return -1
+            k = string_ids.get(value)
+            if k is None:
+                k = string_ids[value] = len(strings)
+                strings.append(value)
+            return k
+
+        stamps = array('q')
+        for path in result.includes:
+            stamps.extend((string_id(path), *file_stamp(path)))
+
+        records = array('i')
+        for token in result.tokens:
+            records.extend((token.line, string_id(token.text), string_id(token.type),
+                            string_id(token.error_msg)))
+        for line, rule in result.trace.entries():
+            records.extend((line, string_id(rule)))
+        n_nodes = 0
+        stack = [result.parse_tree_root] if result.parse_tree_root else []
+        while stack:
+            node = stack.pop()
+            n_nodes += 1
+            if not isinstance(node, ParseTreeNode):
+                # Rules such as Type add a bare True instead of a node
+                records.extend((-1, -1, -1))
+                continue
+            records.extend((string_id(node.rule), string_id(node.token), len(node.children)))
+            stack.extend(reversed(node.children))
+        output_id = string_id(result.output)
+
+        offsets = array('i', [0])
+        encoded = []
+        for value in strings:
+            encoded.append(value.encode('utf-8', 'surrogatepass'))
+            offsets.append(offsets[-1] + len(encoded[-1]))
+
+        header = HEADER.pack(MAGIC, len(strings), offsets[-1], len(result.tokens), result.scan_errors,
+                             len(result.trace), result.parse_errors, n_nodes,
+                             len(result.includes), output_id)
+        path = self.path_for(source_code, engine)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(header.ljust(HEADER_SIZE, b"\0"))
+            file.write(stamps.tobytes())
+            file.write(offsets.tobytes())
+            file.write(records.tobytes())
+            file.write(b"".join(encoded))
+        # Readers never see a partly written entry
+        os.replace(temp_path, path)
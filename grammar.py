@@ -0,0 +1,360 @@
+"""The language's grammar as data, with the sets and tables the Parser dispatches on.
+
+Every token is given an integer kind: each keyword and symbol the grammar
+spells out is a kind of its own, identifiers, constants and comments are
+one kind each, and anything else is OTHER. FIRST and FOLLOW sets of kinds
+are computed from the productions at import, along with the prediction
+tables that pick between the alternatives of a rule and the table of
+binary operators that Expression is parsed with.
+"""
+
+# One production per line. A line with alternatives separated by " | "
+# is reported as a whole when any of them matches; ε is the empty string.
+# Words that head a production are rules, the token classes below match by
+# token type, and any other word or symbol, or a quoted one, matches text.
+GRAMMAR = """
+Program -> Start_Symbols ClassDeclaration End_Symbols
+Start_Symbols -> @ | ^
+End_Symbols -> $ | #
+ClassDeclaration -> Type ID ClassBody
+ClassDeclaration -> Type ID DerivedFrom ID ClassBody
+ClassBody -> { ClassMembers }
+ClassMembers -> ClassMember ClassMembers
+ClassMembers -> ε
+ClassMember -> VariableDecl
+ClassMember -> MethodDecl
+ClassMember -> FuncCall
+ClassMember -> Comment
+ClassMember -> RequireCommand
+MethodDecl -> FuncDecl ;
+MethodDecl -> FuncDecl { VariableDecls Statements }
+FuncDecl -> Type ID ( ParameterList )
+ParameterList -> ε
+ParameterList -> Parameters
+Parameters -> Parameter
+Parameters -> Parameters , Parameter
+Parameter -> Type ID
+VariableDecl -> Type IDList ;
+VariableDecl -> Type IDList [ ID ] ;
+VariableDecls -> VariableDecl VariableDecls
+VariableDecls -> ε
+IDList -> ID
+IDList -> IDList , ID
+Statements -> Statement Statements
+Statements -> ε
+Statement -> Assignment
+Statement -> TrueForStmt
+Statement -> HoweverStmt
+Statement -> WhenStmt
+Statement -> RespondwithStmt
+Statement -> EndthisStmt
+Statement -> ScanStmt
+Statement -> SrapStmt
+Statement -> FuncCallStmt
+Assignment -> ID = Expression ;
+FuncCall -> ID ( ArgumentList ) ;
+FuncCallStmt -> FuncCall
+ArgumentList -> ε
+ArgumentList -> ArgumentSequence
+ArgumentSequence -> Expression
+ArgumentSequence -> ArgumentSequence , Expression
+TrueForStmt -> TrueFor ( ConditionExpression ) Block
+TrueForStmt -> TrueFor ( ConditionExpression ) Block TrueForElse Block
+TrueForElse -> Else
+HoweverStmt -> However ( ConditionExpression ) Block
+WhenStmt -> When ( Expression ; Expression ; Expression ) Block
+RespondwithStmt -> Respondwith Expression ;
+RespondwithStmt -> Respondwith ID ;
+EndthisStmt -> Endthis ;
+ScanStmt -> Scan ( Conditionof ID ) ;
+SrapStmt -> Srap ( Expression ) ;
+Block -> { Statements }
+ConditionExpression -> Expression
+Expression -> Factor
+Expression -> Expression LogicalOp Expression
+Expression -> Expression ComparisonOp Expression
+Expression -> Expression AddOp Expression
+Expression -> Expression MulOp Expression
+Expression -> Expression '->' ID
+LogicalOp -> && | || | ~
+ComparisonOp -> == | != | > | >= | < | <=
+AddOp -> + | -
+MulOp -> * | /
+Factor -> ID
+Factor -> Number
+Factor -> ( Expression )
+Comment -> COMMENT
+RequireCommand -> Require ( ID ) ;
+Type -> Ity | Sity | Cwq | CwqSequence | Ifity | Sifity | Valueless | Logical
+Type -> 'Type'
+"""
+
+# Productions reported under another name than the one written above
+RENAMED = {
+    "ClassDeclaration -> Type ID DerivedFrom ID ClassBody": "ClassDeclaration -> Type ID DerivedFrom ClassBody",
+    "FuncCallStmt -> FuncCall": "FuncCallStmt -> FuncCall ;",
+    "ScanStmt -> Scan ( Conditionof ID ) ;": "ScanStmt -> Scan(Conditionof ID) ;",
+    "Comment -> COMMENT": "Comment -> /< STR >/ | /* STR",
+    "RequireCommand -> Require ( ID ) ;": "RequireCommand -> Require ( F_name.txt ) ;",
+    "Type -> 'Type'": "Type -> Ity | Sity | Cwq | CwqSequence | Ifity | Sifity | Valueless | Logical",
+}
+
+# Binding power of the binary operators, loosest first. The operator
+# alternatives of Expression are ambiguous as written; these levels decide
+# them, and operators of one level associate to the left.
+PRECEDENCE = (
+    ("||", "~"),
+    ("&&",),
+    ("==", "!=", ">", ">=", "<", "<="),
+    ("+", "-"),
+    ("*", "/"),
+    ("->",),
+)
+
+# Terminals that match a token type rather than a text
+TOKEN_CLASSES = {"ID": "Identifier", "Number": "Constant", "COMMENT": "Comment"}
+
+END = 0    # Kind past the last token
+OTHER = 1  # Kind of tokens the grammar never names
+
+# Longest lookahead a prediction table may need
+MAX_LOOKAHEAD = 3
+
+# Key of a prediction table node's fallback entry
+FALLBACK = -1
+
+
+class GrammarError(Exception):
+    """Raised at import when the grammar is not predictable within MAX_LOOKAHEAD tokens"""
+
+
+class Production:
+    __slots__ = ('left', 'symbols', 'rule')
+
+    def __init__(self, left, symbols, rule):
+        self.left = left
+        self.symbols = symbols  # Rule names and terminal kinds
+        self.rule = rule        # Name the parser reports when it matches
+
+    def __repr__(self):
+        return f"Production({self.rule!r})"
+
+
+def read_grammar(text):
+    """Parse GRAMMAR into productions, numbering the terminals as they appear"""
+    lines = [line.split(" -> ") for line in text.strip().splitlines()]
+    rules = {left for left, _ in lines}
+    kind_names = ["end of input", "other"]
+    text_kinds = {}
+    type_kinds = {}
+    productions = []
+    for left, right in lines:
+        alternatives = right.split(" | ")
+        reported = f"{left} -> {right}"
+        for alternative in alternatives:
+            symbols = []
+            for word in alternative.split():
+                if word == "ε":
+                    continue
+                if word in rules:
+                    symbols.append(word)
+                    continue
+                if word in TOKEN_CLASSES:
+                    kinds, key, name = type_kinds, TOKEN_CLASSES[word], TOKEN_CLASSES[word]
+                else:
+                    key = word[1:-1] if len(word) > 2 and word[0] == word[-1] == "'" else word
+                    kinds, name = text_kinds, repr(key)
+                if key not in kinds:
+                    kinds[key] = len(kind_names)
+                    kind_names.append(name)
+                symbols.append(kinds[key])
+            written = f"{left} -> {alternative}"
+            rule = RENAMED.get(written, reported if len(alternatives) > 1 else written)
+            productions.append(Production(left, tuple(symbols), rule))
+    return productions, text_kinds, type_kinds, tuple(kind_names)
+
+
+PRODUCTIONS, TEXT_KINDS, TYPE_KINDS, KIND_NAMES = read_grammar(GRAMMAR)
+RULES = tuple(dict.fromkeys(production.left for production in PRODUCTIONS))
+
+
+def token_kind(token):
+    """Kind of a token, END for None"""
+    if token is None:
+        return END
+    return TEXT_KINDS.get(token.text) or TYPE_KINDS.get(token.type, OTHER)
+
+
+def token_kinds(tokens):
+    """Kinds of a list of tokens"""
+    text_kind = TEXT_KINDS.get
+    type_kind = TYPE_KINDS.get
+    return [text_kind(token.text) or type_kind(token.type, OTHER) for token in tokens]
+
+
+RULE_PRODUCTIONS = {rule: [production for production in PRODUCTIONS if production.left == rule]
+                    for rule in RULES}
+
+
+def shortest_lengths():
+    """Fewest tokens each rule can derive"""
+    shortest = dict.fromkeys(RULES, float('inf'))
+    changed = True
+    while changed:
+        changed = False
+        for production in PRODUCTIONS:
+            length = sum(shortest.get(symbol, 1) for symbol in production.symbols)
+            if length < shortest[production.left]:
+                shortest[production.left] = length
+                changed = True
+    return shortest
+
+
+SHORTEST = shortest_lengths()
+
+
+def sequence_first(symbols, first, k):
+    """The prefixes of at most k kinds that strings of symbols start with.
+
+    first maps (rule, j) to FIRST_j of the rule, for the j still needed
+    after each possible prefix.
+    """
+    prefixes = {()}
+    for symbol in symbols:
+        grown = set()
+        for prefix in prefixes:
+            remaining = k - len(prefix)
+            if not remaining:
+                grown.add(prefix)
+            elif symbol in RULE_PRODUCTIONS:
+                grown.update(prefix + option for option in first[symbol, remaining])
+            else:
+                grown.add(prefix + (symbol,))
+        prefixes = grown
+        if all(len(prefix) == k for prefix in prefixes):
+            break
+    return prefixes
+
+
+def first_sets(wanted):
+    """FIRST_k sets, keyed by (rule, k), of the wanted pairs and those they depend on.
+
+    () in a set marks the empty string. Only the lookahead a pair can
+    actually reach is computed: a rule read after other symbols needs at
+    most k minus their shortest length.
+    """
+    first = {}
+    stack = list(wanted)
+    while stack:
+        key = stack.pop()
+        if key in first:
+            continue
+        first[key] = set()
+        rule, k = key
+        for production in RULE_PRODUCTIONS[rule]:
+            before = 0
+            for position, symbol in enumerate(production.symbols):
+                if before >= k:
+                    break
+                if symbol in RULE_PRODUCTIONS:
+                    depths = range(1, k - before + 1) if position else (k,)
+                    stack.extend((symbol, depth) for depth in depths)
+                before += SHORTEST.get(symbol, 1)
+    changed = True
+    while changed:
+        changed = False
+        for (rule, k), target in first.items():
+            for production in RULE_PRODUCTIONS[rule]:
+                prefixes = sequence_first(production.symbols, first, k)
+                if not prefixes <= target:
+                    target |= prefixes
+                    changed = True
+    return first
+
+
+def follow_sets(first):
+    """FOLLOW of every rule from the FIRST_1 sets, with END following Program"""
+    follow = {rule: set() for rule in RULES}
+    follow[RULES[0]].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for production in PRODUCTIONS:
+            symbols = production.symbols
+            for position, symbol in enumerate(symbols):
+                if symbol not in follow:
+                    continue
+                rest = sequence_first(symbols[position + 1:], first, 1)
+                kinds = {prefix[0] for prefix in rest if prefix}
+                if () in rest:
+                    kinds |= follow[production.left]
+                if not kinds <= follow[symbol]:
+                    follow[symbol] |= kinds
+                    changed = True
+    return follow
+
+
+_FIRST_1 = first_sets((rule, 1) for rule in RULES)
+FIRST = {rule: frozenset(prefix[0] for prefix in _FIRST_1[rule, 1] if prefix) for rule in RULES}
+NULLABLE = frozenset(rule for rule in RULES if () in _FIRST_1[rule, 1])
+FOLLOW = {rule: frozenset(kinds) for rule, kinds in follow_sets(_FIRST_1).items()}
+
+
+def operator_table():
+    """Map the kind of each binary operator to (binding power, Expression production).
+
+    The operator is the middle symbol of a three-symbol Expression
+    alternative, or any terminal of the rule found there.
+    """
+    powers = {TEXT_KINDS[text]: power for power, level in enumerate(PRECEDENCE, 1) for text in level}
+    operators = {}
+    for production in RULE_PRODUCTIONS["Expression"]:
+        if len(production.symbols) != 3:
+            continue
+        operator = production.symbols[1]
+        for kind in FIRST[operator] if operator in RULE_PRODUCTIONS else (operator,):
+            if kind not in powers:
+                raise GrammarError(f"Operator {KIND_NAMES[kind]} has no precedence")
+            operators[kind] = (powers[kind], production)
+    return operators
+
+
+OPERATORS = operator_table()
+
+
+def prediction_table(rule, action, fallback=None):
+    """Table choosing the alternative of rule to parse from the next tokens.
+
+    The table maps the current token's kind to action(production), or,
+    where alternatives share that kind, to a table for the next token's
+    kind, and so on. Each alternative is chosen as soon as no other one
+    fits. A node also maps FALLBACK to the action of the alternative
+    headed by fallback, if that is still a candidate there, for when the
+    lookahead matches no alternative.
+    """
+    first = first_sets([(rule, MAX_LOOKAHEAD)])
+    candidates = {production: sequence_first(production.symbols, first, MAX_LOOKAHEAD)
+                  for production in RULE_PRODUCTIONS[rule]}
+
+    def build(candidates, depth):
+        groups = {}
+        for production, prefixes in candidates.items():
+            for prefix in prefixes:
+                if len(prefix) <= depth:
+                    raise GrammarError(f"{rule} is not predictable: {production.rule} can end "
+                                       f"after {depth} tokens")
+                groups.setdefault(prefix[depth], {}).setdefault(production, set()).add(prefix)
+        node = {}
+        for kind, group in groups.items():
+            if len(group) == 1:
+                node[kind] = action(next(iter(group)))
+            elif depth + 1 < MAX_LOOKAHEAD:
+                node[kind] = build(group, depth + 1)
+            else:
+                raise GrammarError(f"{rule} needs more than {MAX_LOOKAHEAD} tokens of lookahead")
+        for production in candidates if depth else ():
+            if production.symbols[:1] == (fallback,):
+                node[FALLBACK] = action(production)
+        return node
+
+    return build(candidates, 0)
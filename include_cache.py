@@ -0,0 +1,87 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+
+class IncludeCache:
+    """Process-wide cache of lexed include files.
+
+    Files are looked up by resolved path; a path whose mtime and size are
+    unchanged maps straight to the content hash it had last time, so a hit
+    costs one stat call. Lexed entries are stored by content hash and engine,
+    which lets copies of a file under different paths share one entry. The
+    least recently used entries are evicted once the cached token count
+    exceeds max_tokens, and the least recently used paths once there are
+    more than max_paths of them.
+    """
+
+    def __init__(self, max_tokens=1000000, max_paths=10000):
+        self.max_tokens = max_tokens
+        self.max_paths = max_paths
+        self.paths = OrderedDict()     # path -> ((mtime_ns, size), digest)
+        self.entries = OrderedDict()   # (digest, engine) -> segments
+        self.sizes = {}                # (digest, engine) -> token count
+        self.token_count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, engine, lex):
+        """Return the lexed segments of the file at path.
+
+        On a miss the file is read and passed to lex, which returns its
+        segments. Raises FileNotFoundError (or another OSError) like open().
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        known = self.paths.get(path)
+        if known is not None and known[0] == stamp:
+            self.paths.move_to_end(path)
+            key = (known[1], engine)
+            segments = self.entries.get(key)
+            if segments is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return segments
+
+        with open(path, 'r') as file:
+            source_code = file.read()
+        digest = hashlib.sha1(source_code.encode('utf-8', 'surrogatepass')).hexdigest()
+        self.paths[path] = (stamp, digest)
+        self.paths.move_to_end(path)
+        if len(self.paths) > self.max_paths:
+            self.paths.popitem(last=False)
+
+        key = (digest, engine)
+        segments = self.entries.get(key)
+        if segments is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return segments
+
+        self.misses += 1
+        segments = lex(source_code)
+        self.store(key, segments)
+        return segments
+
+    def store(self, key, segments):
+        """Add an entry, evicting the least recently used ones over the size cap"""
+        size = sum(len(segment[0]) for segment in segments)
+        if size > self.max_tokens:
+            return
+        self.entries[key] = segments
+        self.sizes[key] = size
+        self.token_count += size
+        while self.token_count > self.max_tokens:
+            old_key, _ = self.entries.popitem(last=False)
+            self.token_count -= self.sizes.pop(old_key)
+
+    def clear(self):
+        """Drop every cached file"""
+        self.paths.clear()
+        self.entries.clear()
+        self.sizes.clear()
+        self.token_count = 0
+
+
+# Shared by every Scanner unless one is given its own cache (or None)
+shared_cache = IncludeCache()
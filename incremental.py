@@ -0,0 +1,199 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from grammar import token_kinds
+from parser import MemberParse, Parser
+from scanner import Scanner
+from tracing import shift_lines
+
+
+class TokenChange:
+    """Describes how an edit changed the token list of an IncrementalScanner"""
+    __slots__ = ('start', 'old_stop', 'new_stop', 'line_shift')
+
+    def __init__(self, start, old_stop, new_stop, line_shift):
+        self.start = start          # First token that was re-lexed
+        self.old_stop = old_stop    # End of the replaced tokens in the old list
+        self.new_stop = new_stop    # End of the re-lexed tokens in the new list
+        self.line_shift = line_shift  # Added to the line of every token after new_stop
+
+    def __repr__(self):
+        return (f"TokenChange(start={self.start}, old_stop={self.old_stop}, "
+                f"new_stop={self.new_stop}, line_shift={self.line_shift})")
+
+
+class IncrementalScanner:
+    """Keeps the token list of a source file current across text edits.
+
+    The fast engine is run in chunks ending at line ends. After each chunk the
+    scanner state (position, line counter, token count, included files) is
+    saved as a checkpoint. An edit re-lexes from the last checkpoint before it
+    until the scanner reaches an old checkpoint behind the edit in the same
+    state; from there on the old tokens are kept and only their lines shifted.
+    """
+    CHUNK_SIZE = 1024
+
+    def __init__(self, source_code):
+        self.scanner = Scanner()
+        self.source_code = source_code
+        self.tokens = []
+        self.error_count = 0
+        self.offsets = array('q')
+        self.lines = array('q')
+        self.counts = array('q')
+        self.includes = []
+
+        self.add_checkpoint(0, frozenset())
+        self.tokens, self.error_count, _ = self.relex(0)
+
+    def add_checkpoint(self, offset, includes):
+        """Record the scanner state at offset"""
+        self.offsets.append(offset)
+        self.lines.append(self.scanner.line_num)
+        self.counts.append(len(self.tokens) + len(self.scanner.tokens))
+        self.includes.append(includes)
+
+    def relex(self, start, old_offsets=None, old_includes=None, sync_from=0, delta=0):
+        """Scan from start, adding checkpoints, until reaching an old checkpoint.
+
+        Old checkpoints at or after sync_from (old coordinates) are candidates
+        for resynchronising; they sit delta characters later in the new text.
+        Returns the new tokens, their error count and the index of the old
+        checkpoint the scan stopped at (or None if it ran to the end).
+        """
+        scanner = self.scanner
+        source_code = self.source_code
+        scanner.tokens = []
+        scanner.error_count = 0
+        includes = frozenset(scanner.included_files)
+        k = bisect_left(old_offsets, sync_from) if old_offsets is not None else 0
+        i = start
+
+        while i < len(source_code):
+            i = scanner.scan_fast(source_code, i, i + self.CHUNK_SIZE)
+            if len(scanner.included_files) != len(includes):
+                includes = frozenset(scanner.included_files)
+
+            if old_offsets is not None:
+                while k < len(old_offsets) and old_offsets[k] + delta < i:
+                    k += 1
+                if (k < len(old_offsets) and old_offsets[k] + delta == i
+                        and old_includes[k] == includes):
+                    return scanner.tokens, scanner.error_count, k
+
+            # Only line starts are safe restart points: a chunk may also stop
+            # inside a word, and unterminated literals or comments stop at or
+            # just before the end of the text
+            if i < len(source_code) - 1 and source_code[i - 1] == '\n':
+                self.add_checkpoint(i, includes)
+
+        return scanner.tokens, scanner.error_count, None
+
+    def edit(self, offset, removed_length, inserted_text):
+        """Replace removed_length characters at offset with inserted_text and re-lex.
+
+        Returns a TokenChange describing which tokens were replaced.
+        """
+        old_source = self.source_code
+        if offset < 0 or offset + removed_length > len(old_source):
+            raise ValueError("Edit is outside the source code")
+        self.source_code = old_source[:offset] + inserted_text + old_source[offset + removed_length:]
+        delta = len(inserted_text) - removed_length
+
+        # Restart at the last checkpoint before the edit
+        restart = bisect_right(self.offsets, offset) - 1
+        old_offsets = self.offsets
+        old_lines = self.lines
+        old_counts = self.counts
+        old_includes = self.includes
+        old_tokens = self.tokens
+        start = old_counts[restart]
+
+        self.offsets = old_offsets[:restart + 1]
+        self.lines = old_lines[:restart + 1]
+        self.counts = old_counts[:restart + 1]
+        self.includes = old_includes[:restart + 1]
+        self.tokens = old_tokens[:start]
+        self.scanner.line_num = old_lines[restart]
+        self.scanner.included_files = set(old_includes[restart])
+
+        # A checkpoint only counts as unchanged if the character before it was not edited
+        new_tokens, new_errors, sync = self.relex(
+            old_offsets[restart], old_offsets, old_includes, offset + removed_length + 1, delta)
+        self.tokens.extend(new_tokens)
+        new_stop = len(self.tokens)
+
+        if sync is None:
+            old_stop = len(old_tokens)
+            line_shift = 0
+        else:
+            old_stop = old_counts[sync]
+            line_shift = self.scanner.line_num - old_lines[sync]
+            count_shift = new_stop - old_stop
+            for k in range(sync, len(old_offsets)):
+                self.offsets.append(old_offsets[k] + delta)
+                self.lines.append(old_lines[k] + line_shift)
+                self.counts.append(old_counts[k] + count_shift)
+            self.includes.extend(old_includes[sync:])
+
+            kept = old_tokens[old_stop:]
+            if line_shift:
+                for token in kept:
+                    token.line += line_shift
+            self.tokens.extend(kept)
+            self.scanner.line_num = self.lines[-1]
+            self.scanner.included_files = set(self.includes[-1])
+
+        removed_errors = sum(1 for token in old_tokens[start:old_stop] if token.type == 'ERROR')
+        self.error_count += new_errors - removed_errors
+        return TokenChange(start, old_stop, new_stop, line_shift)
+
+
+class IncrementalParser:
+    """Re-parses the tokens of an IncrementalScanner after each edit.
+
+    Class members whose tokens lie outside the re-lexed range are reused
+    rather than parsed again. The range a member depends on starts one token
+    early, since its first matched rule takes the line of the token before
+    it, and ends at the furthest token its parse looked at.
+
+    A reused member's part of the trace is linked into the new trace, with
+    its line shift, rather than copied. The grammar kinds of the tokens are
+    kept and only the re-lexed range is classified again. So an edit costs
+    the tokens re-lexed and the members parsed again, plus a step per member
+    of the class. Two parts remain linear in the file, both in C or a tight
+    loop: splicing the token and kind lists, and, when the edit adds or
+    removes lines, shifting the line of every later token.
+    """
+
+    def __init__(self, source_code):
+        self.scanner = IncrementalScanner(source_code)
+        self.kinds = token_kinds(self.scanner.tokens)
+        self.parser = self.parse({})
+
+    def parse(self, reuse):
+        """Parse the current tokens, taking over the members in reuse"""
+        parser = Parser(self.scanner.tokens, reuse, kinds=self.kinds)
+        parser.parse()
+        return parser
+
+    def edit(self, offset, removed_length, inserted_text):
+        """Apply a text edit and return the new Parser"""
+        change = self.scanner.edit(offset, removed_length, inserted_text)
+        relexed = self.scanner.tokens[change.start:change.new_stop]
+        self.kinds[change.start:change.old_stop] = token_kinds(relexed)
+        index_shift = change.new_stop - change.old_stop
+        reuse = {}
+        for member in self.parser.members:
+            if member.reach < change.start:
+                reuse[member.start] = member
+            elif member.start > change.old_stop:
+                rules = member.rules
+                if change.line_shift:
+                    rules = shift_lines(rules, change.line_shift)
+                reuse[member.start + index_shift] = MemberParse(
+                    member.start + index_shift, member.stop + index_shift,
+                    member.reach + index_shift, member.node, rules, member.errors,
+                    member.error_at_stop)
+        self.parser = self.parse(reuse)
+        return self.parser
@@ -0,0 +1,195 @@
+from bytecode import BINARY_OPERATORS, BINARY_OPS, parse_number
+from semantic import INTEGER_TYPES, NUMERIC_TYPES, Analyzer
+from syntax import (Assignment, BinaryOp, FuncCall, HoweverStmt, MethodDecl, Name, Number,
+                    RespondwithStmt, SrapStmt, TrueForStmt, WhenStmt)
+
+OPERATORS = dict(zip(BINARY_OPERATORS, BINARY_OPS))
+ARITHMETIC = ('+', '-', '*', '/')
+
+
+def count_nodes(node):
+    if isinstance(node, (Name, Number)):
+        return 1
+    return sum(1 for _ in node.walk())
+
+
+def number_text(value):
+    """Source text for a folded value, or None if a Constant cannot spell it"""
+    if type(value) is bool:
+        return '1' if value else '0'
+    if type(value) is int:
+        return str(value)
+    text = repr(value)
+    return text if '.' in text and 'e' not in text else None  # Skips inf, nan and exponents
+
+
+def constant_value(node):
+    """Value of a Number node, or None for any other node"""
+    return parse_number(node.text) if isinstance(node, Number) else None
+
+
+def has_division(node):
+    """Whether evaluating node divides, which can fail"""
+    return isinstance(node, BinaryOp) and any(isinstance(sub, BinaryOp) and sub.op == '/'
+                                               for sub in node.walk())
+
+
+class ConstantFolder:
+    """Simplifies the expressions of a syntax tree in place.
+
+    Constant subexpressions are evaluated with the VM's operator semantics.
+    The identities x*1, 1*x, x/1 and x-0 reduce to x when x is numeric,
+    x+0 and 0+x only when x is an integer (for a float, -0.0 + 0 is 0.0),
+    and x*0, 0*x reduce to 0 when x is an integer whose evaluation cannot
+    fail on a division. The type of x is the one semantic.Analyzer proves
+    from the declarations, so the identities are only used in programs it
+    finds no issues in, and they only fire for integer constants, so x*1.0
+    keeps the float result the VM would give. In conditions, whose values
+    only matter for their truth, comparisons and && / || on constants fold
+    as well, and TrueFor and However statements whose condition folds to a
+    constant lose their dead branch. eliminated counts the nodes removed.
+    """
+
+    def __init__(self):
+        self.eliminated = 0
+        self.analyzer = None  # Types operands for the identities, if the program checks clean
+        self.scope = None     # Scope of the names in the expressions being folded
+
+    def fold_program(self, program):
+        """Fold every method and call of a Program and return the number of nodes eliminated"""
+        class_decl = program.declaration
+        if class_decl is None or class_decl.members is None:
+            return self.eliminated
+        analyzer = Analyzer()
+        if not analyzer.analyze(program):
+            self.analyzer = analyzer
+        for member in class_decl.members:
+            if isinstance(member, MethodDecl):
+                if member.body is not None:
+                    self.scope = analyzer.method_scope(member) if self.analyzer else None
+                    self.fold_statements(member.body)
+            elif isinstance(member, FuncCall):
+                self.scope = analyzer.class_scope
+                member.args = [self.fold_expression(arg) for arg in member.args]
+        return self.eliminated
+
+    def operand_type(self, node):
+        """Type of node as the analyzer proves it, or None"""
+        if self.analyzer is None:
+            return None
+        return self.analyzer.expression_type(self.scope, node)
+
+    def fold_statements(self, statements):
+        """Fold a statement list in place, splicing in the live branch of constant TrueFors"""
+        result = []
+        for statement in statements:
+            if isinstance(statement, Assignment):
+                statement.value = self.fold_expression(statement.value)
+            elif isinstance(statement, (RespondwithStmt, SrapStmt)):
+                statement.value = self.fold_expression(statement.value)
+            elif isinstance(statement, FuncCall):
+                statement.args = [self.fold_expression(arg) for arg in statement.args]
+            elif isinstance(statement, TrueForStmt):
+                statement.condition = self.fold_expression(statement.condition, condition=True)
+                self.fold_statements(statement.body.statements)
+                if statement.else_body is not None:
+                    self.fold_statements(statement.else_body.statements)
+                value = constant_value(statement.condition)
+                if value is not None:
+                    live = statement.body if value else statement.else_body
+                    kept = live.statements if live is not None else []
+                    self.eliminated += count_nodes(statement) - sum(map(count_nodes, kept))
+                    result.extend(kept)
+                    continue
+            elif isinstance(statement, HoweverStmt):
+                statement.condition = self.fold_expression(statement.condition, condition=True)
+                self.fold_statements(statement.body.statements)
+                value = constant_value(statement.condition)
+                if value is not None and not value:
+                    self.eliminated += count_nodes(statement)
+                    continue
+            elif isinstance(statement, WhenStmt):
+                statement.init = self.fold_expression(statement.init)
+                statement.condition = self.fold_expression(statement.condition, condition=True)
+                statement.step = self.fold_expression(statement.step)
+                self.fold_statements(statement.body.statements)
+            result.append(statement)
+        statements[:] = result
+
+    def fold_expression(self, expression, condition=False):
+        """Return the folded form of an expression"""
+        # Operator chains nest down their left operands, so those are
+        # walked with a loop; only right operands recurse, as deep as the
+        # parser itself did
+        pending = []
+        node = expression
+        while isinstance(node, BinaryOp):
+            pending.append(node)
+            node = node.left
+        result = node
+        while pending:
+            node = pending.pop()
+            node.left = result
+            if isinstance(node.right, BinaryOp):
+                node.right = self.fold_expression(node.right, condition)
+            result = self.simplify(node, condition)
+        return result
+
+    def replace(self, node, value):
+        """A Number for value spanning node, or node itself if value has no Constant text"""
+        text = number_text(value)
+        if text is None:
+            return node
+        number = Number(text)
+        number.first, number.last = node.first, node.last
+        self.eliminated += count_nodes(node.left) + count_nodes(node.right)
+        return number
+
+    def keep(self, node, operand):
+        """Reduce node to one of its operands"""
+        dropped = node.right if operand is node.left else node.left
+        self.eliminated += 1 + count_nodes(dropped)
+        return operand
+
+    def simplify(self, node, condition):
+        op, left, right = node.op, node.left, node.right
+        left_value, right_value = constant_value(left), constant_value(right)
+
+        if left_value is not None and right_value is not None:
+            if op in ARITHMETIC or (condition and op in OPERATORS):
+                try:
+                    return self.replace(node, OPERATORS[op](left_value, right_value))
+                except (ZeroDivisionError, OverflowError):
+                    return node  # Left for the VM to report
+        if condition and op in ('&&', '||'):
+            # Only truth matters here, so a constant side decides or drops out
+            for value, other in ((left_value, right), (right_value, left)):
+                if value is not None:
+                    if bool(value) == (op == '||'):
+                        return self.replace(node, value)
+                    return self.keep(node, other)
+            return node
+
+        # An identity needs an integer constant on one side and an operand
+        # of a proven type on the other
+        if type(right_value) is int:
+            constant, operand = right_value, left
+        elif type(left_value) is int and op in ('*', '+'):
+            constant, operand = left_value, right
+        else:
+            return node
+        if op == '*' and constant == 0:
+            if self.operand_type(operand) in INTEGER_TYPES and not has_division(operand):
+                return self.replace(node, 0)
+        elif (op, constant) in (('*', 1), ('/', 1), ('-', 0)):
+            if self.operand_type(operand) in NUMERIC_TYPES:
+                return self.keep(node, operand)
+        elif (op, constant) == ('+', 0):
+            if self.operand_type(operand) in INTEGER_TYPES:
+                return self.keep(node, operand)
+        return node
+
+
+def fold_constants(program):
+    """Fold the constants of a Program in place and return the number of nodes eliminated"""
+    return ConstantFolder().fold_program(program)
@@ -1,3 +1,37 @@
+import io
+
+from arena import ArenaNode, TreeArena
+from grammar import (END, FALLBACK, FIRST, FOLLOW, KIND_NAMES, OPERATORS, TEXT_KINDS, TYPE_KINDS,
+                     prediction_table, token_kind, token_kinds)
+from syntax import (Assignment, BinaryOp, Block, ClassDecl, Comment, EndthisStmt, FuncCall,
+                    HoweverStmt, MethodDecl, Name, Number, Param, Program, RequireCommand,
+                    RespondwithStmt, ScanStmt, SrapStmt, TrueForStmt, VariableDecl, WhenStmt)
+from tracing import NOT_MATCHED, TRACE_COUNTS, TRACE_FULL, TRACE_OFF, RuleTrace
+
+
+# Token kinds the Parser tests against, from the grammar
+TYPE_START = FIRST["Type"]
+VARIABLE_DECL_START = FIRST["VariableDecl"]
+# Lists stop, and ε alternatives apply, at what follows them or the end of input
+CLASS_MEMBERS_END = FOLLOW["ClassMembers"] | {END}
+STATEMENTS_END = FOLLOW["Statements"] | {END}
+PARAMETER_LIST_END = FOLLOW["ParameterList"] | {END}
+ARGUMENT_LIST_END = FOLLOW["ArgumentList"] | {END}
+IDENTIFIER = TYPE_KINDS["Identifier"]
+CONSTANT = TYPE_KINDS["Constant"]
+OPEN_PAREN = TEXT_KINDS['(']
+OPEN_BRACE = TEXT_KINDS['{']
+CLOSE_BRACE = TEXT_KINDS['}']
+SEMICOLON = TEXT_KINDS[';']
+METHOD_BODY_START = VARIABLE_DECL_START | FIRST["Statements"]
+# Where panic-mode recovery resumes after a failed construct: at a token
+# that ends one or can only start the next. Identifiers start statements
+# and members too, but just as often sit in the middle of a broken one.
+PROGRAM_SYNC = FIRST["Program"] | {END}
+MEMBER_SYNC = (FIRST["ClassMember"] - {IDENTIFIER}) | {SEMICOLON, CLOSE_BRACE, END}
+STATEMENT_SYNC = (FIRST["Statement"] - {IDENTIFIER}) | TYPE_START | {SEMICOLON, CLOSE_BRACE, END}
+
+
 class ParseTreeNode:
     def __init__(self, rule, children=None, token=None):
         self.rule = rule
@@ -5,55 +39,246 @@ class ParseTreeNode:
         self.token = token
 
     def __repr__(self, level=0):
-        indent = '  ' * level
-        s = f"{indent}{self.rule}"
-        if self.token:
-            s += f" (Token: {self.token})"
-        s += '\n'
-        for child in self.children:
-            if isinstance(child, ParseTreeNode):
-                s += child.__repr__(level + 1)
+        out = io.StringIO()
+        self.write(out, level)
+        return out.getvalue()
+
+    def walk(self, level=0):
+        """Yield (node, depth) for the tree in preorder, without recursion.
+
+        Rules such as Type add a bare True child instead of a node; it is
+        yielded like a node with no children.
+        """
+        stack = [(self, level)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            if isinstance(node, ParseTreeNode):
+                stack.extend((child, depth + 1) for child in reversed(node.children))
+
+    def write(self, file, level=0):
+        """Write the indented tree to a file-like object one line at a time"""
+        for node, depth in self.walk(level):
+            indent = '  ' * depth
+            if not isinstance(node, ParseTreeNode):
+                file.write(f"{indent}{node}\n")
+            elif node.token:
+                file.write(f"{indent}{node.rule} (Token: {node.token})\n")
             else:
-                s += f"{indent}  {child}\n"
-        return s
+                file.write(f"{indent}{node.rule}\n")
+
+def parse_tree(program):
+    """Build the ParseTreeNode view of a Program syntax node"""
+    children = [ParseTreeNode("Start_Symbols", token=program.start_symbol)]
+    class_decl = program.declaration
+    if class_decl is not None:
+        # The Type rule adds a bare True to the tree
+        decl_children = [True, ParseTreeNode("ID", token=class_decl.name)]
+        if class_decl.base is not None:
+            decl_children.append(ParseTreeNode("ID", token=class_decl.base))
+        if class_decl.members is not None:
+            body = ParseTreeNode("ClassBody")
+            if class_decl.members:
+                # Members appear as leaves named after their syntax node class
+                body.children.append(ParseTreeNode(
+                    "ClassMembers", [ParseTreeNode(type(member).__name__) for member in class_decl.members]))
+            decl_children.append(body)
+        children.append(ParseTreeNode("ClassDeclaration", decl_children))
+    if program.end_symbol is not None:
+        children.append(ParseTreeNode("End_Symbols", token=program.end_symbol))
+    return ParseTreeNode("Program", children)
+
+
+class TokenBuffer:
+    """Sliding window over a token iterator so the parser can run while scanning.
+
+    Tokens are pulled on demand and all but the last few tokens before the
+    parser's position are dropped, since the parser never rewinds.
+    """
+    LOOKBEHIND = 4
+    TRIM_SIZE = 256
+
+    def __init__(self, tokens):
+        self.source = iter(tokens)
+        self.window = []
+        self.base = 0  # Index of window[0] in the whole token stream
+
+    def __getitem__(self, index):
+        offset = index - self.base
+        window = self.window
+        if 0 <= offset < len(window):
+            return window[offset]
+        while offset >= len(window):
+            token = next(self.source, None)
+            if token is None:
+                raise IndexError(index)
+            window.append(token)
+            if len(window) > self.TRIM_SIZE * 2:
+                self.trim(index)
+                offset = index - self.base
+        if offset < 0:
+            raise IndexError(f"token {index} is no longer buffered")
+        return window[offset]
+
+    def trim(self, index):
+        """Drop tokens the parser can no longer reach from index"""
+        floor = index - self.LOOKBEHIND
+        if floor - self.base >= self.TRIM_SIZE:
+            del self.window[:floor - self.base]
+            self.base = floor
+
+
+class BufferedKinds:
+    """Kinds of a TokenBuffer's tokens, computed as the parser reads them"""
+    __slots__ = ('tokens',)
 
-class Parser:
     def __init__(self, tokens):
         self.tokens = tokens
+
+    def __getitem__(self, index):
+        return token_kind(self.tokens[index])
+
+
+class MemberParse:
+    """Result of parsing one class member, kept so an incremental parse can reuse it"""
+    __slots__ = ('start', 'stop', 'reach', 'node', 'rules', 'errors', 'error_at_stop')
+
+    def __init__(self, start, stop, reach, node, rules, errors, error_at_stop=False):
+        self.start = start    # Index of the member's first token
+        self.stop = stop      # Index of the token after the member
+        self.reach = reach    # Index of the furthest token parsing the member looked at
+        self.node = node
+        self.rules = rules    # Segment of the trace the member added
+        self.errors = errors  # Errors the member added
+        self.error_at_stop = error_at_stop  # Whether its last error was at stop
+
+
+def ignore_rule(rule):
+    """Parser.add_matched_rule with tracing off"""
+
+
+class Parser:
+    def __init__(self, tokens, reuse=None, arena=False, diagnostics=None, trace=TRACE_FULL, kinds=None):
+        # A list is indexed directly, with the grammar kinds of its tokens
+        # found up front unless given as kinds; any other iterable is read lazily
+        if isinstance(tokens, (list, tuple)):
+            self.kinds = token_kinds(tokens) if kinds is None else kinds
+        else:
+            tokens = TokenBuffer(tokens)
+            self.kinds = BufferedKinds(tokens)
+        self.tokens = tokens
         self.index = 0
         self.current_token = None
+        self.kind = END  # Grammar kind of the current token
+        self.peeked = 0  # Furthest index looked at ahead of the current token
         self.error_count = 0
-        self.matched_rules = []
-        self.parse_tree_root = None  # Store the root of the parse tree
+        self.error_index = -1  # Index of the last error, which is reported once
+        # Matched rules and errors, kept as far as the tracing level asks. Rules
+        # are reported all over the parse, so below TRACE_FULL, which alone
+        # needs their lines, the report goes straight to the trace or nowhere
+        self.trace = RuleTrace(trace)
+        if trace == TRACE_COUNTS:
+            self.add_matched_rule = self.trace.count
+        elif trace == TRACE_OFF:
+            self.add_matched_rule = ignore_rule
+        self._parse_tree_root = None  # Built from ast_root when first asked for
+        self.ast_root = None  # Syntax tree (a syntax.Program) of the first program
+        # Store the parse tree in a TreeArena filled in while parsing instead
+        # of ParseTreeNode objects. No syntax tree is kept then: ast_root stays
+        # None and each member's syntax nodes are dropped once it is in the
+        # arena, so the parse holds the arena and the member being parsed
+        self.arena = arena
+        self.tree = None  # The TreeArena while the first program is parsed
+        self.tree_decl = self.tree_body = self.tree_members = -1  # Parents of the nodes to come
+
+        # With reuse (start index -> MemberParse), class members starting at a
+        # known index are taken over instead of parsed, and every member
+        # parsed is recorded in self.members for the next incremental parse
+        self.reuse = reuse
+        self.members = [] if reuse is not None else None
+
+        # Errors also go to a diagnostics.DiagnosticCollector when given one,
+        # with what the failed matches at the error's token expected
+        self.diagnostics = diagnostics
+        self.expected = []
+        self.expected_index = -1
         
         # Initialize with first token if available
-        if tokens:
-            self.current_token = tokens[0]
+        self.current_token = self.token_at(0)
+        self.kind = self.kind_at(0)
+
+    def token_at(self, index):
+        """Return the token at index, or None past the end of the input"""
+        if index > self.peeked:
+            self.peeked = index
+        try:
+            return self.tokens[index]
+        except IndexError:
+            return None
+
+    def kind_at(self, index):
+        """Return the grammar kind of the token at index, END past the end of the input"""
+        if index > self.peeked:
+            self.peeked = index
+        try:
+            return self.kinds[index]
+        except IndexError:
+            return END
 
     def advance(self):
         """Move to the next token"""
+        # token_at and kind_at, inlined since every token passes through here
         self.index += 1
-        if self.index < len(self.tokens):
+        try:
             self.current_token = self.tokens[self.index]
-        else:
+            self.kind = self.kinds[self.index]
+        except IndexError:
             self.current_token = None
+            self.kind = END
 
     def match(self, token_type=None, token_text=None):
         """Match the current token against expected type or text"""
         if not self.current_token:
+            if self.diagnostics is not None:
+                self.note_expected(repr(token_text) if token_text else token_type)
             return False
             
         matches = True
-        if token_type and self.current_token['type'] != token_type:
+        if token_type and self.current_token.type != token_type:
             matches = False
-        if token_text and self.current_token['text'] != token_text:
+        if token_text and self.current_token.text != token_text:
             matches = False
             
         if matches:
             self.advance()
             return True
+        if self.diagnostics is not None:
+            self.note_expected(repr(token_text) if token_text else token_type)
         return False
 
+    def note_expected(self, expected):
+        """Remember something the current token failed to match"""
+        if self.expected_index != self.index:
+            self.expected = []
+            self.expected_index = self.index
+        if expected not in self.expected:
+            self.expected.append(expected)
+
+    def predict(self, table):
+        """Follow a prediction table from the current token to its entry, or None"""
+        entry = table.get(self.kind)
+        offset = 0
+        while type(entry) is dict:
+            node = entry
+            offset += 1
+            entry = node.get(self.kind_at(self.index + offset))
+            if entry is None:
+                entry = node.get(FALLBACK)
+        if entry is None and offset == 0 and self.diagnostics is not None:
+            for kind in table:
+                self.note_expected(KIND_NAMES[kind])
+        return entry
+
     def expect(self, token_type=None, token_text=None, rule=None):
         """Expect a certain token, report error if not found"""
         if self.match(token_type, token_text):
@@ -65,62 +290,142 @@ class Parser:
             return False
 
     def add_matched_rule(self, rule):
-        """Add a matched rule to the list"""
-        line_num = self.current_token['line'] if self.current_token else 0
-        if self.index > 0 and self.index <= len(self.tokens):
-            line_num = self.tokens[self.index - 1]['line']
-        self.matched_rules.append({
-            'line': line_num,
-            'rule': rule
-        })
+        """Add a matched rule to the trace, on the line of the last token matched"""
+        if self.index > 0:
+            line_num = self.tokens[self.index - 1].line
+        else:
+            line_num = self.current_token.line if self.current_token else 0
+        self.trace.add(rule, line_num)
 
     def add_error(self):
-        """Add an error to the count"""
+        """Add an error to the count, unless one was already added at this token"""
+        # A rule that fails reports it, and so does every rule it was nested in
+        if self.error_index == self.index:
+            return
+        self.error_index = self.index
         self.error_count += 1
-        line_num = self.current_token['line'] if self.current_token else 0
-        self.matched_rules.append({
-            'line': line_num,
-            'rule': 'Not Matched'
-        })
+        line_num = self.current_token.line if self.current_token else 0
+        self.trace.record(NOT_MATCHED, line_num)
+        if self.diagnostics is not None:
+            expected = tuple(sorted(self.expected)) if self.expected_index == self.index else ()
+            if self.current_token:
+                self.diagnostics.add("P001", line_num, text=self.current_token.text, expected=expected)
+            else:
+                last = self.token_at(self.index - 1) if self.index > 0 else None
+                self.diagnostics.add("P002", last.line if last else 0, expected=expected)
+
+    @property
+    def matched_rules(self):
+        """The full trace as a list of {'line', 'rule'} dicts, in the order matched"""
+        return [{'line': line, 'rule': rule} for line, rule in self.trace.entries()]
 
     def print_results(self):
-        """Print the parsing results in line order"""
-        # Sort by line number
-        sorted_results = sorted(self.matched_rules, key=lambda x: x['line'])
-        for result in sorted_results:
-            if result['rule'] == 'Not Matched':
-                print(f"Line #: {result['line']} Not Matched")
-            else:
-                print(f"Line #: {result['line']} Matched Rule Used: {result['rule']}")
+        """Print the parsing results in line order, or the rule counts"""
+        if self.trace.level == TRACE_FULL:
+            for line, rule in self.trace.entries_by_line():
+                if rule == NOT_MATCHED:
+                    print(f"Line #: {line} Not Matched")
+                else:
+                    print(f"Line #: {line} Matched Rule Used: {rule}")
+        elif self.trace.level == TRACE_COUNTS:
+            for rule, count in self.trace.rule_counts().items():
+                if rule != NOT_MATCHED:
+                    print(f"Matched Rule Used: {rule} Count: {count}")
         print(f"Total NO of errors: {self.error_count}")
 
+    @property
+    def parse_tree_root(self):
+        """Parse tree of the first program.
+
+        An ArenaNode over the arena filled in while parsing, or else a
+        ParseTreeNode built from the syntax tree when first asked for.
+        """
+        if self._parse_tree_root is None and self.ast_root is not None:
+            self._parse_tree_root = parse_tree(self.ast_root)
+        return self._parse_tree_root
+
+    @parse_tree_root.setter
+    def parse_tree_root(self, root):
+        self._parse_tree_root = root
+
     # Grammar rule implementations
     def parse(self):
         """Start parsing with the Program rule, continue on error."""
-        self.parse_tree_root = None
+        self._parse_tree_root = None
+        self.ast_root = None
+        if self.arena:
+            # Tokens read from a stream are dropped, so the arena keeps its own
+            self.tree = TreeArena(self.tokens if isinstance(self.tokens, (list, tuple)) else {})
+        found = False
         while self.current_token:
             node = self.program()
-            if self.parse_tree_root is None and node:
-                self.parse_tree_root = node
-            # If not at the end, advance to avoid infinite loop
-            if self.current_token:
+            if node and not found:
+                found = True
+                if self.arena:
+                    self._parse_tree_root = ArenaNode(self.tree, 0)
+                    self.tree = None
+                else:
+                    self.ast_root = node
+            # Panic mode: skip to the next program's start symbol, if any
+            while self.kind not in PROGRAM_SYNC:
                 self.advance()
-        return self.matched_rules, self.error_count
+        return self.trace, self.error_count
+    
+    def recover(self, sync, start):
+        """Panic mode: skip the rest of a construct that failed to parse from index start.
+
+        Skips up to the next token in sync that is outside any braces the
+        skipped tokens open, and past it if it is a ';', always moving at
+        least one token. Each token is looked at once.
+        """
+        depth = 0
+        if self.index == start:
+            # Nothing was matched, so the current token is the problem
+            if self.kind == SEMICOLON:
+                self.advance()
+                return
+            if self.kind == OPEN_BRACE:
+                depth = 1
+            self.advance()
+        kind = self.kind
+        while kind != END and (depth or kind not in sync):
+            if kind == OPEN_BRACE:
+                depth += 1
+            elif kind == CLOSE_BRACE:
+                depth -= 1
+            self.advance()
+            kind = self.kind
+        if kind == SEMICOLON:
+            self.advance()
+    
+    def tree_add(self, rule, parent=-1, token=-1):
+        """Append a node for the token at index token to the arena; return its index"""
+        tree = self.tree
+        if token >= 0 and tree.tokens is not self.tokens:
+            tree.tokens[token] = self.tokens[token]
+        return tree.add(rule, token, parent)
+
+    def span(self, node, first):
+        """Give a syntax node the tokens from first to the last one matched"""
+        node.first = first
+        node.last = self.token_at(self.index - 1) if self.index > 0 else None
+        return node
     
     def program(self):
         """Program -> Start_Symbols ClassDeclaration End_Symbols"""
-        children = []
+        first = self.current_token
+        start_index = self.index
         start = self.start_symbols()
         if start:
-            children.append(start)
             self.add_matched_rule("Program -> Start_Symbols ClassDeclaration End_Symbols")
+            if self.tree is not None:
+                self.tree_add("Start_Symbols", self.tree_add("Program"), start_index)
             class_decl = self.class_declaration()
-            if class_decl:
-                children.append(class_decl)
+            end_index = self.index
             end = self.end_symbols()
-            if end:
-                children.append(end)
-            return ParseTreeNode("Program", children)
+            if end is not None and self.tree is not None:
+                self.tree_add("End_Symbols", 0, end_index)
+            return self.span(Program(start, class_decl, end), first)
         else:
             self.add_error()
             return None
@@ -129,10 +434,10 @@ class Parser:
         """Start_Symbols -> @ | ^"""
         if self.match(token_text='@'):
             self.add_matched_rule("Start_Symbols -> @ | ^")
-            return ParseTreeNode("Start_Symbols", token='@')
+            return '@'
         elif self.match(token_text='^'):
             self.add_matched_rule("Start_Symbols -> @ | ^")
-            return ParseTreeNode("Start_Symbols", token='^')
+            return '^'
         else:
             return None
     
@@ -140,37 +445,38 @@ class Parser:
         """End_Symbols -> $ | #"""
         if self.match(token_text='$'):
             self.add_matched_rule("End_Symbols -> $ | #")
-            return ParseTreeNode("End_Symbols", token='$')
+            return '$'
         elif self.match(token_text='#'):
             self.add_matched_rule("End_Symbols -> $ | #")
-            return ParseTreeNode("End_Symbols", token='#')
+            return '#'
         else:
             self.add_error()
             return None
     
     def class_declaration(self):
         """ClassDeclaration -> Type ID ClassBody | Type ID DerivedFrom ClassBody"""
-        children = []
-        t = self.type()
-        if t:
-            children.append(t)
+        first = self.current_token
+        type_name = self.type()
+        if type_name:
+            name_token = self.current_token
             if self.match(token_type="Identifier"):
-                children.append(ParseTreeNode("ID", token=self.tokens[self.index-1]['text']))
+                class_decl = ClassDecl(type_name, name_token.text)
+                if self.tree is not None:
+                    decl = self.tree_decl = self.tree_add("ClassDeclaration", 0)
+                    self.tree_add(None, decl)  # The Type rule adds a bare True
+                    self.tree_add("ID", decl, self.index - 1)
                 if self.match(token_text="DerivedFrom"):
                     self.add_matched_rule("ClassDeclaration -> Type ID DerivedFrom ClassBody")
                     # Should match another identifier here for inherited class
+                    base_token = self.current_token
                     if self.match(token_type="Identifier"):
-                        children.append(ParseTreeNode("ID", token=self.tokens[self.index-1]['text']))
-                    cb = self.class_body()
-                    if cb:
-                        children.append(cb)
-                    return ParseTreeNode("ClassDeclaration", children)
+                        class_decl.base = base_token.text
+                        if self.tree is not None:
+                            self.tree_add("ID", self.tree_decl, self.index - 1)
                 else:
                     self.add_matched_rule("ClassDeclaration -> Type ID ClassBody")
-                    cb = self.class_body()
-                    if cb:
-                        children.append(cb)
-                    return ParseTreeNode("ClassDeclaration", children)
+                class_decl.members = self.class_body()
+                return self.span(class_decl, first)
             else:
                 self.add_error()
         else:
@@ -179,173 +485,211 @@ class Parser:
     
     def class_body(self):
         """ClassBody -> { ClassMembers }"""
-        children = []
         if self.match(token_text='{'):
             self.add_matched_rule("ClassBody -> { ClassMembers }")
-            cm = self.class_members()
-            if cm:
-                children.append(cm)
+            if self.tree is not None:
+                self.tree_body = self.tree_add("ClassBody", self.tree_decl)
+                self.tree_members = -1  # Added with the first member
+            members = self.class_members()
             if not self.match(token_text='}'):
                 self.add_error()
-            return ParseTreeNode("ClassBody", children)
+            return members
         else:
             self.add_error()
             return None
     
     def class_members(self):
         """ClassMembers -> ClassMember ClassMembers | ε"""
-        children = []
-        while self.current_token and self.current_token['text'] != '}':
+        members = []
+        while self.kind not in CLASS_MEMBERS_END:
+            if self.members is not None:
+                reused = self.reuse.get(self.index)
+                if reused is not None:
+                    self.reuse_member(reused)
+                    self.add_member(members, reused.node)
+                    continue
+                rules_start = self.trace.mark()
+                errors_start = self.error_count
+            start = self.index
             cm = self.class_member()
             if cm:
                 self.add_matched_rule("ClassMembers -> ClassMember ClassMembers")
-                children.append(cm)
+                self.add_member(members, cm)
+                if self.members is not None:
+                    # Matching looks one token past the member, and lookahead
+                    # such as at_method_head may have looked further
+                    reach = max(self.index + 1, self.peeked)
+                    self.members.append(MemberParse(
+                        start, self.index, reach, cm, self.trace.segment(rules_start),
+                        self.error_count - errors_start, self.error_index == self.index))
             else:
                 self.add_error()
-                self.advance()  # Error recovery: skip to next token
-        if children:
-            return ParseTreeNode("ClassMembers", children)
-        else:
-            return None
+                self.recover(MEMBER_SYNC, start)
+        return members
+    
+    def add_member(self, members, node):
+        """Keep a class member's syntax node, or in arena mode add its leaf to the arena instead"""
+        if not self.arena:
+            members.append(node)
+        elif self.tree is not None:
+            if self.tree_members < 0:
+                self.tree_members = self.tree_add("ClassMembers", self.tree_body)
+            self.tree_add(type(node).__name__, self.tree_members)
+
+    def reuse_member(self, member):
+        """Take over a class member parsed before instead of parsing it again"""
+        self.trace.replay(member.rules)
+        self.error_count += member.errors
+        if member.error_at_stop:
+            self.error_index = member.stop
+        self.members.append(member)
+        self.index = member.stop
+        self.current_token = self.token_at(member.stop)
+        self.kind = self.kind_at(member.stop)
     
     def class_member(self):
         """ClassMember -> VariableDecl | MethodDecl | FuncCall | Comment | RequireCommand"""
-        token_type = self.current_token['type'] if self.current_token else None
-        token_text = self.current_token['text'] if self.current_token else None
-        
-        if token_type == "Comment":
-            self.add_matched_rule("ClassMember -> Comment")
-            self.comment()
-            return ParseTreeNode("Comment")
-        elif token_text == "Require":
-            self.add_matched_rule("ClassMember -> RequireCommand")
-            self.require_command()
-            return ParseTreeNode("RequireCommand")
-        elif token_type == "Identifier" and self.peek_next_token_text() == '(':
-            self.add_matched_rule("ClassMember -> FuncCall")
-            self.func_call()
-            return ParseTreeNode("FuncCall")
-        elif self.is_type_token(token_text):
-            # Check if this is variable or method declaration
-            # Look ahead to see if there's a "(" after the identifier
-            self.add_matched_rule("ClassMember -> VariableDecl")
-            saved_index = self.index
-            saved_token = self.current_token
-            
-            # Try method declaration first
-            if self.method_decl():
-                return ParseTreeNode("MethodDecl")
-                
-            # If method_decl failed, reset and try variable_decl
-            self.index = saved_index
-            self.current_token = saved_token
-            
-            if self.variable_decl():
-                return ParseTreeNode("VariableDecl")
-            
-            self.add_error()
-            return None
-        else:
+        entry = self.predict(CLASS_MEMBER_TABLE)
+        if entry is None:
             return None
+        rule, parse = entry
+        self.add_matched_rule(rule)
+        member = parse(self)
+        if member is None:
+            self.add_error()
+        return member
+    
+    def call_member(self):
+        """A FuncCall member, which stands even if the call is malformed"""
+        first = self.current_token
+        return self.func_call() or self.span(FuncCall(first.text, []), first)
+    
+    def require_member(self):
+        """A RequireCommand member, which stands even if the command is malformed"""
+        first = self.current_token
+        return self.require_command() or self.span(RequireCommand(None), first)
     
     def peek_next_token_text(self):
         """Look ahead to the next token text without advancing"""
-        if self.index + 1 < len(self.tokens):
-            return self.tokens[self.index + 1]['text']
+        token = self.token_at(self.index + 1)
+        if token:
+            return token.text
         return None
-
+    
     def peek_token_ahead(self, positions=1):
         """Look ahead to a token without advancing"""
-        if self.index + positions < len(self.tokens):
-            return self.tokens[self.index + positions]
-        return None
+        return self.token_at(self.index + positions)
         
     def method_decl(self):
         """MethodDecl -> FuncDecl ; | FuncDecl { VariableDecls Statements }"""
-        saved_index = self.index
-        saved_token = self.current_token
-        
-        if self.func_decl():
+        first = self.current_token
+        method = self.func_decl()
+        if method:
             if self.match(token_text=';'):
                 self.add_matched_rule("MethodDecl -> FuncDecl ;")
-                return True
+                return self.span(method, first)
             elif self.match(token_text='{'):
                 self.add_matched_rule("MethodDecl -> FuncDecl { VariableDecls Statements }")
-                self.variable_decls()
-                self.statements()
+                method.variables = self.variable_decls()
+                method.body = self.statements()
                 if self.match(token_text='}'):
-                    return True
+                    return self.span(method, first)
                 else:
                     self.add_error()
-                    return False
+                    return None
             else:
                 self.add_error()
-                return False
-        
-        # Reset if we couldn't match method_decl
-        self.index = saved_index
-        self.current_token = saved_token
-        return False
+                if self.kind in METHOD_BODY_START and not self.at_method_head():
+                    # The '{' is missing: parse the body that follows, so
+                    # its '}' is not taken for the end of the class
+                    method.variables = self.variable_decls()
+                    method.body = self.statements()
+                    if not self.match(token_text='}'):
+                        self.add_error()
+                # Otherwise the ';' is missing, and the declaration stands without it
+                return self.span(method, first)
+        return None
+    
+    def at_method_head(self):
+        """Whether the next tokens are Type ID ( and so start another method"""
+        return (self.kind in TYPE_START and self.kind_at(self.index + 1) == IDENTIFIER
+                and self.kind_at(self.index + 2) == OPEN_PAREN)
     
     def func_decl(self):
         """FuncDecl -> Type ID ( ParameterList )"""
-        if self.type():
+        first = self.current_token
+        type_name = self.type()
+        if type_name:
+            name_token = self.current_token
             if self.match(token_type="Identifier"):
                 if self.match(token_text='('):
                     self.add_matched_rule("FuncDecl -> Type ID ( ParameterList )")
-                    self.parameter_list()
+                    params = self.parameter_list()
                     if self.match(token_text=')'):
-                        return True
+                        return self.span(MethodDecl(type_name, name_token.text, params), first)
                     else:
                         self.add_error()
                 else:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def parameter_list(self):
         """ParameterList -> ε | Parameters"""
-        if self.current_token and self.current_token['text'] != ')':
+        if self.kind not in PARAMETER_LIST_END:
             self.add_matched_rule("ParameterList -> Parameters")
-            self.parameters()
+            return self.parameters()
         else:
             self.add_matched_rule("ParameterList -> ε")
-            # epsilon case - do nothing
+            # epsilon case - no parameters
+            return []
     
     def parameters(self):
         """Parameters -> Parameter | Parameters , Parameter"""
-        if self.parameter():
-            if self.current_token and self.current_token['text'] == ',':
+        # A loop rather than recursion so long lists cannot exhaust the stack
+        params = []
+        param = self.parameter()
+        while param:
+            params.append(param)
+            if self.current_token and self.current_token.text == ',':
                 self.match(token_text=',')
                 self.add_matched_rule("Parameters -> Parameters , Parameter")
-                self.parameters()
             else:
                 self.add_matched_rule("Parameters -> Parameter")
-        else:
-            self.add_error()
+                return params
+            param = self.parameter()
+        self.add_error()
+        return params
     
     def parameter(self):
         """Parameter -> Type ID"""
-        if self.type():
+        first = self.current_token
+        type_name = self.type()
+        if type_name:
+            name_token = self.current_token
             if self.match(token_type="Identifier"):
                 self.add_matched_rule("Parameter -> Type ID")
-                return True
+                return self.span(Param(type_name, name_token.text), first)
             else:
                 self.add_error()
-        return False
+        return None
     
     def variable_decl(self):
         """VariableDecl -> Type IDList ; | Type IDList [ ID ] ;"""
-        if self.type():
-            if self.id_list():
-                if self.current_token and self.current_token['text'] == '[':
+        first = self.current_token
+        type_name = self.type()
+        if type_name:
+            names = self.id_list()
+            if names:
+                if self.current_token and self.current_token.text == '[':
                     self.match(token_text='[')
+                    size_token = self.current_token
                     if self.match(token_type="Identifier"):
                         if self.match(token_text=']'):
                             if self.match(token_text=';'):
                                 self.add_matched_rule("VariableDecl -> Type IDList [ ID ] ;")
-                                return True
+                                return self.span(VariableDecl(type_name, names, size_token.text), first)
                             else:
                                 self.add_error()
                         else:
@@ -354,162 +698,162 @@ class Parser:
                         self.add_error()
                 elif self.match(token_text=';'):
                     self.add_matched_rule("VariableDecl -> Type IDList ;")
-                    return True
+                    return self.span(VariableDecl(type_name, names), first)
                 else:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def variable_decls(self):
         """VariableDecls -> VariableDecl VariableDecls | ε"""
-        if self.current_token and self.is_type_token(self.current_token['text']):
-            if self.variable_decl():
+        variables = []
+        while self.kind in VARIABLE_DECL_START:
+            variable = self.variable_decl()
+            if variable:
+                variables.append(variable)
                 self.add_matched_rule("VariableDecls -> VariableDecl VariableDecls")
-                self.variable_decls()
             else:
                 self.add_error()
-        else:
-            # epsilon case - do nothing
-            pass
+                break
+        # epsilon case - do nothing
+        return variables
     
     def id_list(self):
         """IDList -> ID | IDList , ID"""
-        if self.match(token_type="Identifier"):
-            if self.current_token and self.current_token['text'] == ',':
-                self.match(token_text=',')
-                self.add_matched_rule("IDList -> IDList , ID")
-                self.id_list()
-            else:
-                self.add_matched_rule("IDList -> ID")
-            return True
-        return False
+        token = self.current_token
+        if not self.match(token_type="Identifier"):
+            return None
+        names = [token.text]
+        while self.current_token and self.current_token.text == ',':
+            self.match(token_text=',')
+            self.add_matched_rule("IDList -> IDList , ID")
+            token = self.current_token
+            if not self.match(token_type="Identifier"):
+                # The list still counts as matched up to the comma
+                return names
+            names.append(token.text)
+        self.add_matched_rule("IDList -> ID")
+        return names
     
     def statements(self):
         """Statements -> Statement Statements | ε"""
-        while self.current_token and self.current_token['text'] != '}':
-            if self.statement():
+        statements = []
+        while self.kind not in STATEMENTS_END:
+            start = self.index
+            statement = self.statement()
+            if statement:
+                statements.append(statement)
                 self.add_matched_rule("Statements -> Statement Statements")
             else:
                 self.add_error()
-                self.advance()  # Error recovery: skip to next token
+                self.recover(STATEMENT_SYNC, start)
         # epsilon case - do nothing if '}'
+        return statements
     
     def statement(self):
-        """Handles different statement types"""
-        token_text = self.current_token['text'] if self.current_token else None
-        token_type = self.current_token['type'] if self.current_token else None
-        
-        if token_type == "Identifier" and self.peek_token_ahead() and self.peek_token_ahead()['text'] == '=':
-            self.add_matched_rule("Statement -> Assignment")
-            return self.assignment()
-        elif token_text == "TrueFor":
-            self.add_matched_rule("Statement -> TrueForStmt")
-            return self.truefor_stmt()
-        elif token_text == "However":
-            self.add_matched_rule("Statement -> HoweverStmt")
-            return self.however_stmt()
-        elif token_text == "When":
-            self.add_matched_rule("Statement -> WhenStmt")
-            return self.when_stmt()
-        elif token_text == "Respondwith":
-            self.add_matched_rule("Statement -> RespondwithStmt")
-            return self.respondwith_stmt()
-        elif token_text == "Endthis":
-            self.add_matched_rule("Statement -> EndthisStmt")
-            return self.endthis_stmt()
-        elif token_text == "Scan" or token_text == "Conditionof":
-            self.add_matched_rule("Statement -> ScanStmt")
-            return self.scan_stmt()
-        elif token_text == "Srap":
-            self.add_matched_rule("Statement -> SrapStmt")
-            return self.srap_stmt()
-        elif token_type == "Identifier" and self.peek_token_ahead() and self.peek_token_ahead()['text'] == '(':
-            self.add_matched_rule("Statement -> FuncCallStmt")
-            return self.func_call_stmt()
-        else:
-            return False
+        """Statement -> Assignment | TrueForStmt | HoweverStmt | WhenStmt | RespondwithStmt
+                     | EndthisStmt | ScanStmt | SrapStmt | FuncCallStmt"""
+        entry = self.predict(STATEMENT_TABLE)
+        if entry is None:
+            return None
+        rule, parse = entry
+        self.add_matched_rule(rule)
+        return parse(self)
     
     def assignment(self):
         """Assignment -> ID = Expression ;"""
+        first = self.current_token
         if self.match(token_type="Identifier"):
             if self.match(token_text='='):
                 self.add_matched_rule("Assignment -> ID = Expression ;")
-                if self.expression():
+                value = self.expression()
+                if value:
                     if self.match(token_text=';'):
-                        return True
+                        return self.span(Assignment(first.text, value), first)
                     else:
                         self.add_error()
                 else:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def func_call(self):
         """FuncCall -> ID ( ArgumentList ) ;"""
+        first = self.current_token
         if self.match(token_type="Identifier"):
             if self.match(token_text='('):
                 self.add_matched_rule("FuncCall -> ID ( ArgumentList ) ;")
-                self.argument_list()
+                args = self.argument_list()
                 if self.match(token_text=')'):
                     if self.match(token_text=';'):
-                        return True
+                        return self.span(FuncCall(first.text, args), first)
                     else:
                         self.add_error()
                 else:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def func_call_stmt(self):
         """FuncCallStmt -> FuncCall ;"""
-        if self.func_call():
+        call = self.func_call()
+        if call:
             self.add_matched_rule("FuncCallStmt -> FuncCall ;")
-            return True
-        return False
+            return call
+        return None
     
     def argument_list(self):
         """ArgumentList -> ε | ArgumentSequence"""
-        if self.current_token and self.current_token['text'] != ')':
+        if self.kind not in ARGUMENT_LIST_END:
             self.add_matched_rule("ArgumentList -> ArgumentSequence")
-            self.argument_sequence()
+            return self.argument_sequence()
         else:
             self.add_matched_rule("ArgumentList -> ε")
-            # epsilon case - do nothing
+            # epsilon case - no arguments
+            return []
     
     def argument_sequence(self):
         """ArgumentSequence -> Expression | ArgumentSequence , Expression"""
-        if self.expression():
-            if self.current_token and self.current_token['text'] == ',':
+        args = []
+        arg = self.expression()
+        while arg:
+            args.append(arg)
+            if self.current_token and self.current_token.text == ',':
                 self.match(token_text=',')
                 self.add_matched_rule("ArgumentSequence -> ArgumentSequence , Expression")
-                self.argument_sequence()
             else:
                 self.add_matched_rule("ArgumentSequence -> Expression")
-        else:
-            self.add_error()
+                return args
+            arg = self.expression()
+        self.add_error()
+        return args
     
     def truefor_stmt(self):
         """TrueForStmt -> TrueFor ( ConditionExpression ) Block
                            | TrueFor ( ConditionExpression ) Block TrueForElse Block"""
+        first = self.current_token
         if self.match(token_text="TrueFor"):
             if self.match(token_text='('):
-                if self.condition_expression():
+                condition = self.condition_expression()
+                if condition:
                     if self.match(token_text=')'):
-                        if self.block():
+                        body = self.block()
+                        if body:
                             # Check for else part
-                            if self.current_token and self.current_token['text'] == "Else":
+                            if self.current_token and self.current_token.text == "Else":
                                 self.truefor_else()
-                                if self.block():
+                                else_body = self.block()
+                                if else_body:
                                     self.add_matched_rule("TrueForStmt -> TrueFor ( ConditionExpression ) Block TrueForElse Block")
-                                    return True
+                                    return self.span(TrueForStmt(condition, body, else_body), first)
                                 else:
                                     self.add_error()
                             else:
                                 self.add_matched_rule("TrueForStmt -> TrueFor ( ConditionExpression ) Block")
-                                return True
+                                return self.span(TrueForStmt(condition, body), first)
                         else:
                             self.add_error()
                     else:
@@ -518,7 +862,7 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def truefor_else(self):
         """TrueForElse -> Else"""
@@ -529,13 +873,16 @@ class Parser:
     
     def however_stmt(self):
         """HoweverStmt -> However ( ConditionExpression ) Block"""
+        first = self.current_token
         if self.match(token_text="However"):
             if self.match(token_text='('):
-                if self.condition_expression():
+                condition = self.condition_expression()
+                if condition:
                     if self.match(token_text=')'):
-                        if self.block():
+                        body = self.block()
+                        if body:
                             self.add_matched_rule("HoweverStmt -> However ( ConditionExpression ) Block")
-                            return True
+                            return self.span(HoweverStmt(condition, body), first)
                         else:
                             self.add_error()
                     else:
@@ -544,21 +891,26 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def when_stmt(self):
         """WhenStmt -> When ( Expression ; Expression ; Expression ) Block"""
+        first = self.current_token
         if self.match(token_text="When"):
             if self.match(token_text='('):
-                if self.expression():
+                init = self.expression()
+                if init:
                     if self.match(token_text=';'):
-                        if self.expression():
+                        condition = self.expression()
+                        if condition:
                             if self.match(token_text=';'):
-                                if self.expression():
+                                step = self.expression()
+                                if step:
                                     if self.match(token_text=')'):
-                                        if self.block():
+                                        body = self.block()
+                                        if body:
                                             self.add_matched_rule("WhenStmt -> When ( Expression ; Expression ; Expression ) Block")
-                                            return True
+                                            return self.span(WhenStmt(init, condition, step, body), first)
                                         else:
                                             self.add_error()
                                     else:
@@ -575,51 +927,60 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def respondwith_stmt(self):
         """RespondwithStmt -> Respondwith Expression ; | Respondwith ID ;"""
+        first = self.current_token
         if self.match(token_text="Respondwith"):
-            if self.current_token and self.current_token['type'] == "Identifier":
+            # A lone ID is the ID form; an ID that starts an expression is not
+            if (self.current_token and self.current_token.type == "Identifier"
+                    and self.peek_next_token_text() == ';'):
+                name_token = self.current_token
                 if self.match(token_type="Identifier"):
+                    value = self.span(Name(name_token.text), name_token)
                     if self.match(token_text=';'):
                         self.add_matched_rule("RespondwithStmt -> Respondwith ID ;")
-                        return True
+                        return self.span(RespondwithStmt(value), first)
                     else:
                         self.add_error()
                 else:
                     self.add_error()
             else:
-                if self.expression():
+                value = self.expression()
+                if value:
                     if self.match(token_text=';'):
                         self.add_matched_rule("RespondwithStmt -> Respondwith Expression ;")
-                        return True
+                        return self.span(RespondwithStmt(value), first)
                     else:
                         self.add_error()
                 else:
                     self.add_error()
-        return False
+        return None
     
     def endthis_stmt(self):
         """EndthisStmt -> Endthis ;"""
+        first = self.current_token
         if self.match(token_text="Endthis"):
             if self.match(token_text=';'):
                 self.add_matched_rule("EndthisStmt -> Endthis ;")
-                return True
+                return self.span(EndthisStmt(), first)
             else:
                 self.add_error()
-        return False
+        return None
     
     def scan_stmt(self):
         """ScanStmt -> Scan(Conditionof ID) ;"""
+        first = self.current_token
         if self.match(token_text="Scan"):
             if self.match(token_text='('):
                 if self.match(token_text="Conditionof"):
+                    name_token = self.current_token
                     if self.match(token_type="Identifier"):
                         if self.match(token_text=')'):
                             if self.match(token_text=';'):
                                 self.add_matched_rule("ScanStmt -> Scan(Conditionof ID) ;")
-                                return True
+                                return self.span(ScanStmt(name_token.text), first)
                             else:
                                 self.add_error()
                         else:
@@ -630,17 +991,19 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def srap_stmt(self):
         """SrapStmt -> Srap ( Expression ) ;"""
+        first = self.current_token
         if self.match(token_text="Srap"):
             if self.match(token_text='('):
-                if self.expression():
+                value = self.expression()
+                if value:
                     if self.match(token_text=')'):
                         if self.match(token_text=';'):
                             self.add_matched_rule("SrapStmt -> Srap ( Expression ) ;")
-                            return True
+                            return self.span(SrapStmt(value), first)
                         else:
                             self.add_error()
                     else:
@@ -649,174 +1012,120 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def block(self):
         """Block -> { Statements }"""
+        first = self.current_token
         if self.match(token_text='{'):
             self.add_matched_rule("Block -> { Statements }")
-            self.statements()
+            statements = self.statements()
             if self.match(token_text='}'):
-                return True
+                return self.span(Block(statements), first)
             else:
                 self.add_error()
-                return False
+                return None
         else:
             self.add_error()
-            return False
+            return None
     
     def condition_expression(self):
-        """ConditionExpression -> Condition | Condition LogicalOp Condition"""
-        if self.condition():
-            if self.current_token and self.is_logical_op(self.current_token['text']):
-                logical_op = self.current_token['text']
-                self.match(token_text=logical_op)
-                if self.condition():
-                    self.add_matched_rule("ConditionExpression -> Condition LogicalOp Condition")
-                    return True
-                else:
-                    self.add_error()
-                    return False
-            else:
-                self.add_matched_rule("ConditionExpression -> Condition")
-                return True
-        return False
-    
-    def is_logical_op(self, text):
-        """Check if token is a logical operator"""
-        return text in ['&&', '||', '~']
-    
-    def condition(self):
-        """Condition -> Expression ComparisonOp Expression"""
-        if self.expression():
-            if self.current_token and self.is_comparison_op(self.current_token['text']):
-                comp_op = self.current_token['text']
-                self.match(token_text=comp_op)
-                if self.expression():
-                    self.add_matched_rule("Condition -> Expression ComparisonOp Expression")
-                    return True
-                else:
-                    self.add_error()
-            else:
-                self.add_error()
-        return False
+        """ConditionExpression -> Expression"""
+        condition = self.expression()
+        if condition:
+            self.add_matched_rule("ConditionExpression -> Expression")
+        return condition
     
-    def is_comparison_op(self, text):
-        """Check if token is a comparison operator"""
-        return text in ['==', '!=', '>', '>=', '<', '<=']
-    
-    def expression(self):
-        """Expression -> Term | Expression AddOp Term"""
-        if self.term():
-            if self.current_token and self.is_add_op(self.current_token['text']):
-                add_op = self.current_token['text']
-                self.match(token_text=add_op)
-                if self.term():
-                    self.add_matched_rule("Expression -> Expression AddOp Term")
-                    # Check for more terms
-                    self.handle_more_terms()
-                    return True
-                else:
-                    self.add_error()
-                    return False
-            else:
-                self.add_matched_rule("Expression -> Term")
-                return True
-        return False
+    def expression(self, min_power=1):
+        """Expression -> Factor | Expression Operator Expression, by precedence climbing"""
+        first = self.current_token
+        left = self.factor()
+        if not left:
+            return None
+        return self.climb(left, first, min_power)
     
-    def handle_more_terms(self):
-        """Helper method to handle expressions with multiple terms"""
-        while self.current_token and self.is_add_op(self.current_token['text']):
-            add_op = self.current_token['text']
-            self.match(token_text=add_op)
-            if not self.term():
-                self.add_error()
-                break
-            self.add_matched_rule("Expression -> Expression AddOp Term")
-    
-    def is_add_op(self, text):
-        """Check if token is an addition operator"""
-        return text in ['+', '-']
-    
-    def term(self):
-        """Term -> Factor | Term MulOp Factor"""
-        if self.factor():
-            if self.current_token and self.is_mul_op(self.current_token['text']):
-                mul_op = self.current_token['text']
-                self.match(token_text=mul_op)
-                if self.factor():
-                    self.add_matched_rule("Term -> Term MulOp Factor")
-                    # Check for more factors
-                    self.handle_more_factors()
-                    return True
-                else:
-                    self.add_error()
-                    return False
+    def climb(self, left, first, min_power):
+        """Fold the operators binding at least min_power into left, whose first token is first.
+
+        A chain of operators at one level is a loop; a right operand is
+        climbed from recursively only when the operator after it binds
+        tighter, so the depth follows the precedence levels, not the length.
+        """
+        operator = BINARY_OPERATORS.get
+        entry = operator(self.kind)
+        while entry is not None and entry[0] >= min_power:
+            power, rule, takes_name = entry
+            op = self.current_token.text
+            self.advance()
+            right_first = self.current_token
+            if takes_name:
+                right = None
+                if self.kind == IDENTIFIER:
+                    self.advance()
+                    right = self.span(Name(right_first.text), right_first)
             else:
-                self.add_matched_rule("Term -> Factor")
-                return True
-        return False
-    
-    def handle_more_factors(self):
-        """Helper method to handle terms with multiple factors"""
-        while self.current_token and self.is_mul_op(self.current_token['text']):
-            mul_op = self.current_token['text']
-            self.match(token_text=mul_op)
-            if not self.factor():
+                right = self.factor()
+            if not right:
                 self.add_error()
-                break
-            self.add_matched_rule("Term -> Term MulOp Factor")
-    
-    def is_mul_op(self, text):
-        """Check if token is a multiplication operator"""
-        return text in ['*', '/']
+                return None
+            entry = operator(self.kind)
+            if entry is not None and entry[0] > power:
+                right = self.climb(right, right_first, power + 1)
+                if not right:
+                    return None
+                entry = operator(self.kind)
+            self.add_matched_rule(rule)
+            left = self.span(BinaryOp(op, left, right), first)
+        return left
     
     def factor(self):
         """Factor -> ID | Number | ( Expression )"""
-        if not self.current_token:
-            return False
-            
-        token_type = self.current_token['type']
+        first = self.current_token
+        kind = self.kind
         
-        if token_type == "Identifier":
-            self.match(token_type="Identifier")
+        if kind == IDENTIFIER:
+            self.advance()
             self.add_matched_rule("Factor -> ID")
-            return True
-        elif token_type == "Constant":
-            self.match(token_type="Constant")
+            return self.span(Name(first.text), first)
+        elif kind == CONSTANT:
+            self.advance()
             self.add_matched_rule("Factor -> Number")
-            return True
-        elif self.current_token['text'] == '(':
+            return self.span(Number(first.text), first)
+        elif kind == OPEN_PAREN:
             self.match(token_text='(')
-            if self.expression():
+            inner = self.expression()
+            if inner:
                 if self.match(token_text=')'):
                     self.add_matched_rule("Factor -> ( Expression )")
-                    return True
+                    return inner
                 else:
                     self.add_error()
             else:
                 self.add_error()
         
-        return False
+        return None
     
     def comment(self):
         """Comment -> /< STR >/ | /* STR"""
+        first = self.current_token
         if self.match(token_type="Comment"):
             self.add_matched_rule("Comment -> /< STR >/ | /* STR")
-            return True
-        return False
+            return self.span(Comment(first.text), first)
+        return None
     
     def require_command(self):
         """RequireCommand -> Require ( F_name.txt ) ;"""
+        first = self.current_token
         if self.match(token_text="Require"):
             if self.match(token_text='('):
                 # Need to check for filename
-                if self.current_token and self.current_token['type'] == "Identifier":
+                if self.current_token and self.current_token.type == "Identifier":
+                    file_token = self.current_token
                     self.match(token_type="Identifier")
                     if self.match(token_text=')'):
                         if self.match(token_text=';'):
                             self.add_matched_rule("RequireCommand -> Require ( F_name.txt ) ;")
-                            return True
+                            return self.span(RequireCommand(file_token.text), first)
                         else:
                             self.add_error()
                     else:
@@ -825,19 +1134,53 @@ class Parser:
                     self.add_error()
             else:
                 self.add_error()
-        return False
+        return None
     
     def type(self):
         """Type -> Ity | Sity | Cwq | CwqSequence | Ifity | Sifity | Valueless | Logical"""
-        if self.current_token and self.is_type_token(self.current_token['text']):
-            self.match(token_text=self.current_token['text'])
+        if self.kind in TYPE_START:
+            type_name = self.current_token.text
+            self.advance()
             self.add_matched_rule("Type -> Ity | Sity | Cwq | CwqSequence | Ifity | Sifity | Valueless | Logical")
-            return True
-        return False
-    
-    def is_type_token(self, text):
-        """Check if token is a type"""
-        return text in ["Ity", "Sity", "Cwq", "CwqSequence", "Ifity", "Sifity", "Valueless", "Logical", "Type"]
+            return type_name
+        if self.diagnostics is not None:
+            self.note_expected("Type")
+        return None
+
+
+# Parse method of each rule the ClassMember and Statement alternatives name;
+# members that stand even when malformed go through wrappers
+RULE_METHODS = {
+    "VariableDecl": Parser.variable_decl,
+    "MethodDecl": Parser.method_decl,
+    "FuncCall": Parser.call_member,
+    "Comment": Parser.comment,
+    "RequireCommand": Parser.require_member,
+    "Assignment": Parser.assignment,
+    "TrueForStmt": Parser.truefor_stmt,
+    "HoweverStmt": Parser.however_stmt,
+    "WhenStmt": Parser.when_stmt,
+    "RespondwithStmt": Parser.respondwith_stmt,
+    "EndthisStmt": Parser.endthis_stmt,
+    "ScanStmt": Parser.scan_stmt,
+    "SrapStmt": Parser.srap_stmt,
+    "FuncCallStmt": Parser.func_call_stmt,
+}
+
+
+def rule_action(production):
+    """Prediction table entry of an alternative naming one rule: (rule reported, parse method)"""
+    return production.rule, RULE_METHODS[production.symbols[0]]
+
+
+# Binary operator kind -> (binding power, rule reported, whether its right
+# operand is a name rather than an expression, as for ->)
+BINARY_OPERATORS = {kind: (power, production.rule, production.symbols[2] == IDENTIFIER)
+                    for kind, (power, production) in OPERATORS.items()}
+
+# A member starting with a type is a method only if Type ID ( follows
+CLASS_MEMBER_TABLE = prediction_table("ClassMember", rule_action, fallback="VariableDecl")
+STATEMENT_TABLE = prediction_table("Statement", rule_action)
 
 
 def process_file(filename):
@@ -1,73 +1,208 @@
 #!/usr/bin/env python3
 
+import contextlib
+import io
+import mmap
+import os
+import re
+import sys
+from types import MappingProxyType
+
+from diagnostics import DiagnosticCollector, ErrorLimitReached
+from disk_cache import CachedResult, DiskCache
+from include_cache import shared_cache
 from parser import Parser
+from tokens import MappedToken, Token
+from tracing import TRACE_FULL, TRACE_LEVELS, TRACE_OFF
+
+# Token pattern for the fast engine. Each match is one token together with the
+# blanks before it; alternatives follow the order of the checks in
+# scan_reference and "other" catches anything the pattern cannot decide on its
+# own (non-ASCII characters and invalid tokens).
+TOKEN_PATTERN = re.compile(r"""
+    [ \t\r]*
+    (?:
+        (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<using_line>\n(?=[ \t\r]*using))
+      | (?P<newline>\n)
+      | (?P<number>[0-9]+(?:\.[0-9]*)?)
+      | (?P<string>"[^"]*")
+      | (?P<char>'[^']*')
+      | (?P<open_quote>["'])
+      | (?P<line_comment>/\*[^\n]*)
+      | (?P<block_comment>/<.*?>/)
+      | (?P<open_comment>/<)
+      | (?P<symbol>&&|\|\||==|!=|<=|>=|->|[@^$\#+\-*/~<>={}\[\]();,])
+      | (?P<other>[^ \t\r])
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Same test as check_for_using_command, used to skip the call on ordinary lines
+USING_PATTERN = re.compile(r"[ \t\r]*using")
+
+# The same patterns over bytes, for scanning a mapped file in place
+BYTES_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern.encode('ascii'), re.VERBOSE | re.DOTALL)
+BYTES_USING_PATTERN = re.compile(USING_PATTERN.pattern.encode('ascii'))
+# Bytes that send a mapped file back to the text path: non-ASCII needs
+# decoding and \r needs the newline translation open() applies
+NEEDS_TEXT_PATTERN = re.compile(rb"[\r\x80-\xff]")
+
+# Keyword and symbol tables, built once at import and shared read-only by
+# every Scanner so constructing one costs nothing
+
+# Token type of each keyword
+KEYWORDS = MappingProxyType({
+    "Type": "Class",
+    "DerivedFrom": "Inheritance",
+    "TrueFor": "Condition",
+    "Else": "Condition",
+    "Ity": "Integer",
+    "Sity": "SInteger",
+    "Cwq": "Character",
+    "CwqSequence": "String",
+    "Ifity": "Float",
+    "Sifity": "SFloat",
+    "Valueless": "Void",
+    "Logical": "Boolean",
+    "Endthis": "Break",
+    "However": "Loop",
+    "When": "Loop",
+    "Respondwith": "Return",
+    "Srap": "Struct",
+    "Scan": "Switch",
+    "Conditionof": "Switch"
+})
+
+# Token type of every reserved word, Require included, so one lookup
+# classifies a word; the scanner then handles Require's file inclusion
+REQUIRE_TYPE = "File Inclusion Keyword"
+WORD_TYPES = MappingProxyType({**KEYWORDS, "Require": REQUIRE_TYPE})
+
+# Token type of each special symbol
+SPECIAL_SYMBOLS = MappingProxyType({
+    "@": "Start Symbol",
+    "^": "Start Symbol",
+    "$": "End Symbol",
+    "#": "End Symbol",
+    "+": "Arithmetic Operation",
+    "-": "Arithmetic Operation",
+    "*": "Arithmetic Operation",
+    "/": "Arithmetic Operation",
+    "&&": "Logic operators",
+    "||": "Logic operators",
+    "~": "Logic operators",
+    "==": "relational operators",
+    "<": "relational operators",
+    ">": "relational operators",
+    "!=": "relational operators",
+    "<=": "relational operators",
+    ">=": "relational operators",
+    "=": "Assignment operator",
+    "->": "Access Operator",
+    "{": "Braces",
+    "}": "Braces",
+    "[": "Braces",
+    "]": "Braces",
+    "(": "Braces",
+    ")": "Braces",
+    ";": "Line Delimiter",
+    ",": "Separator"
+})
+
+# Types in the language
+TYPES = frozenset({
+    "Ity", "Sity", "Cwq", "CwqSequence", "Ifity", "Sifity", "Valueless", "Logical"
+})
+
+
+def build_symbol_trie(symbols):
+    """Build a longest-match trie over symbol texts.
+
+    Each node is (symbol, token type, children): symbol and type are None
+    where no symbol ends, and children maps the next character to a node.
+    The root is just the children mapping.
+    """
+    root = {}
+    for symbol, token_type in symbols.items():
+        children = root
+        for depth, char in enumerate(symbol, 1):
+            node = children.get(char, (None, None, {}))
+            if depth == len(symbol):
+                node = (symbol, token_type, node[2])
+            children[char] = node
+            children = node[2]
+
+    def freeze(children):
+        return MappingProxyType({char: (symbol, token_type, freeze(grandchildren))
+                                 for char, (symbol, token_type, grandchildren) in children.items()})
+    return freeze(root)
+
+
+SYMBOL_TRIE = build_symbol_trie(SPECIAL_SYMBOLS)
+
+# Text and token type of each reserved word and symbol by its bytes, so a
+# mapped scan takes their text from here instead of decoding it
+BYTE_WORDS = MappingProxyType({word.encode('ascii'): (word, token_type)
+                               for word, token_type in WORD_TYPES.items()})
+BYTE_SYMBOLS = MappingProxyType({symbol.encode('ascii'): (symbol, token_type)
+                                 for symbol, token_type in SPECIAL_SYMBOLS.items()})
+
+# Plain dict copies of the tables for the scanning loops, made once: lookups
+# through the read-only proxies cost more. The loops only read them.
+_WORD_TYPES = dict(WORD_TYPES)
+_SPECIAL_SYMBOLS = dict(SPECIAL_SYMBOLS)
+_BYTE_WORDS = dict(BYTE_WORDS)
+_BYTE_SYMBOLS = dict(BYTE_SYMBOLS)
+
+
+def match_symbol(source_code, i):
+    """Longest special symbol starting at i, as (symbol, token type), or None.
+
+    The symbol text comes from the table, so no string is built.
+    """
+    source_length = len(source_code)
+    node = SYMBOL_TRIE.get(source_code[i])
+    best = None
+    while node is not None:
+        if node[0] is not None:
+            best = node
+        i += 1
+        if i >= source_length:
+            break
+        node = node[2].get(source_code[i])
+    return None if best is None else best[:2]
+
 
 class Scanner:
-    def __init__(self):
-        # Dictionary of keywords with their corresponding token types
-        self.keywords = {
-            "Type": "Class",
-            "DerivedFrom": "Inheritance",
-            "TrueFor": "Condition",
-            "Else": "Condition",
-            "Ity": "Integer",
-            "Sity": "SInteger",
-            "Cwq": "Character",
-            "CwqSequence": "String",
-            "Ifity": "Float",
-            "Sifity": "SFloat",
-            "Valueless": "Void",
-            "Logical": "Boolean",
-            "Endthis": "Break",
-            "However": "Loop",
-            "When": "Loop",
-            "Respondwith": "Return",
-            "Srap": "Struct",
-            "Scan": "Switch",
-            "Conditionof": "Switch"
-        }
-
-        # Dictionary of special symbols
-        self.special_symbols = {
-            "@": "Start Symbol",
-            "^": "Start Symbol",
-            "$": "End Symbol",
-            "#": "End Symbol",
-            "+": "Arithmetic Operation",
-            "-": "Arithmetic Operation",
-            "*": "Arithmetic Operation",
-            "/": "Arithmetic Operation",
-            "&&": "Logic operators",
-            "||": "Logic operators",
-            "~": "Logic operators",
-            "==": "relational operators",
-            "<": "relational operators",
-            ">": "relational operators",
-            "!=": "relational operators",
-            "<=": "relational operators",
-            ">=": "relational operators",
-            "=": "Assignment operator",
-            "->": "Access Operator",
-            "{": "Braces",
-            "}": "Braces",
-            "[": "Braces",
-            "]": "Braces",
-            "(": "Braces",
-            ")": "Braces",
-            ";": "Line Delimiter",
-            ",": "Separator"
-        }
-
-        # Types in the language
-        self.types = {
-            "Ity", "Sity", "Cwq", "CwqSequence", "Ifity", "Sifity", "Valueless", "Logical"
-        }
+    def __init__(self, engine="fast", include_cache=shared_cache, mapped=False, diagnostics=None):
+        # The keyword and symbol tables are shared, read-only, by every Scanner
+        self.keywords = KEYWORDS
+        self.special_symbols = SPECIAL_SYMBOLS
+        self.types = TYPES
+
+        # Scanning engine: "fast" uses the compiled token pattern, "reference"
+        # keeps the original character loop for differential testing
+        if engine not in ("fast", "reference"):
+            raise ValueError(f"Unknown scanning engine: {engine}")
+        self.engine = engine
+        # Whether scan_file lexes files in place over an mmap
+        self.mapped = mapped
+        # Errors also go to a diagnostics.DiagnosticCollector when given one
+        self.diagnostics = diagnostics
 
         # For tracking position in source code
         self.line_num = 1
         self.error_count = 0
         self.tokens = []
-        self.included_files = set()  # Keep track of included files to avoid infinite recursion
+        self.included_files = set()  # Resolved paths of included files, to avoid infinite recursion
+
+        # Lexed include files are shared through the cache; None scans each
+        # include afresh
+        self.include_cache = include_cache
+        # While lexing a file for the cache, the tokens between nested include
+        # directives are collected here instead of following the directives
+        self.segments = None
+        self.segment_start = (0, 0, 0)
 
     def is_digit(self, char):
         return char.isdigit()
@@ -111,24 +246,82 @@ class Scanner:
 
         self.add_token(f"Require({file_name})", "Inclusion")
 
-        # Process the included file if it's not already included
-        if file_name not in self.included_files:
-            try:
-                self.included_files.add(file_name)
-                with open(file_name, 'r') as file:
-                    included_code = file.read()
-                    # Store current line number
-                    original_line_num = self.line_num
-                    # Process the included file
-                    self.scan(included_code)
-                    # Restore original line number for continuing with the parent file
-                    self.line_num = original_line_num
-                    print(f"Successfully included file: {file_name}")
-            except FileNotFoundError:
-                print(f"Warning: File '{file_name}' not found for inclusion.")
+        self.include_file(file_name, "Require")
 
         return i
 
+    def include_file(self, file_name, kind):
+        """Scan the file named by a Require or using directive in place, once per Scanner"""
+        if self.segments is not None:
+            self.end_segment((file_name, kind))
+            return
+
+        # An empty name must still fail like open('') rather than resolve to the cwd
+        path = os.path.realpath(file_name) if file_name else file_name
+        if path in self.included_files:
+            return
+        self.included_files.add(path)
+
+        # Store current line number
+        original_line_num = self.line_num
+        try:
+            if self.include_cache is None:
+                self.scan_file(path)
+            else:
+                self.replay(self.include_cache.load(path, self.engine, self.lex_include))
+        except FileNotFoundError:
+            if kind == "Require":
+                print(f"Warning: File '{file_name}' not found for inclusion.")
+            else:
+                # Note: As per requirements, we just ignore the command if file not found
+                print(f"Warning: File '{file_name}' not found for inclusion. Continuing with current file.")
+            return
+
+        if kind == "Require":
+            # Restore original line number for continuing with the parent file
+            self.line_num = original_line_num
+            print(f"Successfully included file: {file_name}")
+
+    def lex_include(self, source_code):
+        """Scan an include file on its own, split into segments at its include directives.
+
+        Each segment is (tokens, lines, errors, directive): tokens carry lines
+        relative to the start of the segment, lines is how far the segment
+        moves the line counter, and directive is the (file_name, kind) that
+        follows it, or None for the last segment.
+        """
+        scanner = Scanner(self.engine, include_cache=None)
+        scanner.line_num = 0
+        scanner.segments = []
+        scanner.scan(source_code)
+        scanner.end_segment(None)
+        return scanner.segments
+
+    def end_segment(self, directive):
+        """Close the current segment of an include file being lexed for the cache"""
+        token_start, line_start, error_start = self.segment_start
+        tokens = self.tokens[token_start:]
+        for token in tokens:
+            token.line -= line_start
+        self.segments.append((tokens, self.line_num - line_start, self.error_count - error_start, directive))
+        self.segment_start = (len(self.tokens), self.line_num, self.error_count)
+
+    def replay(self, segments):
+        """Add the cached tokens of an include file at the current line"""
+        append = self.tokens.append
+        for tokens, lines, errors, directive in segments:
+            line = self.line_num
+            for token in tokens:
+                append(Token(token.line + line, token.text, token.type, token.error_msg))
+            if errors and self.diagnostics is not None:
+                for token in tokens:
+                    if token.type == 'ERROR':
+                        self.diagnostics.add_scan_error(token.text, token.error_msg, token.line + line)
+            self.error_count += errors
+            self.line_num = line + lines
+            if directive is not None:
+                self.include_file(*directive)
+
     def check_for_using_command(self, source_code, line_start):
         """Check if the current line begins with a 'using' command"""
         i = line_start
@@ -155,16 +348,8 @@ class Scanner:
             # Process the included file
             self.add_token(f"using {file_name}", "File Inclusion")
             
-            if file_name not in self.included_files:
-                try:
-                    self.included_files.add(file_name)
-                    with open(file_name, 'r') as file:
-                        included_code = file.read()
-                        self.scan(included_code)
-                except FileNotFoundError:
-                    print(f"Warning: File '{file_name}' not found for inclusion. Continuing with current file.")
-                    # Note: As per requirements, we just ignore the command if file not found
-            
+            self.include_file(file_name, "using")
+
             # Skip to the end of line
             while i < len(source_code) and source_code[i] != '\n':
                 i += 1
@@ -179,6 +364,363 @@ class Scanner:
 
     def scan(self, source_code):
         """Main scanning function that processes the input source code"""
+        if self.engine == "reference":
+            self.scan_reference(source_code)
+        else:
+            self.scan_fast(source_code)
+
+    def scan_file(self, path):
+        """Scan the file at path.
+
+        A mapped Scanner on the fast engine maps the file and lexes its bytes
+        in place. Files with non-ASCII bytes or carriage returns, and every
+        file otherwise, are read as text and scanned as before.
+        """
+        if self.mapped and self.engine == "fast":
+            with open(path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return  # An empty file cannot be mapped and has no tokens
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if not NEEDS_TEXT_PATTERN.search(buffer):
+                self.scan_bytes(buffer)  # The mapped tokens keep the buffer open
+                return
+            buffer.close()
+        with open(path, 'r') as file:
+            source_code = file.read()
+        self.scan(source_code)
+
+    def iter_tokens(self, source_code, chunk_size=65536):
+        """Yield tokens as they are scanned instead of keeping the whole token list.
+
+        The fast engine hands tokens over after roughly chunk_size characters,
+        stopping at line ends; the reference engine scans everything first.
+        """
+        if self.engine == "reference":
+            self.tokens = []
+            self.scan_reference(source_code)
+            tokens = self.tokens
+            self.tokens = []
+            yield from tokens
+            return
+
+        i = 0
+        while i < len(source_code):
+            self.tokens = []
+            i = self.scan_fast(source_code, i, i + chunk_size)
+            tokens = self.tokens
+            self.tokens = []
+            yield from tokens
+
+    def scan_fast(self, source_code, start=0, stop=None):
+        """Scan using the compiled token pattern, producing the same tokens as scan_reference.
+
+        Scanning begins at start, which must be a token boundary, and ends at
+        the first line end at or after stop. Returns the position reached.
+        """
+        word_types = _WORD_TYPES
+        special_symbols = _SPECIAL_SYMBOLS
+        append = self.tokens.append
+        match_using = USING_PATTERN.match
+        find_tokens = TOKEN_PATTERN.finditer
+        line = self.line_num
+        i = start
+        source_length = len(source_code)
+        stop = source_length if stop is None else min(stop, source_length)
+
+        while i < stop:
+            # Check if we're at the beginning of a line for using command
+            if (i == 0 or source_code[i - 1] == '\n') and match_using(source_code, i):
+                self.line_num = line
+                using_found, i = self.check_for_using_command(source_code, i)
+                line = self.line_num
+                continue
+
+            # Consume tokens until one needs handling outside the pattern
+            for m in find_tokens(source_code, i):
+                kind = m.lastgroup
+
+                if kind == "word":
+                    end = m.end()
+                    if end < source_length and source_code[end] >= '\x80':
+                        # Identifier continues with non-ASCII letters or digits
+                        i = self.scan_word_end(source_code, end)
+                        if i > end:
+                            append(Token(line, source_code[m.start(kind):i], "Identifier"))
+                            break
+                    word = m.group(kind)
+                    word_type = word_types.get(word)
+                    if word_type is None:
+                        append(Token(line, word, "Identifier"))
+                    else:
+                        append(Token(line, word, word_type))
+                    if word_type == REQUIRE_TYPE:
+                        self.line_num = line
+                        i = self.handle_require_statement(source_code, end)
+                        line = self.line_num
+                        break
+
+                elif kind == "symbol":
+                    symbol = m.group(kind)
+                    append(Token(line, symbol, special_symbols[symbol]))
+
+                elif kind == "newline":
+                    line += 1
+                    if m.end() >= stop:
+                        i = m.end()
+                        break
+
+                elif kind == "using_line":
+                    line += 1
+                    i = m.end()
+                    break
+
+                elif kind == "number":
+                    end = m.end()
+                    if end < source_length and source_code[end] >= '\x80':
+                        # Number continues with non-ASCII digits
+                        i = self.scan_number_end(source_code, end, '.' in m.group(kind))
+                        if i > end:
+                            append(Token(line, source_code[m.start(kind):i], "Constant"))
+                            break
+                    append(Token(line, m.group(kind), "Constant"))
+
+                elif kind == "string" or kind == "char" or kind == "block_comment":
+                    text = m.group(kind)
+                    line += text.count('\n')
+                    if kind == "string":
+                        append(Token(line, text, "String Literal"))
+                    elif kind == "char":
+                        append(Token(line, text, "Character Literal"))
+                    else:
+                        append(Token(line, text, "Comment"))
+
+                elif kind == "line_comment":
+                    append(Token(line, m.group(kind), "Comment"))
+
+                elif kind == "open_quote":
+                    # Unterminated literal runs to the end of the source
+                    line += source_code.count('\n', m.end())
+                    self.line_num = line
+                    if m.group(kind) == '"':
+                        self.add_error(source_code[m.start(kind):], "Unterminated string")
+                    else:
+                        self.add_error(source_code[m.start(kind):], "Unterminated character literal")
+                    i = source_length
+                    break
+
+                elif kind == "open_comment":
+                    # The reference loop stops one character short of the end
+                    start = m.start(kind)
+                    i = max(m.end(), source_length - 1)
+                    line += source_code.count('\n', start + 2, i)
+                    self.line_num = line
+                    self.add_error(source_code[start:i], "Unterminated multi-line comment")
+                    break
+
+                else:
+                    self.line_num = line
+                    i = self.scan_unusual_char(source_code, m.start(kind))
+                    line = self.line_num
+                    break
+            else:
+                i = source_length
+
+        self.line_num = line
+        return i
+
+    def scan_word_end(self, source_code, i):
+        """Continue an identifier past non-ASCII letters and digits"""
+        while i < len(source_code) and (
+                self.is_letter(source_code[i]) or self.is_digit(source_code[i]) or source_code[i] == '_'):
+            i += 1
+        return i
+
+    def scan_number_end(self, source_code, i, has_decimal):
+        """Continue a number past non-ASCII digits"""
+        while i < len(source_code):
+            if source_code[i] == '.' and not has_decimal:
+                has_decimal = True
+                i += 1
+            elif self.is_digit(source_code[i]):
+                i += 1
+            else:
+                break
+        return i
+
+    def scan_unusual_char(self, source_code, i):
+        """Handle a character the token pattern does not cover (non-ASCII or invalid)"""
+        char = source_code[i]
+        if self.is_letter(char):
+            end = self.scan_word_end(source_code, i)
+            self.add_token(source_code[i:end], "Identifier")
+            return end
+        if self.is_digit(char):
+            end = self.scan_number_end(source_code, i, False)
+            self.add_token(source_code[i:end], "Constant")
+            return end
+        self.add_error(char, "Invalid token")
+        return i + 1
+
+    def scan_bytes(self, buffer):
+        """Scan ASCII source in a bytes-like buffer such as an mmap, as scan_fast scans text.
+
+        Keywords and symbols take their text from the shared tables,
+        identifiers and numbers are decoded once per distinct spelling, and
+        comments and literals become MappedTokens that keep offsets into the
+        buffer until their text is read. The buffer must not hold non-ASCII
+        bytes or carriage returns.
+        """
+        byte_words = _BYTE_WORDS
+        byte_symbols = _BYTE_SYMBOLS
+        names = {}  # Decoded identifiers and numbers by their bytes
+        append = self.tokens.append
+        match_using = BYTES_USING_PATTERN.match
+        find_tokens = BYTES_TOKEN_PATTERN.finditer
+        line = self.line_num
+        i = 0
+        source_length = len(buffer)
+
+        while i < source_length:
+            # Check if we're at the beginning of a line for using command
+            if (i == 0 or buffer[i - 1] == 10) and match_using(buffer, i):
+                self.line_num = line
+                i = self.check_for_using_bytes(buffer, i)
+                line = self.line_num
+                continue
+
+            for m in find_tokens(buffer, i):
+                kind = m.lastgroup
+
+                if kind == "word":
+                    word = m.group(kind)
+                    entry = byte_words.get(word)
+                    if entry is None:
+                        text = names.get(word)
+                        if text is None:
+                            text = names[word] = word.decode('ascii')
+                        append(Token(line, text, "Identifier"))
+                    else:
+                        append(Token(line, entry[0], entry[1]))
+                        if entry[1] == REQUIRE_TYPE:
+                            self.line_num = line
+                            i = self.handle_require_statement_bytes(buffer, m.end())
+                            line = self.line_num
+                            break
+
+                elif kind == "symbol":
+                    text, token_type = byte_symbols[m.group(kind)]
+                    append(Token(line, text, token_type))
+
+                elif kind == "newline":
+                    line += 1
+
+                elif kind == "using_line":
+                    line += 1
+                    i = m.end()
+                    break
+
+                elif kind == "number":
+                    number = m.group(kind)
+                    text = names.get(number)
+                    if text is None:
+                        text = names[number] = number.decode('ascii')
+                    append(Token(line, text, "Constant"))
+
+                elif kind == "string" or kind == "char" or kind == "block_comment":
+                    start, end = m.span(kind)
+                    line += buffer[start:end].count(b'\n')
+                    if kind == "string":
+                        append(MappedToken(line, buffer, start, end, "String Literal"))
+                    elif kind == "char":
+                        append(MappedToken(line, buffer, start, end, "Character Literal"))
+                    else:
+                        append(MappedToken(line, buffer, start, end, "Comment"))
+
+                elif kind == "line_comment":
+                    start, end = m.span(kind)
+                    append(MappedToken(line, buffer, start, end, "Comment"))
+
+                elif kind == "open_quote":
+                    # Unterminated literal runs to the end of the source
+                    start = m.start(kind)
+                    line += buffer[m.end():].count(b'\n')
+                    self.line_num = line
+                    if buffer[start] == 34:  # "
+                        self.add_error(buffer[start:].decode('ascii'), "Unterminated string")
+                    else:
+                        self.add_error(buffer[start:].decode('ascii'), "Unterminated character literal")
+                    i = source_length
+                    break
+
+                elif kind == "open_comment":
+                    # The reference loop stops one character short of the end
+                    start = m.start(kind)
+                    i = max(m.end(), source_length - 1)
+                    line += buffer[start + 2:i].count(b'\n')
+                    self.line_num = line
+                    self.add_error(buffer[start:i].decode('ascii'), "Unterminated multi-line comment")
+                    break
+
+                else:
+                    # Only invalid characters are left once the source is ASCII
+                    self.line_num = line
+                    i = m.start(kind)
+                    self.add_error(chr(buffer[i]), "Invalid token")
+                    i += 1
+                    break
+            else:
+                i = source_length
+
+        self.line_num = line
+
+    def check_for_using_bytes(self, buffer, line_start):
+        """check_for_using_command for a line of a mapped buffer known to start with using"""
+        i = line_start
+        source_length = len(buffer)
+        while buffer[i] in b" \t\r":
+            i += 1
+        i += 5  # Skip 'using'
+        while i < source_length and buffer[i] in b" \t\r":
+            i += 1
+        start = i
+        while i < source_length and buffer[i] not in b" \t\n\r":
+            i += 1
+        file_name = buffer[start:i].decode('ascii').strip()
+
+        self.add_token(f"using {file_name}", "File Inclusion")
+        self.include_file(file_name, "using")
+
+        # Skip past the end of line
+        newline = buffer.find(b"\n", i)
+        if newline < 0:
+            return source_length
+        self.line_num += 1
+        return newline + 1
+
+    def handle_require_statement_bytes(self, buffer, i):
+        """handle_require_statement for a mapped buffer"""
+        source_length = len(buffer)
+        i = buffer.find(b"(", i)
+        if i < 0:
+            self.add_error("Require", "Incomplete Require statement")
+            return source_length
+        start = i + 1
+        i = buffer.find(b")", start)
+        if i < 0:
+            self.add_error("Require", "Incomplete Require statement")
+            return source_length
+        file_name = buffer[start:i].decode('ascii').strip()
+
+        # Skip to the end of the statement
+        end = buffer.find(b";", i + 1)
+        i = source_length if end < 0 else end + 1
+
+        self.add_token(f"Require({file_name})", "Inclusion")
+        self.include_file(file_name, "Require")
+        return i
+
+    def scan_reference(self, source_code):
+        """Original character-by-character scanning loop, kept as the reference engine"""
         i = 0
         source_length = len(source_code)
 
@@ -210,17 +752,15 @@ class Scanner:
 
                 word = source_code[start:i]
 
-                # Check if it's a keyword
-                if word in self.keywords:
-                    self.add_token(word, self.keywords[word])
+                # Check if it's a keyword, Require included
+                word_type = WORD_TYPES.get(word)
+                if word_type is None:
+                    self.add_token(word, "Identifier")
+                else:
+                    self.add_token(word, word_type)
                 # Handle the Require keyword for file inclusion
-                elif word == "Require":
-                    # Add the Require keyword as a token
-                    self.add_token("Require", "File Inclusion Keyword")
+                if word_type == REQUIRE_TYPE:
                     i = self.handle_require_statement(source_code, i)
-                    continue
-                else:
-                    self.add_token(word, "Identifier")
                 continue
 
             # Check for numbers (constants)
@@ -307,18 +847,11 @@ class Scanner:
                         self.add_token(comment, "Comment")
                     continue
 
-            # Check for two-character operators
-            if i + 1 < source_length:
-                two_char = char + source_code[i + 1]
-                if two_char in self.special_symbols:
-                    self.add_token(two_char, self.special_symbols[two_char])
-                    i += 2
-                    continue
-
-            # Check for single-character operators and symbols
-            if char in self.special_symbols:
-                self.add_token(char, self.special_symbols[char])
-                i += 1
+            # Check for operators and symbols, longest match first
+            symbol = match_symbol(source_code, i)
+            if symbol is not None:
+                self.add_token(*symbol)
+                i += len(symbol[0])
                 continue
 
             # If we get here, the character is not recognized
@@ -327,30 +860,23 @@ class Scanner:
 
     def add_token(self, text, token_type):
         """Add a valid token to the token list"""
-        self.tokens.append({
-            'line': self.line_num,
-            'text': text,
-            'type': token_type
-        })
+        self.tokens.append(Token(self.line_num, text, token_type))
 
     def add_error(self, text, error_msg=None):
         """Add an error token to the token list"""
         self.error_count += 1
-        self.tokens.append({
-            'line': self.line_num,
-            'text': text,
-            'type': 'ERROR',
-            'error_msg': error_msg or "Invalid token"
-        })
+        self.tokens.append(Token(self.line_num, text, 'ERROR', error_msg or "Invalid token"))
+        if self.diagnostics is not None:
+            self.diagnostics.add_scan_error(text, error_msg, self.line_num)
 
     def print_results(self):
         """Print the scanning results"""
         print("Scanning Results:\n")
         for token in self.tokens:
-            if token['type'] == 'ERROR':
-                print(f"Line #: {token['line']} Error in Token Text: {token['text']}")
+            if token.type == 'ERROR':
+                print(f"Line #: {token.line} Error in Token Text: {token.text}")
             else:
-                print(f"Line #: {token['line']} Token Text: {token['text']} Token Type: {token['type']}")
+                print(f"Line #: {token.line} Token Text: {token.text} Token Type: {token.type}")
 
         print(f"Total NO of errors: {self.error_count}")
 
@@ -359,25 +885,43 @@ class Scanner:
         return self.tokens
 
 
-def process_file(filename):
-    """Process a source code file with the scanner and parser"""
-    try:
-        with open(filename, 'r') as file:
-            source_code = file.read()
+def process_file(filename, engine="fast", stream=False, cache_dir=None, mapped=False,
+                 trace=TRACE_FULL):
+    """Process a source code file with the scanner and parser.
 
-        scanner = Scanner()
-        scanner.scan(source_code)
-        scanner.print_results()
-        tokens = scanner.get_tokens()
+    mapped scans the file in place over an mmap; it does not apply to the
+    stream and cache modes, which work on the text. trace is the parser's
+    tracing level, except in the cache mode, which keeps the full trace.
+    """
+    try:
+        scanner = Scanner(engine, mapped=mapped)
+        if stream or cache_dir is not None:
+            with open(filename, 'r') as file:
+                source_code = file.read()
+
+        if stream:
+            # Scan and parse in one pass without keeping the token list
+            tokens = []
+            parser = Parser(scanner.iter_tokens(source_code), trace=trace)
+            parser.parse()
+            print(f"Total NO of scanning errors: {scanner.error_count}")
+        elif cache_dir is not None:
+            parser = scan_and_parse_cached(scanner, source_code, DiskCache(cache_dir))
+            tokens = scanner.get_tokens()
+        else:
+            scanner.scan_file(filename)
+            scanner.print_results()
+            tokens = scanner.get_tokens()
+            parser = Parser(tokens, trace=trace)
+            parser.parse()
 
         # Parsing phase
         print("\nParser output:\n")
-        parser = Parser(tokens)
-        parser.parse()
         parser.print_results()
         if parser.parse_tree_root:
             print("\nParse Tree:")
-            print(parser.parse_tree_root)
+            parser.parse_tree_root.write(sys.stdout)
+            print()
         return tokens
 
     except FileNotFoundError:
@@ -385,12 +929,85 @@ def process_file(filename):
         return []
 
 
-if __name__ == "__main__":
-    import sys
+def check_file(filename, engine="fast", mapped=False, max_errors=None, fail_fast=False):
+    """Scan and parse a file for its diagnostics alone, returning the DiagnosticCollector.
 
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
-        process_file(filename)
+    Nothing is printed to stdout; what the scanner reports about includes
+    goes to stderr. Compiling stops at the error cap, marking the
+    collector aborted.
+    """
+    diagnostics = DiagnosticCollector(max_errors, fail_fast)
+    scanner = Scanner(engine, mapped=mapped, diagnostics=diagnostics)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            scanner.scan_file(filename)
+        Parser(scanner.tokens, diagnostics=diagnostics, trace=TRACE_OFF).parse()
+    except ErrorLimitReached:
+        diagnostics.aborted = True
+    return diagnostics
+
+
+def scan_and_parse_cached(scanner, source_code, cache):
+    """Scan and parse source_code, reusing the results cached from an earlier run"""
+    result = cache.load(source_code, scanner.engine)
+    if result is None:
+        # Keep what the scanner prints about includes so a cache hit can repeat it
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            scanner.scan(source_code)
+        sys.stdout.write(output.getvalue())
+        parser = Parser(scanner.tokens)
+        parser.parse()
+        cache.store(source_code, scanner.engine, CachedResult(
+            scanner.tokens, scanner.error_count, output.getvalue(), parser.trace,
+            parser.error_count, parser.parse_tree_root, sorted(scanner.included_files)))
+    else:
+        sys.stdout.write(result.output)
+        scanner.tokens = result.tokens
+        scanner.error_count = result.scan_errors
+        scanner.included_files = set(result.includes)
+        parser = Parser(result.tokens)
+        parser.trace = result.trace
+        parser.error_count = result.parse_errors
+        parser.parse_tree_root = result.parse_tree_root
+    scanner.print_results()
+    return parser
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    stream = "--stream" in args
+    mapped = "--mmap" in args
+    engine = "reference" if "--reference" in args else "fast"
+    cache_dir = None
+    max_errors = None
+    trace = TRACE_FULL
+    for arg in args:
+        if arg.startswith("--cache-dir="):
+            cache_dir = arg[len("--cache-dir="):]
+        elif arg.startswith("--trace="):
+            trace = arg[len("--trace="):]
+        elif arg.startswith("--max-errors="):
+            max_errors = int(arg[len("--max-errors="):])
+    fail_fast = "--fail-fast" in args
+    files = [arg for arg in args if not arg.startswith("--")]
+    if trace not in TRACE_LEVELS:
+        print(f"Error: unknown trace level '{trace}', expected one of {', '.join(TRACE_LEVELS)}")
+        sys.exit(2)
+
+    if files and ("--json" in args or max_errors is not None or fail_fast):
+        # Diagnostics only, as JSON, for builds that just need the errors
+        try:
+            diagnostics = check_file(files[0], engine, mapped, max_errors, fail_fast)
+        except FileNotFoundError:
+            print(f"Error: File '{files[0]}' not found.")
+            sys.exit(2)
+        diagnostics.write_json(sys.stdout)
+        sys.exit(1 if len(diagnostics) else 0)
+    elif files:
+        process_file(files[0], engine, stream, cache_dir, mapped, trace)
     else:
         print("Please provide a source code file as argument.")
-        print("Usage: python scanner.py <source_file>")
\ No newline at end of file
+        print("Usage: python scanner.py <source_file> [--stream] [--reference] [--cache-dir=DIR] [--mmap]"
+              " [--trace=off|counts|full]")
+        print("       python scanner.py <source_file> --json [--max-errors=N] [--fail-fast] [--reference] [--mmap]")
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+
+from parser import Parser
+from scanner import Scanner
+from syntax import (Assignment, BinaryOp, Block, EndthisStmt, FuncCall, HoweverStmt, MethodDecl,
+                    Name, Number, RespondwithStmt, ScanStmt, SrapStmt, TrueForStmt, VariableDecl,
+                    WhenStmt)
+from tracing import TRACE_OFF
+
+INTEGER_TYPES = ("Ity", "Sity")
+FLOAT_TYPES = ("Ifity", "Sifity")
+NUMERIC_TYPES = INTEGER_TYPES + FLOAT_TYPES
+ARITHMETIC = ('+', '-', '*', '/')
+LOGICAL = ('&&', '||', '~')
+ACCESS = '->'
+
+
+class Interner:
+    """Maps identifier text to small integer ids, so scopes hash ints instead of strings"""
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.ids = {name: ident for ident, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """Return the id of name, assigning the next one if it is new"""
+        ident = self.ids.get(name)
+        if ident is None:
+            ident = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return ident
+
+
+class Symbol:
+    """A declared name: a field, method, parameter or variable"""
+    __slots__ = ('ident', 'name', 'kind', 'type_name', 'node', 'line', 'param_types', 'defined')
+
+    def __init__(self, ident, name, kind, type_name, node, param_types=None, line=None):
+        self.ident = ident
+        self.name = name
+        self.kind = kind                # 'field', 'method', 'parameter' or 'variable'
+        self.type_name = type_name      # Declared type, or a method's return type
+        self.node = node                # Declaring syntax node, None once detached
+        self.line = node.line if line is None else line
+        self.param_types = param_types  # Parameter types of a method
+        self.defined = False            # Whether a method has had its body
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.kind}, {self.type_name})"
+
+    def detached(self):
+        """Copy of the symbol without its syntax node, cheap to pickle"""
+        symbol = Symbol(self.ident, self.name, self.kind, self.type_name, None,
+                        self.param_types, self.line)
+        symbol.defined = self.defined
+        return symbol
+
+
+class Scope:
+    """Symbols declared in a class, method or block, keyed by interned id"""
+    __slots__ = ('kind', 'parent', 'symbols')
+
+    def __init__(self, kind, parent=None):
+        self.kind = kind  # 'class', 'method' or 'block'
+        self.parent = parent
+        self.symbols = {}
+
+    def lookup(self, ident):
+        """Find ident in this scope or the nearest enclosing one"""
+        scope = self
+        while scope is not None:
+            symbol = scope.symbols.get(ident)
+            if symbol is not None:
+                return symbol
+            scope = scope.parent
+        return None
+
+    def freeze(self):
+        """Read-only, picklable copy of this scope for checking in other processes"""
+        return FrozenScope(self.kind, self.symbols)
+
+
+class FrozenScope(Scope):
+    """A class scope that cannot change, shared by the method checks of a process pool.
+
+    Its symbols are detached from the syntax tree, so pickling it costs
+    only the class-level names and types.
+    """
+    __slots__ = ()
+
+    def __init__(self, kind, symbols):
+        super().__init__(kind)
+        self.symbols = MappingProxyType({ident: symbol.detached()
+                                         for ident, symbol in symbols.items()})
+
+    def __reduce__(self):
+        return FrozenScope, (self.kind, dict(self.symbols))
+
+
+class SemanticIssue:
+    """One problem the analyzer found"""
+    __slots__ = ('line', 'kind', 'message')
+
+    def __init__(self, line, kind, message):
+        self.line = line
+        self.kind = kind  # 'undeclared', 'duplicate' or 'type'
+        self.message = message
+
+    def __repr__(self):
+        return f"SemanticIssue({self.line}, {self.kind!r}, {self.message!r})"
+
+    def __str__(self):
+        return f"Line {self.line}: {self.message}"
+
+
+def assignable(target, value):
+    """Whether a value of type value may be stored in a target of type target.
+
+    None stands for a type already reported or unknown, and is assignable
+    either way. Integers widen to floats, but not the other way round.
+    """
+    if target is None or value is None or target == value:
+        return True
+    if target in INTEGER_TYPES:
+        return value in INTEGER_TYPES
+    if target in FLOAT_TYPES:
+        return value in NUMERIC_TYPES
+    return False
+
+
+class Analyzer:
+    """Builds scoped symbol tables for a syntax.Program and checks every name use.
+
+    Each scope is one dict keyed by interned ids, and every declaration and
+    use costs one insert or a lookup up the short scope chain, so the pass
+    is linear in the size of the program. resolved maps each Name,
+    Assignment, FuncCall and ScanStmt node to the Symbol it uses.
+    """
+
+    def __init__(self, class_scope=None, interner=None):
+        self.interner = interner if interner is not None else Interner()
+        self.class_scope = class_scope
+        self.issues = []
+        self.resolved = {}
+        self.symbol_count = 0
+
+    def report(self, line, kind, message):
+        self.issues.append(SemanticIssue(line, kind, message))
+
+    def declare(self, scope, name, kind, type_name, node, param_types=None):
+        """Add a symbol to scope, reporting a duplicate if the name is taken there"""
+        ident = self.interner.intern(name)
+        existing = scope.symbols.get(ident)
+        if existing is not None:
+            self.report(node.line, 'duplicate', f"{name} is already declared on line {existing.line}")
+            return existing
+        symbol = scope.symbols[ident] = Symbol(ident, name, kind, type_name, node, param_types)
+        self.symbol_count += 1
+        return symbol
+
+    def resolve(self, scope, name, node):
+        """Look up a name use, reporting it if undeclared"""
+        symbol = scope.lookup(self.interner.intern(name))
+        if symbol is None:
+            self.report(node.line, 'undeclared', f"{name} is not declared")
+        else:
+            self.resolved[node] = symbol
+        return symbol
+
+    def analyze(self, program):
+        """Check a Program and return the issues found"""
+        class_decl = program.declaration
+        if class_decl is None or class_decl.members is None:
+            return self.issues
+        self.declare_members(class_decl)
+        for member in class_decl.members:
+            if isinstance(member, MethodDecl):
+                if member.body is not None:
+                    self.analyze_method(member)
+            elif isinstance(member, FuncCall):
+                self.check_call(self.class_scope, member)
+        return self.issues
+
+    def declare_members(self, class_decl):
+        """Build the class scope from every field and method, so bodies can use later ones"""
+        self.class_scope = Scope('class')
+        for member in class_decl.members:
+            if isinstance(member, VariableDecl):
+                self.declare_variables(self.class_scope, member, 'field')
+            elif isinstance(member, MethodDecl):
+                self.declare_method(member)
+
+    def declare_variables(self, scope, decl, kind):
+        if decl.size is not None:
+            self.check_size(scope, decl)
+        for name in decl.names:
+            self.declare(scope, name, kind, decl.type_name, decl)
+
+    def check_size(self, scope, decl):
+        symbol = self.resolve(scope, decl.size, decl)
+        if symbol is not None and symbol.type_name not in INTEGER_TYPES:
+            self.report(decl.line, 'type', f"Array size {decl.size} is {symbol.type_name}, not an integer")
+
+    def declare_method(self, method):
+        param_types = [param.type_name for param in method.params]
+        has_body = method.body is not None
+        existing = self.class_scope.symbols.get(self.interner.intern(method.name))
+        if (existing is not None and existing.kind == 'method'
+                and not (existing.defined and has_body)):
+            # A declaration ending in ; and the definition must agree
+            if existing.param_types != param_types or existing.type_name != method.return_type:
+                self.report(method.line, 'type',
+                            f"{method.name} does not match its declaration on line {existing.line}")
+            existing.defined = existing.defined or has_body
+            return
+        symbol = self.declare(self.class_scope, method.name, 'method', method.return_type, method,
+                              param_types)
+        if symbol.node is method:
+            symbol.defined = has_body
+
+    def method_scope(self, method):
+        """Scope of a method's parameters and variables, on top of the class scope"""
+        scope = Scope('method', self.class_scope)
+        for param in method.params:
+            self.declare(scope, param.name, 'parameter', param.type_name, param)
+        for variable in method.variables:
+            self.declare_variables(scope, variable, 'variable')
+        return scope
+
+    def analyze_method(self, method):
+        self.check_statements(self.method_scope(method), method.body, method)
+
+    def check_statements(self, scope, statements, method):
+        for statement in statements:
+            if isinstance(statement, Assignment):
+                target = self.resolve(scope, statement.target, statement)
+                value_type = self.expression_type(scope, statement.value)
+                if target is not None:
+                    if target.kind == 'method':
+                        self.report(statement.line, 'type', f"Cannot assign to method {target.name}")
+                    elif not assignable(target.type_name, value_type):
+                        self.report(statement.line, 'type', f"Cannot assign {value_type} to "
+                                    f"{target.type_name} {target.name}")
+            elif isinstance(statement, TrueForStmt):
+                self.expression_type(scope, statement.condition)
+                self.check_block(scope, statement.body, method)
+                if statement.else_body is not None:
+                    self.check_block(scope, statement.else_body, method)
+            elif isinstance(statement, HoweverStmt):
+                self.expression_type(scope, statement.condition)
+                self.check_block(scope, statement.body, method)
+            elif isinstance(statement, WhenStmt):
+                self.expression_type(scope, statement.init)
+                self.expression_type(scope, statement.condition)
+                self.expression_type(scope, statement.step)
+                self.check_block(scope, statement.body, method)
+            elif isinstance(statement, RespondwithStmt):
+                value_type = self.expression_type(scope, statement.value)
+                if method.return_type == "Valueless":
+                    self.report(statement.line, 'type', f"Valueless method {method.name} responds with a value")
+                elif not assignable(method.return_type, value_type):
+                    self.report(statement.line, 'type', f"{method.name} responds with {value_type}, "
+                                f"not {method.return_type}")
+            elif isinstance(statement, FuncCall):
+                self.check_call(scope, statement)
+            elif isinstance(statement, ScanStmt):
+                self.resolve(scope, statement.name, statement)
+            elif isinstance(statement, SrapStmt):
+                self.expression_type(scope, statement.value)
+            elif isinstance(statement, Block):
+                self.check_block(scope, statement, method)
+            elif not isinstance(statement, EndthisStmt):
+                raise TypeError(f"Unexpected statement {statement!r}")
+
+    def check_block(self, scope, block, method):
+        self.check_statements(Scope('block', scope), block.statements, method)
+
+    def check_call(self, scope, call):
+        """Check a call's target and arguments; return the method's return type"""
+        arg_types = [self.expression_type(scope, arg) for arg in call.args]
+        symbol = self.resolve(scope, call.name, call)
+        if symbol is None:
+            return None
+        if symbol.kind != 'method':
+            self.report(call.line, 'type', f"{call.name} is a {symbol.kind}, not a method")
+            return None
+        if len(arg_types) != len(symbol.param_types):
+            self.report(call.line, 'type', f"{call.name} takes {len(symbol.param_types)} "
+                        f"arguments, got {len(arg_types)}")
+        else:
+            for position, (param_type, arg_type) in enumerate(zip(symbol.param_types, arg_types), 1):
+                if not assignable(param_type, arg_type):
+                    self.report(call.line, 'type', f"Argument {position} of {call.name} is "
+                                f"{arg_type}, not {param_type}")
+        return symbol.type_name
+
+    def expression_type(self, scope, expression):
+        """Resolve the names of an expression and return its type, or None if unknown"""
+        # Chains nest down their left operands, so walk those with a loop
+        pending = []
+        node = expression
+        while isinstance(node, BinaryOp):
+            pending.append(node)
+            node = node.left
+        result = self.operand_type(scope, node)
+        while pending:
+            node = pending.pop()
+            if node.op == ACCESS:
+                # Values of the language's types have no members to look up
+                if result is not None:
+                    self.report(node.line, 'type', f"{result} has no member {node.right.name}")
+                result = None
+                continue
+            right = self.expression_type(scope, node.right)
+            result = self.operator_type(node, result, right)
+        return result
+
+    def operand_type(self, scope, node):
+        if isinstance(node, Number):
+            return "Ifity" if '.' in node.text else "Ity"
+        if isinstance(node, Name):
+            symbol = self.resolve(scope, node.name, node)
+            if symbol is None:
+                return None
+            if symbol.kind == 'method':
+                self.report(node.line, 'type', f"Method {node.name} used as a value")
+                return None
+            return symbol.type_name
+        raise TypeError(f"Unexpected operand {node!r}")
+
+    def operator_type(self, node, left, right):
+        op = node.op
+        if left is None or right is None:
+            # One side was already reported; still give comparisons their type
+            return None if op in ARITHMETIC else "Logical"
+        if op in ARITHMETIC:
+            if left in NUMERIC_TYPES and right in NUMERIC_TYPES:
+                return "Ifity" if left in FLOAT_TYPES or right in FLOAT_TYPES else "Ity"
+        elif op in LOGICAL:
+            if all(side == "Logical" or side in NUMERIC_TYPES for side in (left, right)):
+                return "Logical"
+        elif left == right or (left in NUMERIC_TYPES and right in NUMERIC_TYPES):
+            return "Logical"
+        self.report(node.line, 'type', f"Operator {op} cannot combine {left} and {right}")
+        return None if op in ARITHMETIC else "Logical"
+
+
+def analyze(program):
+    """Check a syntax.Program and return its Analyzer, holding the issues and symbol tables"""
+    analyzer = Analyzer()
+    analyzer.analyze(program)
+    return analyzer
+
+
+# Per-process state of a parallel check: an Analyzer over the frozen class
+# scope, set up once when the worker starts
+_worker_analyzer = None
+
+
+def _start_worker(class_scope, names):
+    global _worker_analyzer
+    _worker_analyzer = Analyzer(class_scope, Interner(names))
+
+
+def _check_methods(methods):
+    """Check a chunk of methods and return each one's (issues, symbol count)"""
+    analyzer = _worker_analyzer
+    results = []
+    for method in methods:
+        issues_start = len(analyzer.issues)
+        symbols_start = analyzer.symbol_count
+        analyzer.analyze_method(method)
+        analyzer.resolved.clear()  # Node identities mean nothing to the parent
+        results.append((analyzer.issues[issues_start:], analyzer.symbol_count - symbols_start))
+    return results
+
+
+def analyze_parallel(program, workers=None, chunksize=None):
+    """Check a Program with its method bodies spread across a process pool.
+
+    The class scope is built here, frozen and handed to every worker once;
+    each chunk of methods is sent only to the worker that checks it. The
+    bodies only add method and block scopes on top of the class scope, so
+    they can be checked in any order. Issues are merged back in source order
+    and match analyze's, but resolved is left empty since the nodes that
+    would key it live in the workers. workers defaults to the CPU count and
+    1 checks in this process; chunksize defaults to about four chunks of
+    methods per worker.
+    """
+    class_decl = program.declaration
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or class_decl is None or class_decl.members is None:
+        return analyze(program)
+
+    analyzer = Analyzer()
+    analyzer.declare_members(class_decl)
+    methods = [member for member in class_decl.members
+               if isinstance(member, MethodDecl) and member.body is not None]
+    if chunksize is None:
+        chunksize = max(1, len(methods) // (workers * 4))
+    chunks = [methods[start:start + chunksize] for start in range(0, len(methods), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                             initargs=(analyzer.class_scope.freeze(), analyzer.interner.names)) as executor:
+        method_results = iter([result for chunk in executor.map(_check_methods, chunks)
+                               for result in chunk])
+
+    # Class-level calls are checked here, between the bodies around them
+    for member in class_decl.members:
+        if isinstance(member, MethodDecl):
+            if member.body is not None:
+                issues, symbol_count = next(method_results)
+                analyzer.issues.extend(issues)
+                analyzer.symbol_count += symbol_count
+        elif isinstance(member, FuncCall):
+            analyzer.check_call(analyzer.class_scope, member)
+    return analyzer
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = 1
+    chunksize = None
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg[len("--workers="):]) or None
+        elif arg.startswith("--chunksize="):
+            chunksize = int(arg[len("--chunksize="):])
+    files = [arg for arg in args if not arg.startswith("--")]
+    if not files:
+        print("Usage: python semantic.py <source_file> [--workers=N] [--chunksize=N]")
+        sys.exit(1)
+    with open(files[0], 'r') as file:
+        source_code = file.read()
+    scanner = Scanner()
+    scanner.scan(source_code)
+    parser = Parser(scanner.tokens, trace=TRACE_OFF)
+    parser.parse()
+    if parser.ast_root is None:
+        print(f"{files[0]} does not parse as a program")
+        sys.exit(1)
+    analyzer = analyze_parallel(parser.ast_root, workers, chunksize)
+    for issue in sorted(analyzer.issues, key=lambda issue: issue.line):
+        print(issue)
+    print(f"Symbols: {analyzer.symbol_count}, identifiers: {len(analyzer.interner)}, "
+          f"semantic errors: {len(analyzer.issues)}")
+    sys.exit(1 if analyzer.issues else 0)
@@ -0,0 +1,213 @@
+class Node:
+    """Base class of the syntax tree the Parser builds alongside its matched rules.
+
+    Every node spans the tokens from first to last. The spans hold the Token
+    objects rather than indices, so they follow the line shifts an
+    IncrementalScanner applies to reused tokens.
+    """
+    __slots__ = ('first', 'last')
+    fields = ()
+
+    @property
+    def line(self):
+        """Line of the node's first token"""
+        return self.first.line if self.first is not None else 0
+
+    @property
+    def end_line(self):
+        """Line of the node's last token"""
+        return self.last.line if self.last is not None else self.line
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}({values})"
+
+    def walk(self):
+        """Yield this node and every node below it in preorder, without recursion"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            children = []
+            for name in node.fields:
+                value = getattr(node, name)
+                if isinstance(value, Node):
+                    children.append(value)
+                elif isinstance(value, list):
+                    children.extend(item for item in value if isinstance(item, Node))
+            stack.extend(reversed(children))
+
+
+def _init_fields(node, values):
+    node.first = node.last = None
+    for name, value in zip(node.fields, values):
+        setattr(node, name, value)
+
+
+# Declarations
+
+class Program(Node):
+    """Program -> Start_Symbols ClassDeclaration End_Symbols"""
+    __slots__ = fields = ('start_symbol', 'declaration', 'end_symbol')
+
+    def __init__(self, start_symbol, declaration=None, end_symbol=None):
+        _init_fields(self, (start_symbol, declaration, end_symbol))
+
+
+class ClassDecl(Node):
+    """ClassDeclaration; members is None when the class body is missing"""
+    __slots__ = fields = ('type_name', 'name', 'base', 'members')
+
+    def __init__(self, type_name, name, base=None, members=None):
+        _init_fields(self, (type_name, name, base, members))
+
+
+# The class member node names match the rule names in the parse tree
+
+class VariableDecl(Node):
+    """VariableDecl -> Type IDList ; | Type IDList [ ID ] ;"""
+    __slots__ = fields = ('type_name', 'names', 'size')
+
+    def __init__(self, type_name, names, size=None):
+        _init_fields(self, (type_name, names, size))
+
+
+class MethodDecl(Node):
+    """MethodDecl; body is None for a declaration ending in ;"""
+    __slots__ = fields = ('return_type', 'name', 'params', 'variables', 'body')
+
+    def __init__(self, return_type, name, params, variables=None, body=None):
+        _init_fields(self, (return_type, name, params,
+                            variables if variables is not None else [], body))
+
+
+class Param(Node):
+    """Parameter -> Type ID"""
+    __slots__ = fields = ('type_name', 'name')
+
+    def __init__(self, type_name, name):
+        _init_fields(self, (type_name, name))
+
+
+class FuncCall(Node):
+    """FuncCall -> ID ( ArgumentList ) ; as a class member, statement or part of one"""
+    __slots__ = fields = ('name', 'args')
+
+    def __init__(self, name, args):
+        _init_fields(self, (name, args))
+
+
+class Comment(Node):
+    """Comment -> /< STR >/ | /* STR"""
+    __slots__ = fields = ('text',)
+
+    def __init__(self, text):
+        _init_fields(self, (text,))
+
+
+class RequireCommand(Node):
+    """RequireCommand -> Require ( F_name.txt ) ; with file_name None if malformed"""
+    __slots__ = fields = ('file_name',)
+
+    def __init__(self, file_name):
+        _init_fields(self, (file_name,))
+
+
+# Statements
+
+class Block(Node):
+    """Block -> { Statements }"""
+    __slots__ = fields = ('statements',)
+
+    def __init__(self, statements):
+        _init_fields(self, (statements,))
+
+
+class Assignment(Node):
+    """Assignment -> ID = Expression ;"""
+    __slots__ = fields = ('target', 'value')
+
+    def __init__(self, target, value):
+        _init_fields(self, (target, value))
+
+
+class TrueForStmt(Node):
+    """TrueForStmt -> TrueFor ( ConditionExpression ) Block [ Else Block ]"""
+    __slots__ = fields = ('condition', 'body', 'else_body')
+
+    def __init__(self, condition, body, else_body=None):
+        _init_fields(self, (condition, body, else_body))
+
+
+class HoweverStmt(Node):
+    """HoweverStmt -> However ( ConditionExpression ) Block"""
+    __slots__ = fields = ('condition', 'body')
+
+    def __init__(self, condition, body):
+        _init_fields(self, (condition, body))
+
+
+class WhenStmt(Node):
+    """WhenStmt -> When ( Expression ; Expression ; Expression ) Block"""
+    __slots__ = fields = ('init', 'condition', 'step', 'body')
+
+    def __init__(self, init, condition, step, body):
+        _init_fields(self, (init, condition, step, body))
+
+
+class RespondwithStmt(Node):
+    """RespondwithStmt -> Respondwith Expression ; | Respondwith ID ;"""
+    __slots__ = fields = ('value',)
+
+    def __init__(self, value):
+        _init_fields(self, (value,))
+
+
+class EndthisStmt(Node):
+    """EndthisStmt -> Endthis ;"""
+    __slots__ = ()
+
+    def __init__(self):
+        _init_fields(self, ())
+
+
+class ScanStmt(Node):
+    """ScanStmt -> Scan(Conditionof ID) ;"""
+    __slots__ = fields = ('name',)
+
+    def __init__(self, name):
+        _init_fields(self, (name,))
+
+
+class SrapStmt(Node):
+    """SrapStmt -> Srap ( Expression ) ;"""
+    __slots__ = fields = ('value',)
+
+    def __init__(self, value):
+        _init_fields(self, (value,))
+
+
+# Expressions
+
+class BinaryOp(Node):
+    """Arithmetic, comparison, logical and -> access operators"""
+    __slots__ = fields = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        _init_fields(self, (op, left, right))
+
+
+class Name(Node):
+    """Factor -> ID"""
+    __slots__ = fields = ('name',)
+
+    def __init__(self, name):
+        _init_fields(self, (name,))
+
+
+class Number(Node):
+    """Factor -> Number, keeping the constant's source text"""
+    __slots__ = fields = ('text',)
+
+    def __init__(self, text):
+        _init_fields(self, (text,))
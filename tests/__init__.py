@@ -0,0 +1 @@
+"""Tests for the compiler; run with python -m unittest (or python -m pytest) from the repository root"""
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from batch import compile_files
+
+SOURCES = {
+    "good.txt": "@ Type C {\n    Ity a;\n} $\n".encode('ascii'),
+    "bad.txt": b"@ Type C {\n    Ity \xff\xfe;\n} $\n",
+    "bad_include.txt": b"Require(bad.bin);\n@ Type C {\n} $\n",
+    "dir_include.txt": b"Require(d);\n@ Type C {\n} $\n",
+    "bad.bin": b"\xff\xff\xff",
+}
+
+
+class BatchTest(unittest.TestCase):
+    """Files that cannot be read fail on their own, in the cwd their includes are relative to"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(directory.name)
+        for name, data in SOURCES.items():
+            with open(name, 'wb') as file:
+                file.write(data)
+        os.mkdir("d")
+
+    def test_unreadable_files_are_reported_in_their_results(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                bad, bad_include, dir_include, good, missing = compile_files([".", "missing.txt"], workers)
+                self.assertIn("decode", bad.error)
+                self.assertIn("decode", bad_include.error)
+                self.assertIn("directory", dir_include.error)
+                self.assertIsNotNone(missing.error)
+                self.assertIsNone(good.error)
+                self.assertEqual((good.scan_errors, good.parse_errors), (0, 0))
+                self.assertGreater(good.token_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from disk_cache import COMPILER_FILES
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lists the repository modules a fresh interpreter loads to import scanner
+LIST_MODULES = """
+import os, sys, scanner
+for module in list(sys.modules.values()):
+    path = getattr(module, '__file__', None)
+    if path and os.path.dirname(os.path.abspath(path)) == os.getcwd():
+        print(os.path.basename(path))
+"""
+
+
+class CompilerVersionTest(unittest.TestCase):
+
+    def test_compiler_files_cover_every_imported_module(self):
+        output = subprocess.run([sys.executable, "-c", LIST_MODULES], cwd=REPO, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(sorted(COMPILER_FILES), sorted(output.split()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from include_cache import IncludeCache
+
+
+def lex(source_code):
+    # One segment holding a token per line, enough for the cache to size it
+    return [(source_code.splitlines(),)]
+
+
+class IncludeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.paths = []
+        for i in range(6):
+            path = os.path.join(directory.name, f"inc_{i}.txt")
+            with open(path, 'w') as file:
+                file.write(f"Ity a{i % 2};\nIty b;\n")
+            self.paths.append(path)
+
+    def test_paths_are_bounded(self):
+        cache = IncludeCache(max_paths=3)
+        for i, path in enumerate(self.paths):
+            self.assertEqual(cache.load(path, "fast", lex), lex(f"Ity a{i % 2};\nIty b;\n"))
+        self.assertEqual(list(cache.paths), self.paths[3:])
+        # Copies share entries, so only the first of each content missed
+        self.assertEqual((cache.misses, cache.hits), (2, 4))
+        cache.load(self.paths[3], "fast", lex)
+        cache.load(self.paths[0], "fast", lex)
+        self.assertEqual(list(cache.paths), [self.paths[5], self.paths[3], self.paths[0]])
+
+    def test_entries_are_bounded(self):
+        cache = IncludeCache(max_tokens=3)
+        for path in self.paths[:2]:
+            cache.load(path, "fast", lex)
+        self.assertEqual(cache.token_count, 2)
+        self.assertEqual(len(cache.entries), 1)
+        cache.clear()
+        self.assertEqual((len(cache.paths), len(cache.entries), cache.token_count), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
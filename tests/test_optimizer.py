@@ -0,0 +1,182 @@
+import unittest
+
+from bytecode import compile_program
+from optimizer import fold_constants
+from parser import Parser
+from scanner import Scanner
+from semantic import analyze
+from syntax import BinaryOp, Name, Number, RespondwithStmt, TrueForStmt
+from tracing import TRACE_OFF
+from vm import VM, VMError
+
+PROGRAM = """@ Type Fold {
+    Ity constants(Ity x) {
+        Respondwith x + 2 * 3 + 4 - 10 / 4;
+    }
+
+    Ifity times_zero(Ifity y) {
+        Respondwith 7 / (y * 0 + 2);
+    }
+
+    Ifity identities(Ifity y) {
+        Respondwith (y * 1 + 0 - 0) / 1 + 0 * 0;
+    }
+
+    Ifity float_one(Ity x) {
+        Respondwith x * 1.0;
+    }
+
+    Ity branches(Ity x) {
+        TrueFor (1 < 2 && x == x) {
+            x = x + 1;
+        } Else {
+            x = x - 1;
+        }
+        TrueFor (2 > 3) {
+            x = 0;
+        }
+        However (0) {
+            x = 0;
+        }
+        Respondwith x;
+    }
+
+    Logical conditions(Ity x) {
+        Respondwith x > 1 || 0;
+    }
+
+    Ity divide_by_zero(Ity x) {
+        Respondwith x + 1 / 0;
+    }
+
+    Ity int_zero(Ity x) {
+        Respondwith x * 0 + 0 * (x + 1) + (10 / x) * 0 + x * 1 - 0 + 0;
+    }
+
+    Ifity float_zero(Ifity y) {
+        Respondwith y * 0 + 0 + y * 1;
+    }
+} $
+"""
+
+CALLS = [("constants", 1), ("times_zero", 1.5), ("times_zero", 2), ("identities", 2.5), ("identities", 3),
+         ("float_one", 3), ("branches", 5), ("conditions", 3), ("conditions", 0), ("int_zero", 4),
+         ("int_zero", 0), ("float_zero", -0.0), ("float_zero", float('inf')), ("float_zero", 2.5)]
+
+# Operands the identities must not touch: the analyzer reports b * 1 and
+# c + 0, so nothing is proven about them, and the VM gives 1 and an error
+MIXED = """@ Type Mixed {
+    Logical times_one(Logical b) {
+        Respondwith b * 1;
+    }
+
+    Cwq plus_zero(Cwq c) {
+        Respondwith c + 0;
+    }
+
+    Ity int_times_one(Ity x) {
+        Respondwith x * 1 + 0;
+    }
+} $
+"""
+
+MIXED_CALLS = [("times_one", True), ("times_one", False), ("plus_zero", "x"), ("int_times_one", 3)]
+
+
+def parse(source_code):
+    scanner = Scanner()
+    scanner.scan(source_code)
+    parser = Parser(scanner.tokens, trace=TRACE_OFF)
+    parser.parse()
+    assert parser.error_count == 0
+    return parser.ast_root
+
+
+def method_body(program, name):
+    return next(member for member in program.declaration.members if member.name == name).body
+
+
+def outcome(vm, name, args):
+    """Type and repr of a call's result, so 0.0 and -0.0 or nan differ, or its error"""
+    try:
+        result = vm.call(name, *args)
+    except VMError as e:
+        return "error", str(e)
+    return type(result), repr(result)
+
+
+class ConstantFolderTest(unittest.TestCase):
+
+    def assert_folding_keeps_outcomes(self, source_code, calls):
+        plain = VM(compile_program(parse(source_code)))
+        program = parse(source_code)
+        eliminated = fold_constants(program)
+        folded = VM(compile_program(program))
+        for name, *args in calls:
+            with self.subTest(name=name, args=args):
+                self.assertEqual(outcome(folded, name, args), outcome(plain, name, args))
+        return eliminated
+
+    def test_folding_keeps_results_and_types(self):
+        self.assertFalse(analyze(parse(PROGRAM)).issues)
+        self.assertGreater(self.assert_folding_keeps_outcomes(PROGRAM, CALLS), 0)
+
+    def test_identities_need_proven_numeric_operands(self):
+        self.assertTrue(analyze(parse(MIXED)).issues)
+        self.assertEqual(self.assert_folding_keeps_outcomes(MIXED, MIXED_CALLS), 0)
+
+    def test_constants_fold_to_a_number(self):
+        program = parse("@ Type F {\n    Ity f() { Respondwith 2 * 3 + 4 - 10 / 4; }\n} $\n")
+        self.assertEqual(fold_constants(program), 8)
+        value = method_body(program, "f")[0].value
+        self.assertIsInstance(value, Number)
+        self.assertEqual(value.text, "8")
+
+    def test_times_zero_is_kept(self):
+        program = parse(PROGRAM)
+        fold_constants(program)
+        value = method_body(program, "times_zero")[0].value
+        self.assertIsInstance(value.right.left, BinaryOp)
+        self.assertEqual(value.right.left.op, '*')
+
+    def test_integer_times_zero_folds(self):
+        program = parse(PROGRAM)
+        fold_constants(program)
+        value = method_body(program, "int_zero")[0].value
+        # Only the term that divides, and could fail, is kept
+        self.assertEqual(value.op, '+')
+        self.assertEqual((value.left.op, value.left.right.text), ('*', '0'))
+        self.assertEqual(value.left.left.op, '/')
+        self.assertIsInstance(value.right, Name)
+
+    def test_float_identities_keep_signed_zero(self):
+        program = parse(PROGRAM)
+        fold_constants(program)
+        value = method_body(program, "float_zero")[0].value
+        # y * 0 + 0 stays, since -0.0 * 0 + 0 is 0.0; only y * 1 reduces
+        self.assertEqual(value.op, '+')
+        self.assertEqual((value.left.op, value.left.right.text), ('+', '0'))
+        self.assertIsInstance(value.right, Name)
+
+    def test_dead_branches_are_dropped(self):
+        program = parse(PROGRAM)
+        fold_constants(program)
+        body = method_body(program, "branches")
+        # Only x == x is left of the first condition, which keeps its TrueFor;
+        # the TrueFor and However whose conditions are false are gone
+        self.assertEqual([type(statement) for statement in body], [TrueForStmt, RespondwithStmt])
+        condition = body[0].condition
+        self.assertIsInstance(condition, BinaryOp)
+        self.assertEqual(condition.op, '==')
+
+    def test_division_by_zero_is_left_for_the_vm(self):
+        program = parse(PROGRAM)
+        fold_constants(program)
+        value = method_body(program, "divide_by_zero")[0].value
+        self.assertIsInstance(value.right, BinaryOp)
+        with self.assertRaisesRegex(VMError, "division"):
+            VM(compile_program(program)).call("divide_by_zero", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
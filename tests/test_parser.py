@@ -0,0 +1,111 @@
+import io
+import random
+import unittest
+
+from benchmarks.error_recovery import CASES, SIZE
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_OFF
+from tree_export import write_binary, write_jsonl
+
+# Class-level pieces put together at random, with broken headers and extra programs
+HEADS = ["@ Type A {\n", "^ Type A DerivedFrom B {\n", "@ Type A DerivedFrom {\n", "@ Type {\n", "@ Ity A {\n",
+         "x y @ Type A {\n", "Type A {\n", "@ Type A\n", ""]
+MEMBERS = ["Ity a;\n", "Ity a, b;\n", "Ifity f(Ifity x) { Respondwith x; }\n", "Valueless g();\n",
+           "foo(1, 2);\n", "/< c >/\n", "Ity h(", "}", "{", ";", "x", "Require(inc.txt);\n", "Ity f()\n"]
+TAILS = ["} $\n", "} #\n", "}\n", "", "} $ @ Type B { Ity b; } $\n", "} @ Type B { } #\n"]
+
+# Errors each broken program of the benchmark's size reports
+ERROR_COUNTS = {"clean": 0, "missing_start": 1, "missing_brace": 1, "stray_tokens": SIZE}
+
+
+class CountingParser(Parser):
+    """A Parser that counts how often it moves to the next token"""
+
+    def __init__(self, tokens):
+        self.advances = 0
+        super().__init__(tokens)
+
+    def advance(self):
+        self.advances += 1
+        super().advance()
+
+
+def scan(source_code):
+    scanner = Scanner()
+    scanner.scan(source_code)
+    return scanner.tokens
+
+
+def random_programs(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(HEADS) + "".join(rng.choice(MEMBERS) for _ in range(rng.randint(0, 12))) + rng.choice(TAILS)
+            for _ in range(count)]
+
+
+class ArenaTest(unittest.TestCase):
+    """Parser(arena=True) fills a TreeArena while parsing, shaped like the object tree"""
+
+    def parse_both(self, source_code):
+        tokens = scan(source_code)
+        objects = Parser(tokens)
+        objects.parse()
+        arena = Parser(tokens, arena=True)
+        arena.parse()
+        return tokens, objects, arena
+
+    def test_arena_matches_object_tree(self):
+        for source_code in random_programs(500):
+            with self.subTest(source_code=source_code):
+                tokens, objects, arena = self.parse_both(source_code)
+                self.assertEqual((arena.matched_rules, arena.error_count),
+                                 (objects.matched_rules, objects.error_count))
+                self.assertEqual(repr(arena.parse_tree_root), repr(objects.parse_tree_root))
+                streamed = Parser(iter(tokens), arena=True)
+                streamed.parse()
+                self.assertEqual(repr(streamed.parse_tree_root), repr(objects.parse_tree_root))
+
+    def test_arena_exports_like_object_tree(self):
+        _, objects, arena = self.parse_both("@ Type A DerivedFrom B {\n Ity a;\n Ity f() { }\n} $\n")
+        for write in (write_jsonl, write_binary):
+            outputs = []
+            for root in (objects.parse_tree_root, arena.parse_tree_root):
+                out = io.StringIO() if write is write_jsonl else io.BytesIO()
+                write(root, out)
+                outputs.append(out.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+
+    def test_arena_stores_token_indices(self):
+        tokens, _, parser = self.parse_both("@ Type A {\n Ity a;\n} $\n")
+        tree = parser.parse_tree_root.arena
+        self.assertIs(tree.tokens, tokens)
+        used = [index for index in tree.token if index >= 0]
+        self.assertEqual([tokens[index].text for index in used], ["@", "A", "$"])
+        self.assertIsNone(parser.ast_root)
+
+
+class RecoveryTest(unittest.TestCase):
+    """Broken programs of benchmarks.error_recovery report one error per problem in one pass"""
+
+    def test_error_counts(self):
+        self.assertEqual(SIZE, 12000)
+        for name, (build, _) in CASES.items():
+            with self.subTest(name=name):
+                parser = Parser(scan(build(SIZE)), trace=TRACE_OFF)
+                parser.parse()
+                self.assertEqual(parser.error_count, ERROR_COUNTS[name])
+
+    def test_each_token_is_passed_once(self):
+        # Recovery skips forward only, so no token is gone over twice
+        for name, (build, expected) in CASES.items():
+            with self.subTest(name=name):
+                tokens = scan(build(300))
+                parser = CountingParser(tokens)
+                parser.parse()
+                self.assertEqual(parser.error_count, expected(300))
+                self.assertEqual(parser.advances, len(tokens))
+                self.assertLessEqual(parser.peeked, len(tokens))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from scanner import Scanner
+
+SAMPLES = [
+    "",
+    "@ Type C {\n    Ity a, b;\n    Ifity f(Ifity x) {\n        Respondwith x * x;\n    }\n} $\n",
+    'Cwq c = \'a\';\nCwqSequence s = "Hello World";\n"open string\n',
+    "/* line comment\n/< block\n   comment >/ x /< unterminated\n",
+    "1 12 3.5 1.2.3 .5 a1 _x9 x_ 9a\n",
+    "== != <= >= && || ! & | -> - / * + = < > ^ # ~ ` ? [ ] { } ( ) ; , . @ $\n",
+    "using inc_a.txt\nIty b;\n  using inc_a.txt\nusing missing.txt\nusingx\n",
+    "Require(inc_b.txt);\nRequire ( inc_a.txt ) ;\nRequire(missing.txt);\nRequire(\n",
+    "tab\there\x0bvertical\r\nwindows\rmac\n",
+    "é ² ٣ ½ unicode\n",
+]
+
+# Pieces of source put together at random, to reach the corners the samples miss
+PIECES = ["using ", "using inc_a.txt", "Require(", "Require(inc_a.txt);", "Require ( inc_b.txt ) ;",
+          "missing.txt", ";", "\n", "\n", " ", "\t", "\r", '"', "'", '"s t"', "/<", ">/", "/*", "/",
+          "<", ">", "é", "1.2.3", "12", ".", "&&", "&", "|", "||", "!", "!=", "->", "-", "Ity",
+          "Type", "abc", "_x9", "(", ")", "{", "}", "@", "$", "#", "==", "=", ",", "[", "]", "When"]
+
+INCLUDES = {
+    "inc_a.txt": 'Ity a;\n"str\nx" /< c\n >/ z\n',
+    "inc_b.txt": "using inc_a.txt\nIty b; Require(inc_a.txt);\n",
+}
+
+
+def random_sources(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+def token_tuples(tokens):
+    return [(token.line, token.text, token.type, token.error_msg) for token in tokens]
+
+
+def enter_include_directory(test):
+    """Run test in a temporary directory holding the include files"""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    cwd = os.getcwd()
+    test.addCleanup(os.chdir, cwd)
+    os.chdir(directory.name)
+    for name, text in INCLUDES.items():
+        with open(name, 'w') as file:
+            file.write(text)
+
+
+class EngineTest(unittest.TestCase):
+    """The fast scanning paths against the reference engine, with include files in the cwd"""
+
+    def setUp(self):
+        enter_include_directory(self)
+
+    def scan(self, source_code, engine="fast"):
+        """Scan with a fresh Scanner; return its tokens, line, error count and output"""
+        scanner = Scanner(engine, include_cache=None)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            scanner.scan(source_code)
+        return token_tuples(scanner.tokens), scanner.line_num, scanner.error_count, out.getvalue()
+
+    def sources(self):
+        return SAMPLES + random_sources(300)
+
+    def test_scan_fast_matches_reference(self):
+        for source_code in self.sources():
+            with self.subTest(source_code=source_code):
+                self.assertEqual(self.scan(source_code), self.scan(source_code, "reference"))
+
+    def test_iter_tokens_matches_reference(self):
+        for source_code in self.sources():
+            for chunk_size in (1, 7, 65536):
+                with self.subTest(source_code=source_code, chunk_size=chunk_size):
+                    scanner = Scanner(include_cache=None)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        tokens = token_tuples(scanner.iter_tokens(source_code, chunk_size))
+                    self.assertEqual(tokens, self.scan(source_code, "reference")[0])
+
+    def test_scan_bytes_matches_reference(self):
+        for source_code in self.sources():
+            # scan_bytes takes ASCII without carriage returns, as scan_file hands it
+            if not source_code.isascii() or '\r' in source_code:
+                continue
+            with self.subTest(source_code=source_code):
+                scanner = Scanner(include_cache=None)
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    scanner.scan_bytes(source_code.encode('ascii'))
+                result = (token_tuples(scanner.tokens), scanner.line_num, scanner.error_count, out.getvalue())
+                self.assertEqual(result, self.scan(source_code, "reference"))
+
+    def test_shared_include_cache_matches_reference(self):
+        for source_code in SAMPLES:
+            with self.subTest(source_code=source_code):
+                scanner = Scanner()
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    scanner.scan(source_code)
+                result = (token_tuples(scanner.tokens), scanner.line_num, scanner.error_count, out.getvalue())
+                self.assertEqual(result, self.scan(source_code, "reference"))
+
+
+class MappedScanTest(unittest.TestCase):
+    """Scanner(mapped=True).scan_file against the reference scan of the same file"""
+
+    def setUp(self):
+        enter_include_directory(self)
+
+    def scan_file(self, source_code, scanner):
+        with open("source.txt", 'w', newline='') as file:
+            file.write(source_code)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            scanner.scan_file("source.txt")
+        return token_tuples(scanner.tokens), scanner.line_num, scanner.error_count, out.getvalue()
+
+    def test_mapped_scan_matches_reference(self):
+        # Non-ASCII text and carriage returns take the text path, the rest the mapped one
+        for source_code in SAMPLES + random_sources(300):
+            with self.subTest(source_code=source_code):
+                self.assertEqual(self.scan_file(source_code, Scanner(include_cache=None, mapped=True)),
+                                 self.scan_file(source_code, Scanner("reference", include_cache=None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from parser import Parser
+from scanner import Scanner
+from semantic import analyze, analyze_parallel
+from tracing import TRACE_OFF
+
+# Method bodies cycled through to build a class; between them they raise
+# every kind of issue and use fields and methods declared further down
+BODIES = [
+    "    Ity ok{i}(Ity a) {{\n        Ity b;\n        b = a + size;\n        Respondwith b * 2;\n    }}\n",
+    "    Ifity widen{i}(Ity a) {{\n        Ifity f;\n        f = a;\n        Respondwith f / 2;\n    }}\n",
+    "    Ity narrow{i}(Ifity f) {{\n        Ity a;\n        a = f;\n        Respondwith f;\n    }}\n",
+    "    Valueless calls{i}(Ity a) {{\n        ok{i}(a);\n        ok{i}(a, a);\n        nosuch(a);\n"
+    "        size(a);\n        Respondwith a;\n    }}\n",
+    "    Ity blocks{i}(Ity a) {{\n        Ity a;\n        TrueFor (a < later) {{\n"
+    "            c = missing + a;\n        }} Else {{\n            a = a && 1;\n        }}\n"
+    "        However (a > 0) {{\n            a = a - 1;\n        }}\n        Respondwith c;\n    }}\n",
+    "    Logical methods{i}(Ity a) {{\n        ok{i} = a;\n        Respondwith ok{i} == a;\n    }}\n",
+]
+
+
+def program_source(count):
+    """A class of count methods around fields and class-level calls"""
+    members = ["    Ity size;\n"]
+    for i in range(count):
+        members.append(BODIES[i % len(BODIES)].format(i=i - i % len(BODIES)))
+        if i % 7 == 3:
+            members.append(f"    Ity field{i}, size;\n    ok0(field{i}, later);\n")
+    members.append("    Ity later;\n    Ity declared(Ity a);\n    Ity declared(Ifity a) { Respondwith 1; }\n")
+    return "@ Type Checked {\n" + "".join(members) + "} $\n"
+
+
+def parse(source_code):
+    scanner = Scanner()
+    scanner.scan(source_code)
+    parser = Parser(scanner.tokens, trace=TRACE_OFF)
+    parser.parse()
+    assert parser.error_count == 0
+    return parser.ast_root
+
+
+def results(analyzer):
+    # Names local to the bodies are interned in the workers, so the interners differ
+    return [repr(issue) for issue in analyzer.issues], analyzer.symbol_count
+
+
+class ParallelAnalysisTest(unittest.TestCase):
+    """analyze_parallel against the sequential analyze on the same programs"""
+
+    def test_parallel_matches_sequential(self):
+        program = parse(program_source(60))
+        expected = results(analyze(program))
+        self.assertEqual({issue.kind for issue in analyze(program).issues}, {'undeclared', 'duplicate', 'type'})
+        for workers, chunksize in ((2, None), (2, 1), (3, 7), (4, 100)):
+            with self.subTest(workers=workers, chunksize=chunksize):
+                self.assertEqual(results(analyze_parallel(program, workers, chunksize)), expected)
+
+    def test_single_worker_and_empty_class(self):
+        program = parse(program_source(6))
+        self.assertEqual(results(analyze_parallel(program, 1)), results(analyze(program)))
+        empty = parse("@ Type Empty {\n} $\n")
+        self.assertEqual(results(analyze_parallel(empty, 2)), results(analyze(empty)))
+
+    def test_parallel_resolves_only_class_level_calls(self):
+        program = parse(program_source(6))
+        self.assertGreater(len(analyze(program).resolved), 2)
+        resolved = analyze_parallel(program, 2).resolved
+        self.assertEqual(sorted(node.name for node in resolved), ["field3", "later", "ok0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+
+from bytecode import CompileError
+from vm import MAX_CALL_DEPTH, VM, VMError, load_module
+
+PROGRAM = """@ Type Calc {
+    Ity total;
+
+    Ity arith(Ity a, Ity b) {
+        Respondwith a + b * 2 - (a - b) / 2;
+    }
+
+    Ity quotient(Ity a, Ity b) {
+        Respondwith a / b;
+    }
+
+    Ifity half(Ifity x) {
+        Respondwith x / 2;
+    }
+
+    Ity sum(Ity n) {
+        Ity s, i;
+        s = 0;
+        i = 1;
+        However (i <= n) {
+            s = s + i;
+            i = i + 1;
+        }
+        Respondwith s;
+    }
+
+    Ity first_over(Ity limit) {
+        Ity i;
+        i = 0;
+        However (1) {
+            TrueFor (i * i > limit) {
+                Endthis;
+            }
+            i = i + 1;
+        }
+        Respondwith i;
+    }
+
+    Ity magnitude(Ity x) {
+        TrueFor (x < 0) {
+            Respondwith 0 - x;
+        } Else {
+            Respondwith x;
+        }
+    }
+
+    Logical safe_ratio(Ity a, Ity b) {
+        Respondwith b != 0 && a / b > 1;
+    }
+
+    Valueless add(Ity x) {
+        total = total + x;
+    }
+
+    Ity accumulate(Ity n) {
+        Ity i;
+        i = 0;
+        However (i < n) {
+            add(i);
+            i = i + 1;
+        }
+        Respondwith total;
+    }
+
+    Valueless down(Ity n) {
+        TrueFor (n > 0) {
+            down(n - 1);
+        }
+    }
+
+    Ity declared(Ity n);
+} $
+"""
+
+
+class VMTest(unittest.TestCase):
+    """Programs compiled by load_module and run on the VM"""
+
+    def load(self, source_code, fold=False):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as file:
+            file.write(source_code)
+        self.addCleanup(os.remove, file.name)
+        return load_module(file.name, fold)
+
+    def setUp(self):
+        self.vm = VM(self.load(PROGRAM))
+
+    def test_arithmetic(self):
+        self.assertEqual(self.vm.call("arith", 7, 3), 7 + 3 * 2 - 2)
+        self.assertEqual(self.vm.call("half", 3.0), 1.5)
+
+    def test_integer_division_truncates_toward_zero(self):
+        self.assertEqual(self.vm.call("quotient", 7, 2), 3)
+        self.assertEqual(self.vm.call("quotient", -7, 2), -3)
+        self.assertEqual(self.vm.call("quotient", 7, -2), -3)
+
+    def test_loops_and_branches(self):
+        self.assertEqual(self.vm.call("sum", 100), 5050)
+        self.assertEqual(self.vm.call("sum", 0), 0)
+        self.assertEqual(self.vm.call("first_over", 50), 8)
+        self.assertEqual(self.vm.call("magnitude", -4), 4)
+        self.assertEqual(self.vm.call("magnitude", 4), 4)
+
+    def test_and_short_circuits(self):
+        self.assertIs(self.vm.call("safe_ratio", 5, 0), False)
+        self.assertIs(self.vm.call("safe_ratio", 5, 2), True)
+
+    def test_calls_update_fields(self):
+        self.assertEqual(self.vm.call("accumulate", 10), 45)
+        self.assertEqual(self.vm.call("accumulate", 10), 90)
+
+    def test_long_chains_compile(self):
+        chain = 5000  # Operands, well past Python's recursion limit
+        vm = VM(self.load("@ Type L {\n"
+                          f"    Logical all(Ity a, Ity b) {{ Respondwith {' && '.join(['a'] * chain)} && b; }}\n"
+                          f"    Logical any(Ity a, Ity b) {{ Respondwith {' || '.join(['a'] * chain)} || b; }}\n"
+                          f"    Ity total(Ity a) {{ Respondwith {' + '.join(['a'] * chain)}; }}\n"
+                          "} $\n"))
+        self.assertEqual((vm.call("all", 1, 2), vm.call("all", 0, 2)), (2, 0))
+        self.assertEqual((vm.call("any", 0, 2), vm.call("any", 3, 2)), (2, 3))
+        self.assertEqual(vm.call("total", 2), 2 * chain)
+
+    def test_call_depth(self):
+        self.assertIsNone(self.vm.call("down", MAX_CALL_DEPTH - 1))
+        with self.assertRaisesRegex(VMError, "Call depth"):
+            self.vm.call("down", MAX_CALL_DEPTH + 1)
+
+    def test_runtime_errors(self):
+        with self.assertRaisesRegex(VMError, "Unknown method"):
+            self.vm.call("nosuch")
+        with self.assertRaisesRegex(VMError, "takes 2 arguments"):
+            self.vm.call("arith", 1)
+        with self.assertRaisesRegex(VMError, "no body"):
+            self.vm.call("declared", 1)
+        with self.assertRaisesRegex(VMError, "Line 9 in quotient"):
+            self.vm.call("quotient", 1, 0)
+
+    def test_parse_errors_do_not_compile(self):
+        # Calls are statements, so this Respondwith fails to parse
+        source_code = ("@ Type M {\n    Ity fib(Ity k) { TrueFor (k < 2) { Respondwith k; }\n"
+                       "        Respondwith fib(k - 1) + fib(k - 2); }\n} $\n")
+        with self.assertRaisesRegex(CompileError, "1 parse errors"):
+            self.load(source_code)
+
+    def test_compile_errors(self):
+        with self.assertRaisesRegex(CompileError, "undeclared variable y"):
+            self.load("@ Type M {\n    Ity f(Ity x) { Respondwith y; }\n} $\n")
+        with self.assertRaisesRegex(CompileError, "duplicate method f"):
+            self.load("@ Type M {\n    Ity f() { Respondwith 1; }\n    Ity f() { Respondwith 2; }\n} $\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
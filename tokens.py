@@ -0,0 +1,75 @@
+class Token:
+    """A scanned token; __slots__ keeps it far smaller than the old per-token dict"""
+    __slots__ = ('line', 'text', 'type', 'error_msg')
+
+    def __init__(self, line, text, token_type, error_msg=None):
+        self.line = line
+        self.text = text
+        self.type = token_type
+        self.error_msg = error_msg
+
+    def __getitem__(self, key):
+        """Dictionary-style access for code written against the old token dicts"""
+        if key == 'error_msg' and self.error_msg is None:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        """Dictionary-style get for code written against the old token dicts"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.line == other.line and self.text == other.text
+                and self.type == other.type and self.error_msg == other.error_msg)
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self.error_msg is not None:
+            return f"Token({self.line}, {self.text!r}, {self.type!r}, {self.error_msg!r})"
+        return f"Token({self.line}, {self.text!r}, {self.type!r})"
+
+
+_text_slot = Token.text  # The slot MappedToken's property caches decoded text in
+
+
+class MappedToken(Token):
+    """A token whose text stays in a mapped source buffer until it is first read.
+
+    buffer[start:end] holds the ASCII text; reading text decodes it once
+    and keeps the string.
+    """
+    __slots__ = ('buffer', 'start', 'end')
+
+    def __init__(self, line, buffer, start, end, token_type):
+        self.line = line
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.type = token_type
+        self.error_msg = None
+
+    @property
+    def text(self):
+        try:
+            return _text_slot.__get__(self)
+        except AttributeError:
+            text = self.buffer[self.start:self.end].decode('ascii')
+            _text_slot.__set__(self, text)
+            return text
+
+    @text.setter
+    def text(self, value):
+        _text_slot.__set__(self, value)
+
+    def __reduce__(self):
+        # The buffer may be an mmap, which cannot be pickled; plain text can
+        return Token, (self.line, self.text, self.type, self.error_msg)
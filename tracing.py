@@ -0,0 +1,148 @@
+from array import array
+
+from grammar import PRODUCTIONS
+
+# How much of a parse's matched rules a RuleTrace keeps
+TRACE_OFF = "off"        # Nothing; the error count alone tells pass from fail
+TRACE_COUNTS = "counts"  # How often each rule matched
+TRACE_FULL = "full"      # Every rule matched and error, with its line
+TRACE_LEVELS = (TRACE_OFF, TRACE_COUNTS, TRACE_FULL)
+
+# Entry recorded for each parse error
+NOT_MATCHED = 'Not Matched'
+
+# Every name the Parser reports, numbered once for all traces
+RULE_NAMES = (NOT_MATCHED,) + tuple(dict.fromkeys(production.rule for production in PRODUCTIONS))
+RULE_IDS = {rule: rule_id for rule_id, rule in enumerate(RULE_NAMES)}
+
+
+def shift_lines(segment, line_shift):
+    """Segment of a full trace with line_shift added to its lines, sharing its arrays"""
+    rule_ids, lines, shift = segment
+    return rule_ids, lines, shift + line_shift
+
+
+class RuleTrace:
+    """The rules a parse matched and the errors it hit, at one of TRACE_LEVELS.
+
+    A full trace keeps its entries as a rule id and a line in two arrays, in
+    the order they were added. Segments replayed from another trace are not
+    copied in but linked as parts of their own, each with the shift to add
+    to its lines, so replaying a segment costs the same whatever its size.
+    """
+
+    def __init__(self, level=TRACE_FULL):
+        if level not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level {level!r}, expected one of {', '.join(TRACE_LEVELS)}")
+        self.level = level
+        self.counts = array('q', bytes(8 * len(RULE_NAMES))) if level == TRACE_COUNTS else None
+        # The open part, which entries are added to
+        self.rule_ids = array('H')
+        self.lines = array('i')
+        self.parts = []  # Closed parts before it: (rule ids, lines, line shift)
+        self.closed = 0  # Entries in the closed parts
+
+    def __len__(self):
+        """Number of entries kept, which is 0 below TRACE_FULL"""
+        return self.closed + len(self.rule_ids)
+
+    def count(self, rule):
+        """Count a match of rule at TRACE_COUNTS"""
+        self.counts[RULE_IDS[rule]] += 1
+
+    def add(self, rule, line):
+        """Add an entry for rule on line at TRACE_FULL"""
+        self.rule_ids.append(RULE_IDS[rule])
+        self.lines.append(line)
+
+    def add_id(self, rule_id, line):
+        """Add an entry by rule id"""
+        self.rule_ids.append(rule_id)
+        self.lines.append(line)
+
+    def record(self, rule, line):
+        """Count or add rule, whatever the level asks for"""
+        if self.level == TRACE_FULL:
+            self.add(rule, line)
+        elif self.level == TRACE_COUNTS:
+            self.count(rule)
+
+    def mark(self):
+        """Position to take a segment of the trace from"""
+        if self.level == TRACE_FULL:
+            return len(self)
+        if self.level == TRACE_COUNTS:
+            return array('q', self.counts)
+        return None
+
+    def segment(self, mark):
+        """What was traced since mark: (rule ids, lines, line shift), per-rule counts, or None"""
+        if self.level == TRACE_FULL:
+            start = mark - self.closed
+            if start >= 0:
+                return self.rule_ids[start:], self.lines[start:], 0
+            # The segment takes in replayed parts: copy its entries out
+            rule_ids = array('H')
+            lines = array('i')
+            for k, (line, rule_id) in enumerate(self.line_ids()):
+                if k >= mark:
+                    rule_ids.append(rule_id)
+                    lines.append(line)
+            return rule_ids, lines, 0
+        if self.level == TRACE_COUNTS:
+            return array('q', (count - before for count, before in zip(self.counts, mark)))
+        return None
+
+    def replay(self, segment):
+        """Add a segment taken from a trace of the same level"""
+        if self.level == TRACE_FULL:
+            if self.rule_ids:
+                self.parts.append((self.rule_ids, self.lines, 0))
+                self.closed += len(self.rule_ids)
+                self.rule_ids = array('H')
+                self.lines = array('i')
+            self.parts.append(segment)
+            self.closed += len(segment[0])
+        elif self.level == TRACE_COUNTS:
+            counts = self.counts
+            for rule_id, count in enumerate(segment):
+                counts[rule_id] += count
+
+    def line_ids(self):
+        """Yield (line, rule id) for each entry of a full trace in the order they were added"""
+        for rule_ids, lines, shift in self.parts + [(self.rule_ids, self.lines, 0)]:
+            if shift:
+                # Line 0 marks an error at the end of the input and stays put
+                for rule_id, line in zip(rule_ids, lines):
+                    yield (line + shift if line else 0), rule_id
+            else:
+                yield from zip(lines, rule_ids)
+
+    def rule_counts(self):
+        """Number of matches of each rule and of errors, by name, for rules seen at least once"""
+        if self.level == TRACE_COUNTS:
+            counts = self.counts
+        else:
+            counts = [0] * len(RULE_NAMES)
+            for rule_ids, _, _ in self.parts + [(self.rule_ids, self.lines, 0)]:
+                for rule_id in rule_ids:
+                    counts[rule_id] += 1
+        return {RULE_NAMES[rule_id]: count for rule_id, count in enumerate(counts) if count}
+
+    def entries(self):
+        """Yield (line, rule) for each entry in the order they were added"""
+        for line, rule_id in self.line_ids():
+            yield line, RULE_NAMES[rule_id]
+
+    def entries_by_line(self):
+        """Yield (line, rule) for each entry in line order, entries on one line as added"""
+        by_line = []  # Rule ids of the entries on each line
+        for line, rule_id in self.line_ids():
+            try:
+                by_line[line].append(rule_id)
+            except IndexError:
+                by_line.extend([] for _ in range(line + 1 - len(by_line)))
+                by_line[line].append(rule_id)
+        for line, rule_ids in enumerate(by_line):
+            for rule_id in rule_ids:
+                yield line, RULE_NAMES[rule_id]
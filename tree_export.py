@@ -0,0 +1,141 @@
+import json
+
+from arena import ArenaNode
+from parser import ParseTreeNode
+
+BINARY_MAGIC = b"PTB1"
+FLUSH_SIZE = 65536
+
+# Nodes of either tree a Parser builds; any other value is a bare True
+TREE_NODES = (ParseTreeNode, ArenaNode)
+
+
+def write_jsonl(root, file):
+    """Write a tree to a text file as JSON lines, one node per line in preorder.
+
+    root is a ParseTreeNode or, from Parser(arena=True), an ArenaNode. Each
+    line holds the node's depth, rule and token (null if none); a bare True
+    child is written as {"depth": d, "value": true}.
+    """
+    for node, depth in root.walk():
+        if isinstance(node, TREE_NODES):
+            record = {'depth': depth, 'rule': node.rule, 'token': node.token}
+        else:
+            record = {'depth': depth, 'value': node}
+        file.write(json.dumps(record))
+        file.write('\n')
+
+
+def read_jsonl(file):
+    """Rebuild a tree written by write_jsonl"""
+    root = None
+    path = []  # Nodes from the root down to the last node read
+    for line in file:
+        record = json.loads(line)
+        depth = record['depth']
+        if 'value' in record:
+            node = record['value']
+        else:
+            node = ParseTreeNode(record['rule'], token=record['token'])
+        del path[depth:]
+        if path:
+            path[-1].children.append(node)
+        else:
+            root = node
+        path.append(node)
+    return root
+
+
+def write_varint(out, value):
+    """Append an unsigned LEB128 integer to a bytearray"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_binary(root, file):
+    """Write a tree to a binary file as a preorder stream of varint records.
+
+    After the magic bytes, each node is three varints: child count plus one
+    (0 for a bare True), rule and token. A string is referred to by its
+    position in the order strings first appear, plus one, with 0 for None;
+    the first use of a string is followed by its UTF-8 length and bytes.
+    """
+    strings = {}
+    out = bytearray(BINARY_MAGIC)
+
+    def write_string(value):
+        if value is None:
+            out.append(0)
+            return
+        ref = strings.get(value)
+        if ref is not None:
+            write_varint(out, ref)
+            return
+        ref = strings[value] = len(strings) + 1
+        write_varint(out, ref)
+        data = value.encode('utf-8', 'surrogatepass')
+        write_varint(out, len(data))
+        out.extend(data)
+
+    for node, depth in root.walk():
+        if isinstance(node, TREE_NODES):
+            write_varint(out, len(node.children) + 1)
+            write_string(node.rule)
+            write_string(node.token)
+        else:
+            out.append(0)
+        if len(out) >= FLUSH_SIZE:
+            file.write(out)
+            out.clear()
+    file.write(out)
+
+
+def read_binary(file):
+    """Rebuild a tree written by write_binary"""
+    data = file.read()
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("Not a binary parse tree")
+    pos = len(BINARY_MAGIC)
+    strings = [None]
+
+    def read_varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_string():
+        nonlocal pos
+        ref = read_varint()
+        if ref == len(strings):
+            length = read_varint()
+            strings.append(data[pos:pos + length].decode('utf-8', 'surrogatepass'))
+            pos += length
+        return strings[ref]
+
+    root = None
+    stack = []  # [node, children still to read]
+    while pos < len(data):
+        count = read_varint()
+        if count:
+            node = ParseTreeNode(read_string(), token=read_string())
+        else:
+            node = True
+        if stack:
+            parent = stack[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+            if not parent[1]:
+                stack.pop()
+        else:
+            root = node
+        if count > 1:
+            stack.append([node, count - 1])
+    return root
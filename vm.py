@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import sys
+
+from bytecode import (BINARY, BINARY_OPS, CALL, JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP,
+                      JUMP_IF_TRUE_OR_POP, LOAD_CONST, LOAD_GLOBAL, LOAD_LOCAL, POP, RETURN,
+                      STORE_GLOBAL, STORE_LOCAL, CompileError, compile_program)
+from optimizer import fold_constants
+from parser import Parser
+from scanner import Scanner
+from tracing import TRACE_OFF
+
+MAX_CALL_DEPTH = 1000
+JUMPS = (JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP)
+
+
+class VMError(Exception):
+    """Raised when running bytecode fails"""
+
+
+class VM:
+    """Stack machine running the bytecode of a compiled Module"""
+
+    def __init__(self, module):
+        self.module = module
+        self.globals = list(module.global_defaults)
+        self.codes = [self.prepare(function) for function in module.functions]
+
+    @staticmethod
+    def prepare(function):
+        """Copy a function's code into a list with jump targets as list offsets.
+
+        Indexing a list is cheaper than indexing an array, and storing
+        offsets saves a multiplication on every jump taken.
+        """
+        code = function.code.tolist()
+        for pc in range(0, len(code), 2):
+            if code[pc] in JUMPS:
+                code[pc + 1] *= 2
+        return code
+
+    def call(self, name, *args):
+        """Run the method called name with the given arguments and return its result"""
+        index = self.module.function_index.get(name)
+        if index is None:
+            raise VMError(f"Unknown method: {name}")
+        function = self.module.functions[index]
+        if len(args) != function.param_count:
+            raise VMError(f"{name} takes {function.param_count} arguments, got {len(args)}")
+        return self.run(function, list(args))
+
+    def run(self, function, args):
+        if not function.defined:
+            raise VMError(f"{function.name} is declared but has no body")
+        functions = self.module.functions
+        codes = self.codes
+        binary_ops = BINARY_OPS
+        global_values = self.globals
+        frames = []  # Callers' (function, code, consts, locals, pc)
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        code = codes[function.index]
+        consts = function.consts
+        local_values = args + function.local_defaults
+        pc = 0
+        try:
+            # Opcodes are tested in order of how often they run, so the
+            # common loads, operators and stores take one or two compares
+            while True:
+                op = code[pc]
+                arg = code[pc + 1]
+                pc += 2
+                if op == LOAD_LOCAL:
+                    push(local_values[arg])
+                elif op == LOAD_CONST:
+                    push(consts[arg])
+                elif op == BINARY:
+                    right = pop()
+                    stack[-1] = binary_ops[arg](stack[-1], right)
+                elif op == STORE_LOCAL:
+                    local_values[arg] = pop()
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == JUMP:
+                    pc = arg
+                elif op == LOAD_GLOBAL:
+                    push(global_values[arg])
+                elif op == STORE_GLOBAL:
+                    global_values[arg] = pop()
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    if stack[-1]:
+                        pop()
+                    else:
+                        pc = arg
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    if stack[-1]:
+                        pc = arg
+                    else:
+                        pop()
+                elif op == CALL:
+                    callee = functions[arg]
+                    if not callee.defined:
+                        raise VMError(f"{callee.name} is declared but has no body")
+                    if len(frames) >= MAX_CALL_DEPTH:
+                        raise VMError(f"Call depth exceeded {MAX_CALL_DEPTH}")
+                    frames.append((function, code, consts, local_values, pc))
+                    count = callee.param_count
+                    start = len(stack) - count
+                    local_values = stack[start:] + callee.local_defaults
+                    del stack[start:]
+                    function = callee
+                    code = codes[arg]
+                    consts = callee.consts
+                    pc = 0
+                elif op == POP:
+                    pop()
+                else:
+                    value = pop() if op == RETURN else None
+                    if not frames:
+                        return value
+                    function, code, consts, local_values, pc = frames.pop()
+                    push(value)
+        except (TypeError, ZeroDivisionError, OverflowError) as error:
+            line = function.lines[pc // 2 - 1]
+            raise VMError(f"Line {line} in {function.name}: {error}") from None
+
+
+def load_module(filename, fold=False):
+    """Scan, parse and compile a source file into a Module.
+
+    With fold, constants are folded first and the module's folded
+    attribute holds the number of syntax nodes that eliminated. A file
+    with scanning or parse errors does not compile, since the statements
+    that failed to parse are missing from its syntax tree.
+    """
+    with open(filename, 'r') as file:
+        source_code = file.read()
+    scanner = Scanner()
+    scanner.scan(source_code)
+    parser = Parser(scanner.tokens, trace=TRACE_OFF)
+    parser.parse()
+    if scanner.error_count or parser.error_count:
+        raise CompileError(f"{filename} has {scanner.error_count} scanning and "
+                           f"{parser.error_count} parse errors")
+    if parser.ast_root is None:
+        raise CompileError(f"{filename} does not parse as a program")
+    folded = fold_constants(parser.ast_root) if fold else 0
+    module = compile_program(parser.ast_root)
+    module.folded = folded
+    return module
+
+
+def parse_argument(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    disassemble = "--dis" in args
+    fold = "--fold" in args
+    args = [arg for arg in args if not arg.startswith("--")]
+    if len(args) < 2:
+        print("Usage: python vm.py <source_file> <method> [args...] [--dis] [--fold]")
+        sys.exit(1)
+    try:
+        module = load_module(args[0], fold)
+        if fold:
+            print(f"Constant folding eliminated {module.folded} nodes")
+        if disassemble:
+            print(module.function(args[1]).disassemble())
+        print(VM(module).call(args[1], *map(parse_argument, args[2:])))
+    except (OSError, CompileError, VMError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)